@@ -1,6 +1,57 @@
+from django import forms
 from django.contrib import admin
-from .models import Tool, Loan
+from . import stock
+from .models import Tool, Loan, Job, MaintenanceEvent, SlowQuery
 
 admin.site.register(Tool)
-admin.site.register(Loan)
+admin.site.register(Job)
+admin.site.register(MaintenanceEvent)
 
+
+class LoanAdminForm(forms.ModelForm):
+    """ Falta de estoque vira erro no formulário (o contador é mantido pelos signals de Loan). """
+
+    class Meta:
+        model = Loan
+        fields = '__all__'
+
+    def clean(self):
+        data = super().clean()
+        tool, quantity = data.get('tool'), data.get('quantity') or 0
+        if tool is None or data.get('returned_date') is not None:
+            return data
+        free = stock.available([tool.pk]).get(tool.pk, 0)
+        # Ainda os valores do banco: a instância só é atualizada depois do clean()
+        if self.instance.pk and self.instance.tool_id == tool.pk and self.instance.returned_date is None:
+            free += self.instance.quantity
+        if quantity > free:
+            raise forms.ValidationError(str(stock.InsufficientStock(tool.pk, quantity)))
+        return data
+
+
+@admin.register(Loan)
+class LoanAdmin(admin.ModelAdmin):
+    form = LoanAdminForm
+
+
+@admin.register(SlowQuery)
+class SlowQueryAdmin(admin.ModelAdmin):
+    list_display = ('call_site', 'route', 'count', 'total_ms', 'avg_ms', 'max_ms', 'last_seen')
+    list_filter = ('route',)
+    search_fields = ('sql', 'call_site')
+    readonly_fields = [field.name for field in SlowQuery._meta.fields]
+
+    @admin.display(description='total (ms)', ordering='total_time')
+    def total_ms(self, obj):
+        return round(obj.total_time * 1000, 1)
+
+    @admin.display(description='média (ms)')
+    def avg_ms(self, obj):
+        return round(obj.avg_time * 1000, 1)
+
+    @admin.display(description='máx (ms)', ordering='max_time')
+    def max_ms(self, obj):
+        return round(obj.max_time * 1000, 1)
+
+    def has_add_permission(self, request):
+        return False
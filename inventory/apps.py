@@ -4,3 +4,15 @@ from django.apps import AppConfig
 class InventoryConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'inventory'
+
+    def ready(self):
+        from django.db.backends.signals import connection_created
+        from django.db.models.signals import post_migrate
+
+        from . import signals  # noqa: F401
+        from .db import apply_sqlite_pragmas, install_query_dispatcher
+        from .search import restore_fts_triggers
+
+        connection_created.connect(apply_sqlite_pragmas, dispatch_uid='inventory.apply_sqlite_pragmas')
+        connection_created.connect(install_query_dispatcher, dispatch_uid='inventory.install_query_dispatcher')
+        post_migrate.connect(restore_fts_triggers, sender=self, dispatch_uid='inventory.restore_fts_triggers')
@@ -0,0 +1,182 @@
+# inventory/assets.py
+
+"""
+Arquivos estáticos para produção ('python manage.py build_assets').
+
+1. collectstatic com AssetStorage: cada arquivo ganha o hash do conteúdo
+   no nome (main.3f9c1a2b.js), inclusive nos url() do CSS e nos import
+   dos módulos JS, então um deploy nunca serve código antigo do cache.
+2. Os CSS de cada página (STATIC_BUNDLES) são juntados num único arquivo,
+   também com hash; a tag {% css_bundle %} aponta para ele.
+3. Versões .gz (e .br, se o pacote 'brotli' estiver instalado) são
+   gravadas ao lado de cada arquivo de texto.
+
+'serve' entrega esses arquivos com DEBUG=False: escolhe a versão
+comprimida pelo Accept-Encoding e marca os nomes com hash como
+'immutable'. Com DEBUG=True o runserver continua servindo os originais.
+"""
+
+import gzip
+import hashlib
+import mimetypes
+import os
+
+from django.conf import settings
+from django.contrib.staticfiles.storage import ManifestStaticFilesStorage, staticfiles_storage
+from django.core.exceptions import SuspiciousFileOperation
+from django.core.files.base import ContentFile
+from django.http import FileResponse, Http404, HttpResponse, HttpResponseNotModified
+from django.utils._os import safe_join
+from django.utils.cache import patch_cache_control
+from django.utils.http import parse_etags
+from django.views.generic import TemplateView
+
+try:
+    import brotli
+except ImportError:  # opcional: sem ele só há .gz
+    brotli = None
+
+COMPRESSIBLE = ('.css', '.js', '.json', '.svg', '.txt', '.html', '.map', '.xml')
+MIN_COMPRESS_SIZE = 512  # bytes; abaixo disso o cabeçalho gzip come o ganho
+IMMUTABLE = 'public, max-age=31536000, immutable'
+
+
+class AssetStorage(ManifestStaticFilesStorage):
+    # Reescreve também 'import ... from "./main.js"' nos módulos ES
+    support_js_module_import_aggregation = True
+    manifest_strict = False
+
+    def stored_name(self, name):
+        try:
+            return super().stored_name(name)
+        except ValueError:
+            # Ainda sem build_assets: usa o nome original em vez de quebrar a página
+            return name
+
+
+# --- Build ---
+
+def bundle_name(page):
+    # Mesmo diretório dos originais: url() relativos continuam válidos
+    return f'css/{page}.bundle.css'
+
+
+def build_bundles(storage=staticfiles_storage):
+    """ Junta os CSS já processados de cada página e registra o resultado no manifesto. """
+    built = []
+    for page, sources in getattr(settings, 'STATIC_BUNDLES', {}).items():
+        parts = []
+        for source in sources:
+            with storage.open(storage.stored_name(source)) as f:
+                parts.append(f'/* {source} */\n'.encode() + f.read())
+        content = ContentFile(b'\n'.join(parts))
+        hashed = storage.hashed_name(bundle_name(page), content)
+        if storage.exists(hashed):
+            storage.delete(hashed)
+        storage._save(hashed, content)
+        storage.hashed_files[storage.hash_key(bundle_name(page))] = hashed
+        built.append(hashed)
+    storage.save_manifest()
+    return built
+
+
+def precompress(storage=staticfiles_storage):
+    """ Grava .gz/.br dos arquivos com hash. Devolve (arquivos, bytes originais, bytes gzip). """
+    count = original = compressed = 0
+    for name in set(storage.hashed_files.values()):
+        if not name.endswith(COMPRESSIBLE):
+            continue
+        path = storage.path(name)
+        with open(path, 'rb') as f:
+            data = f.read()
+        if len(data) < MIN_COMPRESS_SIZE:
+            continue
+        gz = gzip.compress(data, compresslevel=9, mtime=0)
+        variants = {'.gz': gz}
+        if brotli is not None:
+            variants['.br'] = brotli.compress(data, quality=11)
+        for ext, body in variants.items():
+            if len(body) < len(data):
+                with open(path + ext, 'wb') as f:
+                    f.write(body)
+        count += 1
+        original += len(data)
+        compressed += min(len(gz), len(data))
+    return count, original, compressed
+
+
+# --- Entrega ---
+
+_ENCODINGS = (('br', '.br'), ('gzip', '.gz'))
+
+
+def accepted_encodings(request):
+    """ Codificações do Accept-Encoding com q > 0. """
+    accepted = set()
+    for part in request.headers.get('Accept-Encoding', '').split(','):
+        name, _, params = part.partition(';')
+        try:
+            quality = float(params.strip()[2:]) if params.strip().startswith('q=') else 1.0
+        except ValueError:
+            quality = 0.0
+        if quality > 0:
+            accepted.add(name.strip().lower())
+    return accepted
+
+
+def is_hashed(path):
+    return path in getattr(staticfiles_storage, 'hashed_files', {}).values()
+
+
+def serve(request, path):
+    """ Arquivo de STATIC_ROOT, comprimido se houver versão pronta, com cache longo se tiver hash. """
+    try:
+        full_path = safe_join(settings.STATIC_ROOT, path)
+    except SuspiciousFileOperation:
+        raise Http404
+    if path.endswith(('.gz', '.br')) or not os.path.isfile(full_path):
+        raise Http404
+
+    accepted = accepted_encodings(request)
+    file_path, encoding = full_path, None
+    for name, ext in _ENCODINGS:
+        if name in accepted and os.path.isfile(full_path + ext):
+            file_path, encoding = full_path + ext, name
+            break
+
+    content_type, _ = mimetypes.guess_type(path)
+    response = FileResponse(open(file_path, 'rb'), content_type=content_type or 'application/octet-stream')
+    if encoding:
+        response['Content-Encoding'] = encoding
+    response['Vary'] = 'Accept-Encoding'
+    if is_hashed(path):
+        response['Cache-Control'] = IMMUTABLE
+    else:
+        patch_cache_control(response, public=True, no_cache=True)
+    return response
+
+
+class PageView(TemplateView):
+    """
+    Páginas do frontend: o HTML não depende do usuário (a autenticação é
+    feita pelo JavaScript com o JWT), então é renderizado uma vez por
+    processo e servido da memória, com ETag para o navegador revalidar.
+    """
+    _rendered = {}
+
+    def get(self, request, *args, **kwargs):
+        cached = self._rendered.get(self.template_name)
+        if cached is None or settings.DEBUG:
+            response = super().get(request, *args, **kwargs).render()
+            content = response.content
+            cached = (content, '"%s"' % hashlib.sha1(content).hexdigest()[:32])
+            if not settings.DEBUG:
+                self._rendered[self.template_name] = cached
+        content, etag = cached
+        if etag in parse_etags(request.headers.get('If-None-Match', '')):
+            response = HttpResponseNotModified()
+        else:
+            response = HttpResponse(content, content_type='text/html; charset=utf-8')
+        response['ETag'] = etag
+        patch_cache_control(response, no_cache=True)
+        return response
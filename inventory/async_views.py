@@ -0,0 +1,102 @@
+# inventory/async_views.py
+
+"""
+Versões async (ASGI) das rotas de relatório: Dashboard e Análise.
+
+Com ASYNC_VIEWS['MODE'] = 'async', inventory.urls serve o 'list' desses
+ViewSets por as_async_view(): a requisição fica no event loop enquanto as
+consultas independentes rodam ao mesmo tempo (run_concurrently), cada uma
+numa thread com a própria conexão. Os métodos async do ORM (aaggregate,
+'async for') não servem para isso: todos passam pela mesma thread da
+requisição e as consultas continuariam uma após a outra.
+
+Autenticação, permissões e renderização continuam as do DRF, que é
+síncrono; rodam em sync_to_async antes e depois dos dados.
+
+Faz diferença servido por um servidor ASGI (project.asgi, ex.: uvicorn ou
+daphne); no WSGI o Django roda a view async num event loop por requisição.
+'python manage.py benchmark_endpoints --modes' compara os dois modos.
+"""
+
+import asyncio
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.db import close_old_connections
+
+DEFAULTS = {
+    'MODE': 'sync',  # 'sync' ou 'async'
+    # False: consultas uma após a outra na conexão da requisição (menos
+    # conexões abertas; útil em bancos com poucas conexões disponíveis)
+    'CONCURRENT_QUERIES': True,
+}
+
+
+def get_setting(name):
+    return getattr(settings, 'ASYNC_VIEWS', {}).get(name, DEFAULTS[name])
+
+
+def _in_own_connection(function):
+    # Conexões destas threads seguem CONN_MAX_AGE, como as das requisições
+    close_old_connections()
+    try:
+        return function()
+    finally:
+        close_old_connections()
+
+
+async def run_concurrently(*functions):
+    """ Executa funções síncronas (consultas) ao mesmo tempo e devolve os resultados na ordem. """
+    if not get_setting('CONCURRENT_QUERIES'):
+        return [await sync_to_async(function)() for function in functions]
+    return await asyncio.gather(*(
+        sync_to_async(_in_own_connection, thread_sensitive=False)(function) for function in functions
+    ))
+
+
+class AsyncListMixin:
+    """
+    ViewSet cujo 'list' tem uma versão async, 'alist(request)', servida
+    por as_async_view(). Só GET/HEAD; OPTIONS responde como no DRF.
+    """
+
+    @classmethod
+    def as_async_view(cls, **initkwargs):
+        actions = {'get': 'list', 'head': 'list'}
+
+        async def view(request, *args, **kwargs):
+            self = cls(**initkwargs)
+            self.action_map = actions
+            response = await sync_to_async(self._async_start)(request, *args, **kwargs)
+            if response is None:
+                try:
+                    response = await self.alist(self.request, *args, **kwargs)
+                except Exception as exc:
+                    response = await sync_to_async(self.handle_exception)(exc)
+            return await sync_to_async(self._async_finish)(response)
+
+        view.cls = cls
+        view.initkwargs = initkwargs
+        view.actions = actions
+        view.csrf_exempt = True
+        return view
+
+    def _async_start(self, request, *args, **kwargs):
+        """ Parte síncrona do dispatch do DRF; devolve a resposta se a requisição parar aqui. """
+        self.args, self.kwargs = args, kwargs
+        self.request = self.initialize_request(request, *args, **kwargs)
+        self.headers = self.default_response_headers
+        try:
+            self.initial(self.request, *args, **kwargs)
+            if request.method == 'OPTIONS':
+                return self.options(self.request, *args, **kwargs)
+            if request.method not in ('GET', 'HEAD'):
+                self.http_method_not_allowed(self.request, *args, **kwargs)
+        except Exception as exc:
+            return self.handle_exception(exc)
+        return None
+
+    def _async_finish(self, response):
+        response = self.finalize_response(self.request, response, *self.args, **self.kwargs)
+        # Respostas do DRF são renderizadas aqui; StreamingHttpResponse segue como está
+        return response.render() if hasattr(response, 'render') else response
@@ -0,0 +1,387 @@
+# inventory/benchmark.py
+
+"""
+Benchmark das rotas GET da API (inventory.urls e users.urls).
+
+Cada rota é chamada pelo cliente de testes do Django com um token JWT, e
+são medidos latência (p50/p95/p99), número de consultas SQL e pico de
+memória. O resultado pode ser salvo em JSON e comparado com uma execução
+anterior para encontrar regressões.
+
+'mixed_workload' roda leitores e escritores em paralelo (threads, uma
+conexão por thread) para comparar perfis de banco (DB_PROFILE).
+
+'report_modes' chama o Dashboard e a Análise pelo app ASGI com várias
+requisições simultâneas, nos modos sync e async de ASYNC_VIEWS. Os
+middlewares do projeto aceitam async, então no modo async a pilha inteira
+roda no event loop, sem o adaptador síncrono do Django em volta.
+
+'read_paths' mede as listas grandes pelo serializer e pelo caminho rápido
+(FAST_READS) e confere que as duas respostas são idênticas.
+"""
+
+import asyncio
+import gc
+import json
+import platform
+import statistics
+import time
+import tracemalloc
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+from types import ModuleType
+
+import django
+from django.conf import settings
+from django.core.handlers.asgi import ASGIHandler
+from django.db import connection, connections
+from django.db.models import F
+from django.test import Client, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import URLPattern, URLResolver, include, path, reverse
+from django.utils import timezone
+from rest_framework_simplejwt.tokens import RefreshToken
+
+from .models import Employee, Tool
+from .urls import report_patterns
+
+URL_MODULES = ['inventory.urls', 'users.urls']
+READ_URLS = ['/api/dashboard/', '/api/loans/active_loans/', '/api/tools/']
+REPORT_URLS = ['/api/dashboard/', '/api/analytics/']
+LIST_URLS = [
+    '/api/tools/?page_size=500',
+    '/api/loans/active_loans/?page_size=500',
+    '/api/loans/loan_history/?page_size=500',
+    '/api/loans/loan_history/?page_size=500&format=columnar',
+]
+SKIPPED_ROUTES = {'events'}  # SSE: a resposta não termina
+
+
+def _walk(patterns):
+    for pattern in patterns:
+        if isinstance(pattern, URLResolver):
+            yield from _walk(pattern.url_patterns)
+        elif isinstance(pattern, URLPattern):
+            yield pattern
+
+
+def _sample_pk(view_class):
+    queryset = getattr(view_class, 'queryset', None)
+    if queryset is None:
+        return None
+    return queryset.model._default_manager.order_by('pk').values_list('pk', flat=True).first()
+
+
+def discover_routes():
+    """
+    Lista (nome, url) das rotas GET. Rotas de detalhe usam o primeiro
+    registro existente; rotas com parâmetros desconhecidos (ex.: id de
+    tarefa) e as variantes com sufixo de formato são ignoradas.
+    """
+    routes = {}
+    for module_name in URL_MODULES:
+        module = __import__(module_name, fromlist=['urlpatterns'])
+        for pattern in _walk(module.urlpatterns):
+            if not pattern.name or pattern.name in routes or pattern.name in SKIPPED_ROUTES:
+                continue
+            params = set(pattern.pattern.regex.groupindex)
+            if 'format' in params:
+                continue
+            actions = getattr(pattern.callback, 'actions', None)
+            if actions is not None and 'get' not in actions:
+                continue
+            kwargs = {}
+            if params:
+                if params != {'pk'}:
+                    continue
+                pk = _sample_pk(getattr(pattern.callback, 'cls', None))
+                if pk is None:
+                    continue
+                kwargs['pk'] = pk
+            routes[pattern.name] = reverse(pattern.name, kwargs=kwargs)
+    return sorted(routes.items())
+
+
+def percentile(samples, pct):
+    """ Percentil por interpolação linear (samples não vazio). """
+    ordered = sorted(samples)
+    if len(ordered) == 1:
+        return ordered[0]
+    position = (len(ordered) - 1) * pct / 100
+    low = int(position)
+    high = min(low + 1, len(ordered) - 1)
+    return ordered[low] + (ordered[high] - ordered[low]) * (position - low)
+
+
+def _consume(response):
+    if getattr(response, 'streaming', False):
+        return sum(len(chunk) for chunk in response.streaming_content)
+    return len(response.content)
+
+
+class Runner:
+    def __init__(self, user, iterations=20, warmup=2, headers=None):
+        self.user = user
+        self.iterations = iterations
+        self.warmup = warmup
+        self.headers = headers or {}
+        self.client = Client()
+
+    def _get(self, url):
+        # Um token novo por chamada: o access token dura poucos minutos
+        token = str(RefreshToken.for_user(self.user).access_token)
+        return self.client.get(url, HTTP_AUTHORIZATION=f'Bearer {token}', **self.headers)
+
+    def measure(self, url):
+        for _ in range(self.warmup):
+            _consume(self._get(url))
+
+        # Consultas e memória numa chamada separada, para não distorcer a latência
+        gc.collect()
+        tracemalloc.start()
+        with CaptureQueriesContext(connection) as queries:
+            response = self._get(url)
+            size = _consume(response)
+        # captured_queries lê connection.queries na hora: as requisições seguintes o zeram
+        query_count = len(queries.captured_queries)
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+
+        timings = []
+        for _ in range(self.iterations):
+            start = time.perf_counter()
+            _consume(self._get(url))
+            timings.append((time.perf_counter() - start) * 1000)
+
+        return {
+            'url': url,
+            'status': response.status_code,
+            'bytes': size,
+            'queries': query_count,
+            'peak_memory_kb': round(peak / 1024, 1),
+            'p50_ms': round(percentile(timings, 50), 3),
+            'p95_ms': round(percentile(timings, 95), 3),
+            'p99_ms': round(percentile(timings, 99), 3),
+            'mean_ms': round(statistics.fmean(timings), 3),
+        }
+
+    def run(self, routes, on_result=None):
+        results = {}
+        for name, url in routes:
+            results[name] = self.measure(url)
+            if on_result:
+                on_result(name, results[name])
+        return {
+            'created_at': timezone.now().isoformat(),
+            'environment': {
+                'python': platform.python_version(),
+                'django': django.get_version(),
+                'database': connection.vendor,
+                'database_name': str(settings.DATABASES['default'].get('NAME')),
+                'iterations': self.iterations,
+            },
+            'endpoints': results,
+        }
+
+
+def _latency_summary(timings, errors, duration):
+    return {
+        'operations': len(timings),
+        'errors': errors,
+        'throughput_per_s': round(len(timings) / duration, 1),
+        'p50_ms': round(percentile(timings, 50), 3) if timings else None,
+        'p95_ms': round(percentile(timings, 95), 3) if timings else None,
+    }
+
+
+def mixed_workload(user, readers=4, writers=2, duration=10.0, read_urls=READ_URLS):
+    """
+    Leitores fazem GET em 'read_urls' enquanto escritores registram e
+    apagam empréstimos pela API, durante 'duration' segundos. Devolve
+    vazão, erros (5xx, ex.: "database is locked") e latência por papel.
+    """
+    tool = Tool.objects.order_by((F('borrowed_quantity') - F('total_quantity')).asc()).first()
+    employee = Employee.objects.order_by('pk').first()
+    if tool is None or tool.available_quantity < writers:
+        raise ValueError("É preciso uma ferramenta com estoque livre (rode seed_benchmark_data).")
+    token = str(RefreshToken.for_user(user).access_token)
+    auth = {'HTTP_AUTHORIZATION': f'Bearer {token}'}
+    due_date = (timezone.now().date() + timedelta(days=7)).isoformat()
+    deadline = time.perf_counter() + duration
+
+    def read(worker):
+        client = Client(raise_request_exception=False)
+        timings, errors = [], 0
+        try:
+            while time.perf_counter() < deadline:
+                url = read_urls[len(timings) % len(read_urls)]
+                start = time.perf_counter()
+                response = client.get(url, **auth)
+                _consume(response)
+                timings.append((time.perf_counter() - start) * 1000)
+                errors += response.status_code >= 500
+        finally:
+            connections.close_all()
+        return 'read', timings, errors
+
+    def write(worker):
+        client = Client(raise_request_exception=False)
+        timings, errors = [], 0
+        payload = {'tool': tool.pk, 'employee': employee.pk if employee else None,
+                   'quantity': 1, 'due_date': due_date}
+        try:
+            while time.perf_counter() < deadline:
+                start = time.perf_counter()
+                response = client.post('/api/loans/', payload, content_type='application/json', **auth)
+                if response.status_code == 201:
+                    client.delete(f"/api/loans/{response.json()['id']}/", **auth)
+                else:
+                    errors += 1
+                timings.append((time.perf_counter() - start) * 1000)
+        finally:
+            connections.close_all()
+        return 'write', timings, errors
+
+    with ThreadPoolExecutor(max_workers=readers + writers) as pool:
+        futures = [pool.submit(read, i) for i in range(readers)]
+        futures += [pool.submit(write, i) for i in range(writers)]
+        outcomes = [future.result() for future in futures]
+
+    results = {}
+    for role in ('read', 'write'):
+        timings = [t for kind, ts, _ in outcomes if kind == role for t in ts]
+        errors = sum(e for kind, _, e in outcomes if kind == role)
+        results[role] = _latency_summary(timings, errors, duration)
+    return {
+        'database': connection.vendor,
+        'profile': getattr(settings, 'DB_PROFILE', None),
+        'readers': readers,
+        'writers': writers,
+        'duration_s': duration,
+        'results': results,
+    }
+
+
+async def _asgi_get(app, url, headers):
+    """ Um GET direto no app ASGI, como faria o servidor. Devolve o status. """
+    url_path, _, query = url.partition('?')
+    scope = {
+        'type': 'http', 'asgi': {'version': '3.0'}, 'http_version': '1.1',
+        'method': 'GET', 'scheme': 'http', 'path': url_path, 'raw_path': url_path.encode(),
+        'query_string': query.encode(), 'root_path': '',
+        'headers': [(b'host', b'localhost'), *headers],
+        'client': ('127.0.0.1', 0), 'server': ('localhost', 80),
+    }
+    body = [{'type': 'http.request', 'body': b'', 'more_body': False}]
+    status = []
+
+    async def receive():
+        if body:
+            return body.pop()
+        await asyncio.Event().wait()  # o cliente nunca desconecta
+
+    async def send(message):
+        if message['type'] == 'http.response.start':
+            status.append(message['status'])
+
+    await app(scope, receive, send)
+    return status[0]
+
+
+async def _concurrent_load(app, url, headers, concurrency, requests):
+    pending = iter(range(requests))
+    timings, errors = [], 0
+
+    async def worker():
+        nonlocal errors
+        for _ in pending:
+            start = time.perf_counter()
+            status = await _asgi_get(app, url, headers)
+            timings.append((time.perf_counter() - start) * 1000)
+            errors += status >= 400
+
+    await _asgi_get(app, url, headers)  # aquecimento
+    start = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    return _latency_summary(timings, errors, time.perf_counter() - start)
+
+
+def report_modes(user, concurrency=8, requests=200, urls=REPORT_URLS, use_cache=False):
+    """
+    Latência e vazão de 'urls' em cada modo de ASYNC_VIEWS, com
+    'concurrency' requisições simultâneas até completar 'requests' por rota.
+    Sem 'use_cache' o cache do Dashboard é desligado para medir as consultas.
+    """
+    token = str(RefreshToken.for_user(user).access_token)
+    headers = [(b'authorization', f'Bearer {token}'.encode())]
+    results = {}
+    for mode in ('sync', 'async'):
+        urlconf = ModuleType(f'benchmark_{mode}_urls')
+        urlconf.urlpatterns = [path('api/', include(report_patterns(mode)))]
+        overrides = {'ROOT_URLCONF': urlconf}
+        if not use_cache:
+            overrides['CACHES'] = {'default': {'BACKEND': 'django.core.cache.backends.dummy.DummyCache'}}
+        with override_settings(**overrides):
+            app = ASGIHandler()
+            results[mode] = {
+                url: asyncio.run(_concurrent_load(app, url, headers, concurrency, requests)) for url in urls
+            }
+    return {
+        'database': connection.vendor,
+        'concurrency': concurrency,
+        'requests': requests,
+        'cache': use_cache,
+        'results': results,
+    }
+
+
+def read_paths(user, urls=LIST_URLS, iterations=20, warmup=2):
+    """
+    Cada url com FAST_READS desligado ('serializer') e ligado ('fast'):
+    latência, consultas e memória como em Runner.measure, mais 'identical'
+    (corpos iguais byte a byte) e 'speedup' (p50 do serializer / p50 rápido).
+    """
+    runner = Runner(user, iterations=iterations, warmup=warmup)
+    results = {}
+    for url in urls:
+        row, bodies = {}, {}
+        for name, enabled in (('serializer', False), ('fast', True)):
+            with override_settings(FAST_READS={'ENABLED': enabled}):
+                row[name] = runner.measure(url)
+                bodies[name] = runner._get(url).content
+        row['identical'] = bodies['serializer'] == bodies['fast']
+        row['speedup'] = round(row['serializer']['p50_ms'] / row['fast']['p50_ms'], 2) if row['fast']['p50_ms'] else None
+        results[url] = row
+    return {
+        'database': connection.vendor,
+        'iterations': iterations,
+        'results': results,
+    }
+
+
+def compare(baseline, current, threshold=0.2, min_delta_ms=1.0):
+    """
+    Compara duas execuções. Uma rota regride se o p95 crescer mais que
+    'threshold' (fração) e mais que 'min_delta_ms', ou se fizer mais consultas.
+    """
+    regressions = []
+    for name, now in current['endpoints'].items():
+        before = baseline.get('endpoints', {}).get(name)
+        if before is None:
+            continue
+        delta = now['p95_ms'] - before['p95_ms']
+        if delta > min_delta_ms and now['p95_ms'] > before['p95_ms'] * (1 + threshold):
+            regressions.append((name, 'p95_ms', before['p95_ms'], now['p95_ms']))
+        if now['queries'] > before['queries']:
+            regressions.append((name, 'queries', before['queries'], now['queries']))
+    return regressions
+
+
+def load(path):
+    with open(path, encoding='utf-8') as f:
+        return json.load(f)
+
+
+def save(results, path):
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(results, f, indent=2, ensure_ascii=False)
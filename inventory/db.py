@@ -0,0 +1,63 @@
+# inventory/db.py
+
+"""
+Ajustes de conexão do banco. Ver DB_PROFILE e SQLITE_PRAGMAS em project/settings.py.
+
+request_queries(wrapper) vale como connection.execute_wrapper(wrapper) em
+todas as conexões usadas pela requisição, não só na da thread atual: no
+modo async as consultas rodam na thread da requisição e nas threads de
+run_concurrently (async_views), cada uma com a sua conexão. O wrapper fica
+numa ContextVar, que o asgiref copia para as threads de sync_to_async, e
+cada conexão recebe em connection_created um despachante que o aplica.
+"""
+
+import contextvars
+import functools
+from contextlib import contextmanager
+
+from django.conf import settings
+
+_query_wrappers = contextvars.ContextVar('inventory_query_wrappers', default=())
+
+
+def apply_sqlite_pragmas(sender, connection, **kwargs):
+    """ Receptor de connection_created: aplica SQLITE_PRAGMAS em conexões SQLite. """
+    if connection.vendor != 'sqlite':
+        return
+    pragmas = getattr(settings, 'SQLITE_PRAGMAS', {})
+    if not pragmas:
+        return
+    with connection.cursor() as cursor:
+        for name, value in pragmas.items():
+            if name == 'journal_mode' and connection.is_in_memory_db():
+                continue  # bancos em memória (testes) não usam WAL
+            cursor.execute(f'PRAGMA {name} = {value}')
+
+
+def _dispatch(execute, sql, params, many, context):
+    wrappers = _query_wrappers.get()
+    # Mesma ordem do Django: o primeiro wrapper é o mais externo
+    for wrapper in reversed(wrappers):
+        execute = functools.partial(wrapper, execute)
+    return execute(sql, params, many, context)
+
+
+def install_query_dispatcher(sender, connection, **kwargs):
+    """ Receptor de connection_created: liga a conexão aos wrappers de request_queries(). """
+    if _dispatch not in connection.execute_wrappers:
+        # No início: execute_wrapper() do Django desfaz com pop() do fim da lista
+        connection.execute_wrappers.insert(0, _dispatch)
+
+
+@contextmanager
+def request_queries(wrapper):
+    """
+    Aplica 'wrapper' (mesma assinatura de connection.execute_wrapper) às
+    consultas feitas dentro do bloco, em qualquer thread que herde o
+    contexto. O wrapper pode ser chamado de várias threads ao mesmo tempo.
+    """
+    token = _query_wrappers.set(_query_wrappers.get() + (wrapper,))
+    try:
+        yield
+    finally:
+        _query_wrappers.reset(token)
@@ -0,0 +1,221 @@
+# inventory/events.py
+
+"""
+Feed de mudanças em empréstimos e estoque (Server-Sent Events em /api/events/).
+
+As escritas publicam eventos pequenos num 'broker' em memória, depois do
+commit: pelos signals de Loan/Tool e, nos caminhos que não disparam signals
+(UPDATE em massa, bulk_create), por chamadas explícitas (stock, views,
+imports). Cada conexão SSE recebe os eventos pela sua fila no event loop.
+
+    loan.created   empréstimo completo (LoanSerializer)
+    loan.updated   empréstimo completo, após uma edição
+    loan.returned  {'id': ...}
+    loan.deleted   {'id': ...}
+    tool.stock     {'id', 'total_quantity', 'borrowed_quantity', 'available_quantity'}
+    reset          o cliente perdeu eventos e deve recarregar as listas
+
+Os ids são '<instância>-<sequência>'. Os últimos EVENTS['BUFFER_SIZE']
+ficam guardados: ao reconectar com Last-Event-ID o cliente recebe o que
+perdeu, ou 'reset' se o id for antigo demais ou de outro processo.
+
+O broker é por processo, como o LocMemCache: com vários workers cada um só
+vê as próprias escritas (use um único worker ASGI ou troque o broker por
+um pub/sub compartilhado, ex.: Redis).
+"""
+
+import asyncio
+import json
+import threading
+import uuid
+from collections import deque
+
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import transaction
+
+from .models import Tool
+from .serializers import LoanSerializer
+
+DEFAULTS = {
+    'HEARTBEAT': 15,       # segundos entre comentários ': ping' (mantém proxies e a conexão vivos)
+    'RETRY_MS': 3000,      # espera sugerida ao cliente antes de reconectar
+    'BUFFER_SIZE': 1000,   # eventos guardados para quem reconecta
+    'QUEUE_SIZE': 1000,    # eventos pendentes por conexão; acima disso ela recebe 'reset'
+}
+
+
+def get_setting(name):
+    return getattr(settings, 'EVENTS', {}).get(name, DEFAULTS[name])
+
+
+class Event:
+    __slots__ = ('id', 'type', 'data')
+
+    def __init__(self, id, type, data):
+        self.id = id
+        self.type = type
+        self.data = data
+
+    def encode(self):
+        data = json.dumps(self.data, cls=DjangoJSONEncoder, separators=(',', ':'))
+        return f'id: {self.id}\nevent: {self.type}\ndata: {data}\n\n'
+
+
+class Subscription:
+    def __init__(self, loop):
+        self.loop = loop
+        self.queue = asyncio.Queue(maxsize=get_setting('QUEUE_SIZE'))
+        self.overflowed = False
+        self.replay = []
+        self.reset = False
+
+    def offer(self, event):
+        # Roda no event loop da conexão (call_soon_threadsafe)
+        try:
+            self.queue.put_nowait(event)
+        except asyncio.QueueFull:
+            self.overflowed = True
+
+
+class Broker:
+    def __init__(self):
+        self.instance = uuid.uuid4().hex[:8]
+        self._sequence = 0
+        self._buffer = deque(maxlen=get_setting('BUFFER_SIZE'))  # (sequência, evento)
+        self._subscribers = set()
+        self._lock = threading.Lock()
+
+    @property
+    def last_id(self):
+        return f'{self.instance}-{self._sequence}'
+
+    def publish(self, type, data):
+        """ Pode ser chamado de qualquer thread. """
+        with self._lock:
+            self._sequence += 1
+            event = Event(f'{self.instance}-{self._sequence}', type, data)
+            self._buffer.append((self._sequence, event))
+            subscribers = list(self._subscribers)
+        for subscription in subscribers:
+            try:
+                subscription.loop.call_soon_threadsafe(subscription.offer, event)
+            except RuntimeError:  # event loop já encerrado
+                self.unsubscribe(subscription)
+        return event
+
+    def _sequence_of(self, event_id):
+        instance, _, sequence = (event_id or '').partition('-')
+        if instance != self.instance or not sequence.isdigit():
+            return None
+        return int(sequence)
+
+    def subscribe(self, last_event_id=None):
+        """ Nova inscrição no event loop atual, com os eventos perdidos desde 'last_event_id'. """
+        subscription = Subscription(asyncio.get_running_loop())
+        with self._lock:
+            if last_event_id:
+                sequence = self._sequence_of(last_event_id)
+                oldest = self._buffer[0][0] if self._buffer else self._sequence + 1
+                if sequence is None or sequence > self._sequence or sequence < oldest - 1:
+                    subscription.reset = True
+                else:
+                    subscription.replay = [event for seq, event in self._buffer if seq > sequence]
+            self._subscribers.add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription):
+        with self._lock:
+            self._subscribers.discard(subscription)
+
+
+broker = Broker()
+
+
+def _reset_event():
+    return Event(broker.last_id, 'reset', {}).encode()
+
+
+async def stream(last_event_id=None, accept=lambda event_type: True):
+    """ Corpo da resposta SSE; termina (e cancela a inscrição) quando o cliente desconecta. """
+    subscription = broker.subscribe(last_event_id)
+    try:
+        yield f"retry: {get_setting('RETRY_MS')}\n\n"
+        if subscription.reset:
+            yield _reset_event()
+        for event in subscription.replay:
+            if accept(event.type):
+                yield event.encode()
+        while True:
+            try:
+                event = await asyncio.wait_for(subscription.queue.get(), get_setting('HEARTBEAT'))
+            except asyncio.TimeoutError:
+                yield ': ping\n\n'
+                continue
+            if subscription.overflowed:
+                while not subscription.queue.empty():
+                    subscription.queue.get_nowait()
+                subscription.overflowed = False
+                yield _reset_event()
+                continue
+            if accept(event.type):
+                yield event.encode()
+    finally:
+        broker.unsubscribe(subscription)
+
+
+# --- Publicação (sempre após o commit) ---
+
+def _after_commit(publish):
+    transaction.on_commit(publish)
+
+
+def loan_saved(loan, created):
+    if not created and loan.returned_date is not None:
+        _after_commit(lambda: broker.publish('loan.returned', {'id': loan.pk}))
+        return
+    kind = 'loan.created' if created else 'loan.updated'
+    _after_commit(lambda: broker.publish(kind, LoanSerializer(loan).data))
+
+
+def loans_created(loans):
+    """ Para bulk_create, que não dispara post_save. """
+    def publish():
+        for loan in loans:
+            broker.publish('loan.created', LoanSerializer(loan).data)
+    _after_commit(publish)
+
+
+def loans_returned(loan_ids):
+    """ Para devoluções por UPDATE condicional, que não disparam post_save. """
+    def publish():
+        for pk in loan_ids:
+            broker.publish('loan.returned', {'id': pk})
+    _after_commit(publish)
+
+
+def loan_deleted(loan_id):
+    _after_commit(lambda: broker.publish('loan.deleted', {'id': loan_id}))
+
+
+def _stock(pk, total_quantity, borrowed_quantity):
+    return {
+        'id': pk,
+        'total_quantity': total_quantity,
+        'borrowed_quantity': borrowed_quantity,
+        'available_quantity': total_quantity - borrowed_quantity,
+    }
+
+
+def stock_changed(tool_ids):
+    """
+    Publica o estoque atual das ferramentas, lido depois do commit: o
+    contador só muda por UPDATE em massa e a instância em memória pode estar
+    desatualizada.
+    """
+    tool_ids = list(tool_ids)
+
+    def publish():
+        for row in Tool.objects.filter(pk__in=tool_ids).values_list('pk', 'total_quantity', 'borrowed_quantity'):
+            broker.publish('tool.stock', _stock(*row))
+    _after_commit(publish)
@@ -0,0 +1,130 @@
+# inventory/exports.py
+
+import csv
+import zlib
+
+from django.utils import timezone
+
+from .models import Tool, Loan, Employee
+
+# Linhas buscadas por vez do banco: memória constante mesmo com milhões de linhas
+CHUNK_SIZE = 2000
+
+TOOL_HEADER = [
+    'Nome', 'Descrição', 'Quantidade Total', 'Quantidade Disponível', 'Condição',
+    'Valor Unitário', 'Data de Aquisição', 'Custo de Manutenção', 'Última Manutenção',
+    'Próxima Manutenção', 'Fornecedor',
+]
+ACTIVE_LOANS_HEADER = [
+    'Ferramenta', 'Mutuário', 'Quantidade', 'Data do Empréstimo', 'Data de Vencimento', 'Status',
+]
+LOAN_HISTORY_HEADER = [
+    'Ferramenta', 'Mutuário', 'Quantidade', 'Data do Empréstimo', 'Data de Vencimento', 'Data de Devolução',
+]
+EMPLOYEE_HEADER = ['Nome', 'Matrícula']
+
+
+def _date_range(queryset, field, date_from=None, date_to=None):
+    if date_from:
+        queryset = queryset.filter(**{f'{field}__gte': date_from})
+    if date_to:
+        queryset = queryset.filter(**{f'{field}__lte': date_to})
+    return queryset
+
+
+def tool_rows(date_from=None, date_to=None):
+    """ Cabeçalho + uma linha por ferramenta (filtro pela data de aquisição). """
+    conditions = dict(Tool.CONDITION_CHOICES)
+    tools = _date_range(Tool.objects.all(), 'acquisition_date', date_from, date_to).order_by('name', 'id')
+    yield TOOL_HEADER
+    for row in tools.values_list(
+        'name', 'description', 'total_quantity', 'borrowed_quantity', 'condition',
+        'unit_value', 'acquisition_date', 'maintenance_cost', 'last_maintenance_date',
+        'next_maintenance_date', 'supplier',
+    ).iterator(chunk_size=CHUNK_SIZE):
+        (name, description, total, borrowed, condition, unit_value, acquisition_date,
+         maintenance_cost, last_maintenance, next_maintenance, supplier) = row
+        yield [
+            name, description, total, total - borrowed, conditions.get(condition, condition),
+            unit_value, acquisition_date, maintenance_cost, last_maintenance, next_maintenance, supplier,
+        ]
+
+
+def active_loan_rows(date_from=None, date_to=None):
+    """ Cabeçalho + empréstimos ativos, marcando os atrasados (filtro pela data do empréstimo). """
+    today = timezone.now().date()
+    loans = _date_range(Loan.objects.filter(returned_date__isnull=True), 'borrowed_date', date_from, date_to)
+    yield ACTIVE_LOANS_HEADER
+    for tool_name, employee_name, quantity, borrowed_date, due_date in loans.order_by('borrowed_date', 'id').values_list(
+        'tool__name', 'employee__name', 'quantity', 'borrowed_date', 'due_date',
+    ).iterator(chunk_size=CHUNK_SIZE):
+        status = 'Atrasado' if due_date < today else 'Ativo'
+        yield [tool_name, employee_name, quantity, borrowed_date, due_date, status]
+
+
+def loan_history_rows(date_from=None, date_to=None):
+    """ Cabeçalho + empréstimos concluídos (filtro pela data do empréstimo). """
+    loans = _date_range(Loan.objects.filter(returned_date__isnull=False), 'borrowed_date', date_from, date_to)
+    yield LOAN_HISTORY_HEADER
+    yield from loans.order_by('borrowed_date', 'id').values_list(
+        'tool__name', 'employee__name', 'quantity', 'borrowed_date', 'due_date', 'returned_date',
+    ).iterator(chunk_size=CHUNK_SIZE)
+
+
+def employee_rows(date_from=None, date_to=None):
+    """ Cabeçalho + funcionários (sem filtro de data; mesmo layout aceito pela importação). """
+    yield EMPLOYEE_HEADER
+    yield from Employee.objects.order_by('name', 'id').values_list(
+        'name', 'registration_number',
+    ).iterator(chunk_size=CHUNK_SIZE)
+
+
+# Nome da exportação -> (gerador de linhas, nome do arquivo baixado)
+EXPORTS = {
+    'tools': (tool_rows, 'ferramentas.csv'),
+    'employees': (employee_rows, 'funcionarios.csv'),
+    'active-loans': (active_loan_rows, 'emprestimos_ativos.csv'),
+    'loan-history': (loan_history_rows, 'historico_emprestimos.csv'),
+}
+
+
+class _Echo:
+    """ Pseudo-arquivo para o csv.writer: devolve a linha em vez de guardá-la. """
+
+    def write(self, value):
+        return value
+
+
+def iter_csv(rows):
+    """ Converte as linhas em texto CSV, uma linha por vez. """
+    writer = csv.writer(_Echo())
+    for row in rows:
+        yield writer.writerow(row)
+
+
+def iter_encoded(lines, gzip=False, block_size=64 * 1024):
+    """
+    Codifica o CSV em UTF-8 e, opcionalmente, comprime em gzip de forma
+    incremental. O cabeçalho sai imediatamente; depois as linhas são
+    agrupadas em blocos para não enviar um pedaço minúsculo por linha.
+    """
+    compressor = zlib.compressobj(6, zlib.DEFLATED, 31) if gzip else None
+
+    def encode(text, final=False):
+        data = text.encode('utf-8')
+        if compressor is None:
+            return data
+        return compressor.compress(data) + compressor.flush(zlib.Z_FINISH if final else zlib.Z_SYNC_FLUSH)
+
+    buffer = []
+    size = 0
+    first = True
+    for line in lines:
+        buffer.append(line)
+        size += len(line)
+        if first or size >= block_size:
+            yield encode(''.join(buffer))
+            buffer, size, first = [], 0, False
+    data = encode(''.join(buffer), final=True)
+    if data:
+        yield data
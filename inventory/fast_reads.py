@@ -0,0 +1,286 @@
+# inventory/fast_reads.py
+
+"""
+Caminho rápido de leitura das listas de ferramentas e empréstimos
+(GET /api/tools/, /api/loans/ e as ações active_loans, overdue_loans e
+loan_history).
+
+O caminho normal cria uma instância do model por linha e passa cada campo
+pelo serializer. Aqui as linhas vêm de values_list() e um RowReader,
+montado a partir do serializer da view, converte cada tupla com uma função
+já escolhida para cada campo: itemgetter para o que sai como está,
+isoformat para datas, o to_representation do campo só onde é preciso
+(ex.: Decimal). A saída é a mesma do serializer, inclusive com '?fields='
+/ '?expand=' e as chaves que ele omite quando a relação é nula.
+
+FastJSONRenderer escreve o JSON com orjson, se estiver instalado, com os
+mesmos bytes do JSONRenderer do DRF. Com '?format=columnar' as listas saem
+em colunas, sem repetir as chaves em cada linha:
+
+    {"next": ..., "columns": ["id", "name", ...], "rows": [[1, "Alicate", ...], ...]}
+
+FAST_READS['ENABLED'] = False volta ao serializer em todas as listas.
+'python manage.py benchmark_endpoints --read-paths' compara os dois caminhos.
+"""
+
+import operator
+
+from django.conf import settings
+from rest_framework import ISO_8601
+from rest_framework import fields as drf_fields
+from rest_framework import relations
+from rest_framework.renderers import BrowsableAPIRenderer, JSONRenderer
+from rest_framework.response import Response
+from rest_framework.settings import api_settings
+from rest_framework.utils.encoders import JSONEncoder
+
+from . import images
+from .serializers import ToolSerializer
+
+try:
+    import orjson
+except ImportError:  # opcional: sem ele o JSON sai pelo json da biblioteca padrão
+    orjson = None
+
+DEFAULTS = {
+    'ENABLED': True,
+}
+
+
+def get_setting(name):
+    return getattr(settings, 'FAST_READS', {}).get(name, DEFAULTS[name])
+
+
+# --- Renderização ---
+
+_encoder = JSONEncoder()
+# Datas, Decimal e textos traduzíveis passam pelo encoder do DRF: mesmo formato
+_ORJSON_OPTIONS = orjson.OPT_PASSTHROUGH_DATETIME if orjson is not None else 0
+_LINE_SEPARATORS = ((b'\xe2\x80\xa8', b'\\u2028'), (b'\xe2\x80\xa9', b'\\u2029'))
+
+
+class FastJSONRenderer(JSONRenderer):
+    """
+    JSONRenderer que usa orjson na saída compacta padrão. JSON indentado,
+    dados que o orjson recusa (ex.: inteiros acima de 64 bits) ou a falta
+    do pacote caem no JSONRenderer. Floats podem sair em outra notação
+    (1e16 em vez de 1e+16); as listas que o usam não têm campos float.
+    """
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if (orjson is None or data is None or self.ensure_ascii or not self.compact
+                or self.get_indent(accepted_media_type, renderer_context or {}) is not None):
+            return super().render(data, accepted_media_type, renderer_context)
+        try:
+            ret = orjson.dumps(data, default=_encoder.default, option=_ORJSON_OPTIONS)
+        except orjson.JSONEncodeError:
+            return super().render(data, accepted_media_type, renderer_context)
+        # Como o DRF: U+2028 e U+2029 escapados, para o JSON ser JavaScript válido
+        for raw, escaped in _LINE_SEPARATORS:
+            if raw in ret:
+                ret = ret.replace(raw, escaped)
+        return ret
+
+
+class Table:
+    """ Linhas já em colunas, como o RowReader as produz para '?format=columnar'. """
+    __slots__ = ('columns', 'rows')
+
+    def __init__(self, columns, rows):
+        self.columns = columns
+        self.rows = rows
+
+
+def _is_rows(value):
+    return isinstance(value, Table) or (isinstance(value, list) and all(isinstance(item, dict) for item in value))
+
+
+def to_columns(items):
+    """ {'columns': [...], 'rows': [[...], ...]} de uma Table ou lista de dicts. """
+    if isinstance(items, Table):
+        return {'columns': items.columns, 'rows': items.rows}
+    columns = list(dict.fromkeys(key for item in items for key in item))
+    return {'columns': columns, 'rows': [[item.get(key) for key in columns] for item in items]}
+
+
+class ColumnarJSONRenderer(FastJSONRenderer):
+    """
+    '?format=columnar': listas como colunas e linhas ('next' continua ao
+    lado, se paginada). Chave omitida numa linha vira null. Respostas que
+    não são listas (detalhe, erros) saem como JSON comum.
+    """
+    format = 'columnar'
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if isinstance(data, dict) and _is_rows(data.get('results')):
+            data = {**{key: value for key, value in data.items() if key != 'results'}, **to_columns(data['results'])}
+        elif _is_rows(data):
+            data = to_columns(data)
+        return super().render(data, accepted_media_type, renderer_context)
+
+
+# --- Conversão das linhas ---
+
+_SKIP = object()  # campo que o serializer omitiria nesta linha (relação nula)
+
+
+def _not_null(function, index):
+    def convert(row):
+        value = row[index]
+        return None if value is None else function(value)
+    return convert
+
+
+def _unless_null(relation_index, convert):
+    # Como o DRF: 'employee.name' com employee nulo some da resposta (SkipField)
+    def skip(row):
+        return _SKIP if row[relation_index] is None else convert(row)
+    return skip
+
+
+def _renditions(size):
+    def factory(position, request):
+        image, renditions = position['image'], position['image_renditions']
+        build_url = request.build_absolute_uri if request is not None else None
+        return lambda row: images.renditions_from(row[image], row[renditions], build_url).get(size)
+    return factory
+
+
+# Campos calculados, que não vêm de uma coluna: factory(posição das colunas, request) -> função(linha)
+ROW_FUNCTIONS = {
+    ToolSerializer: {
+        'available_quantity': lambda position, request: (
+            lambda row, total=position['total_quantity'], borrowed=position['borrowed_quantity']: row[total] - row[borrowed]
+        ),
+        'image_thumb': _renditions('thumb'),
+        'image_card': _renditions('card'),
+        'image_full': _renditions('full'),
+    },
+}
+
+# Campos cuja saída é o próprio valor da coluna
+_AS_IS = (drf_fields.IntegerField, drf_fields.CharField, drf_fields.ChoiceField,
+          drf_fields.ReadOnlyField, relations.PrimaryKeyRelatedField)
+
+_templates = {}
+
+
+def _template_fields(serializer_class):
+    # Campos do serializer sem request: tipos e to_representation independem dela
+    if serializer_class not in _templates:
+        _templates[serializer_class] = serializer_class().fields
+    return _templates[serializer_class]
+
+
+class RowReader:
+    """
+    Colunas a buscar com values_list() e a conversão de cada linha nos
+    campos 'names' do serializer. build() devolve None se algum campo não
+    tiver conversão conhecida; a view então usa o serializer.
+    """
+
+    def __init__(self, keys, columns, getters, optional):
+        self.keys = keys
+        self.columns = columns
+        self.getters = getters
+        self.optional = optional
+
+    @classmethod
+    def build(cls, serializer_class, names, request=None, extra=()):
+        fields = _template_fields(serializer_class)
+        sources = serializer_class._sources()
+        model = serializer_class.Meta.model
+        columns = list(dict.fromkeys(extra))
+        for name in names:
+            for column in sources[name]:
+                if '__' in column:
+                    columns.append(column.split('__', 1)[0])
+                columns.append(column)
+        columns = list(dict.fromkeys(columns))
+        position = {column: index for index, column in enumerate(columns)}
+
+        getters, optional = [], False
+        for name in names:
+            getter = cls._compile(serializer_class, model, name, fields[name], sources[name], position, request)
+            if getter is None:
+                return None
+            field_name = fields[name].source.split('.')[0]
+            if '.' in fields[name].source and model._meta.get_field(field_name).null:
+                getter = _unless_null(position[field_name], getter)
+                optional = True
+            getters.append(getter)
+        return cls(list(names), columns, getters, optional)
+
+    @staticmethod
+    def _compile(serializer_class, model, name, field, columns, position, request):
+        factory = ROW_FUNCTIONS.get(serializer_class, {}).get(name)
+        if factory is not None:
+            return factory(position, request)
+        if len(columns) != 1:
+            return None
+        index = position[columns[0]]
+        source = field.source
+        if source.startswith('get_') and source.endswith('_display'):
+            labels = {key: str(label) for key, label in model._meta.get_field(source[4:-8]).flatchoices}
+            return _not_null(lambda value: labels.get(value, str(value)), index)
+        if isinstance(field, drf_fields.FileField):
+            storage = model._meta.get_field(source).storage
+            build_url = request.build_absolute_uri if request is not None else (lambda url: url)
+            return lambda row: build_url(storage.url(row[index])) if row[index] else None
+        if isinstance(field, drf_fields.DateField) and getattr(field, 'format', api_settings.DATE_FORMAT) == ISO_8601:
+            return _not_null(lambda value: value.isoformat(), index)
+        if isinstance(field, _AS_IS):
+            return operator.itemgetter(index)
+        if isinstance(field, drf_fields.SerializerMethodField):
+            return None
+        return _not_null(field.to_representation, index)
+
+    def dicts(self, rows):
+        keys, getters = self.keys, self.getters
+        if self.optional:
+            return [{key: value for key, value in zip(keys, [get(row) for get in getters]) if value is not _SKIP}
+                    for row in rows]
+        return [dict(zip(keys, [get(row) for get in getters])) for row in rows]
+
+    def table(self, rows):
+        getters = self.getters
+        values = [[get(row) for get in getters] for row in rows]
+        if self.optional:
+            values = [[None if value is _SKIP else value for value in row] for row in values]
+        return Table(self.keys, values)
+
+
+class FastListMixin:
+    """
+    Listas do ViewSet pelo caminho rápido: 'list' e, nas ações de lista,
+    list_response(queryset). No navegador da API (format=api) ou com
+    FAST_READS['ENABLED'] = False a resposta passa pelo serializer.
+    """
+    renderer_classes = [FastJSONRenderer, ColumnarJSONRenderer, BrowsableAPIRenderer]
+
+    def list(self, request, *args, **kwargs):
+        return self.list_response(self.filter_queryset(self.get_queryset()))
+
+    def row_reader(self):
+        if not get_setting('ENABLED') or self.request.accepted_renderer.format not in ('json', 'columnar'):
+            return None
+        serializer_class = self.get_serializer_class()
+        names = serializer_class.requested_fields(self.request) or list(_template_fields(serializer_class))
+        ordering = [name.lstrip('-') for name in getattr(self.paginator, 'ordering', ())]
+        return RowReader.build(serializer_class, names, self.request, extra=ordering)
+
+    def list_response(self, queryset):
+        reader = self.row_reader()
+        if reader is None:
+            page = self.paginate_queryset(queryset)
+            if page is not None:
+                return self.get_paginated_response(self.get_serializer(page, many=True).data)
+            return Response(self.get_serializer(queryset, many=True).data)
+
+        # Tuplas nomeadas: a paginação lê as colunas de ordenação da última linha pelo nome
+        rows = queryset.values_list(*reader.columns, named=True)
+        convert = reader.table if self.request.accepted_renderer.format == 'columnar' else reader.dicts
+        page = self.paginate_queryset(rows)
+        if page is not None:
+            return self.get_paginated_response(convert(page))
+        return Response(convert(rows))
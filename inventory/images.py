@@ -0,0 +1,159 @@
+# inventory/images.py
+
+"""
+Versões redimensionadas das fotos de ferramentas (Tool.image).
+
+A foto enviada fica como está; a partir dela são geradas as versões de
+IMAGES['RENDITIONS'] (miniatura, card e ampliada), cada uma em WebP e JPEG.
+O nome dos arquivos é o hash do conteúdo da foto original: a mesma foto
+enviada duas vezes reaproveita os arquivos, e como um nome nunca muda de
+conteúdo eles podem ser servidos com cache 'immutable'.
+
+O processamento roda fora da requisição, como tarefa 'tool-images' da fila
+de inventory.jobs (ver o signal em inventory.signals); o comando
+build_tool_images gera as versões das fotos já existentes.
+"""
+
+import hashlib
+import os
+from pathlib import Path
+
+from django.conf import settings
+from django.core.files.storage import default_storage
+from django.views.static import serve
+from PIL import Image, ImageOps
+
+from . import versions
+from .models import Tool
+
+DEFAULTS = {
+    # nome -> maior lado em pixels (a imagem nunca é ampliada)
+    'RENDITIONS': {'thumb': 160, 'card': 480, 'full': 1600},
+    'WEBP_QUALITY': 80,
+    'JPEG_QUALITY': 82,
+    'DIR': 'tool_images/renditions',
+    # Limite contra "bombas" de descompressão (imagens pequenas no disco,
+    # gigantes na memória). Conferido aqui, sem mudar o Image.MAX_IMAGE_PIXELS
+    # do Pillow, que vale para o processo inteiro.
+    'MAX_PIXELS': 50_000_000,
+}
+
+
+def get_setting(name):
+    return getattr(settings, 'IMAGES', {}).get(name, DEFAULTS[name])
+
+
+def content_hash(path, block_size=1024 * 1024):
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(block_size), b''):
+            digest.update(block)
+    return digest.hexdigest()[:24]
+
+
+def _flatten(image):
+    """ RGB sem transparência (fundo branco), aceito pelo JPEG. """
+    if image.mode in ('RGBA', 'LA') or (image.mode == 'P' and 'transparency' in image.info):
+        image = image.convert('RGBA')
+        background = Image.new('RGB', image.size, (255, 255, 255))
+        background.paste(image, mask=image.getchannel('A'))
+        return background
+    return image.convert('RGB')
+
+
+def render_file(source, media_root, options):
+    """
+    Gera as versões de 'source' em 'media_root' e devolve o dicionário
+    guardado em Tool.image_renditions. Não usa o banco nem o Django, para
+    rodar também nos processos do build_tool_images.
+    """
+    digest = content_hash(source)
+    directory = Path(media_root) / options['DIR']
+    directory.mkdir(parents=True, exist_ok=True)
+    renditions = {}
+    with Image.open(source) as original:
+        # open() só lê o cabeçalho: o tamanho é conhecido antes de decodificar
+        if original.width * original.height > options['MAX_PIXELS']:
+            raise Image.DecompressionBombError(
+                f"Imagem com {original.width}x{original.height} pixels, acima de IMAGES['MAX_PIXELS']."
+            )
+        image = _flatten(ImageOps.exif_transpose(original))
+        for name, size in sorted(options['RENDITIONS'].items(), key=lambda item: -item[1]):
+            image.thumbnail((size, size), Image.LANCZOS)  # do maior para o menor: cada passo parte do anterior
+            entry = {'width': image.width, 'height': image.height}
+            for fmt, ext, save_options in (
+                ('WEBP', 'webp', {'quality': options['WEBP_QUALITY'], 'method': 4}),
+                ('JPEG', 'jpg', {'quality': options['JPEG_QUALITY'], 'optimize': True, 'progressive': True}),
+            ):
+                relative = f"{options['DIR']}/{digest}-{name}.{ext}"
+                target = Path(media_root) / relative
+                if not target.exists():  # mesmo conteúdo já processado antes
+                    tmp = target.with_name(f'{target.name}.{os.getpid()}.tmp')
+                    image.save(tmp, fmt, **save_options)
+                    tmp.replace(target)
+                entry[ext if ext == 'webp' else 'jpeg'] = relative
+            renditions[name] = entry
+    return {'hash': digest, **renditions}
+
+
+def render_options():
+    return {name: get_setting(name) for name in DEFAULTS}
+
+
+def save_renditions(tool_id, image_name, renditions):
+    """ Grava o resultado, desde que a foto não tenha sido trocada nesse meio tempo. """
+    updated = Tool.objects.filter(pk=tool_id, image=image_name).update(
+        image_renditions={'source': image_name, **renditions},
+    )
+    if updated:
+        versions.bump('tool')
+    return bool(updated)
+
+
+def process_tool(tool_id):
+    tool = Tool.objects.filter(pk=tool_id).only('image').first()
+    if tool is None or not tool.image:
+        return False
+    renditions = render_file(default_storage.path(tool.image.name), settings.MEDIA_ROOT, render_options())
+    return save_renditions(tool_id, tool.image.name, renditions)
+
+
+def run_tool_images(job):
+    """ Tarefa 'tool-images' da fila (params: {'tool_id': ...}). Não gera arquivo de resultado. """
+    process_tool(job.params['tool_id'])
+    return ''
+
+
+def needs_renditions(tool):
+    return bool(tool.image) and (tool.image_renditions or {}).get('source') != tool.image.name
+
+
+def rendition_urls(tool, build_url=None):
+    """ {'thumb': {'webp': url, 'jpeg': url, 'width': ..., 'height': ...}, ...} ou {} se ainda não há versões. """
+    return renditions_from(tool.image.name if tool.image else None, tool.image_renditions, build_url)
+
+
+def renditions_from(image_name, renditions, build_url=None):
+    """ rendition_urls() a partir das colunas 'image' e 'image_renditions' (ex.: linhas de values_list). """
+    renditions = renditions or {}
+    if not image_name or renditions.get('source') != image_name:
+        return {}
+    build_url = build_url or (lambda url: url)
+    result = {}
+    for name in get_setting('RENDITIONS'):
+        entry = renditions.get(name)
+        if entry:
+            result[name] = {
+                'webp': build_url(default_storage.url(entry['webp'])),
+                'jpeg': build_url(default_storage.url(entry['jpeg'])),
+                'width': entry['width'],
+                'height': entry['height'],
+            }
+    return result
+
+
+def serve_immutable(request, path, document_root=None, show_indexes=False):
+    """ static.serve com cache longo: nomes por hash de conteúdo nunca mudam. """
+    response = serve(request, path, document_root=document_root, show_indexes=show_indexes)
+    response['Cache-Control'] = 'public, max-age=31536000, immutable'
+    return response
@@ -0,0 +1,324 @@
+# inventory/imports.py
+
+"""
+Importação em massa de ferramentas e funcionários a partir de CSV, no
+mesmo layout gerado pelas exportações (inventory.exports).
+
+O arquivo é lido linha a linha e processado em lotes de BATCH_SIZE: cada
+lote é validado, gravado numa transação (bulk_create / bulk_update) e
+descartado, então a memória não cresce com o tamanho do arquivo.
+
+Chaves naturais: funcionários pela matrícula (upsert com
+bulk_create(update_conflicts=True)); ferramentas pelo nome, resolvido com
+uma consulta por lote, pois o nome não é único no banco. Ao atualizar uma
+ferramenta, células vazias (como colunas ausentes) mantêm o valor atual;
+os valores padrão valem só para ferramentas novas.
+"""
+
+import csv
+from decimal import Decimal, InvalidOperation
+
+from django.db import transaction
+from django.utils import timezone
+from django.utils.dateparse import parse_date
+
+from . import events, rollups, versions
+from .exports import EMPLOYEE_HEADER, TOOL_HEADER
+from .models import Employee, MaintenanceEvent, Tool
+from .reports import invalidate_dashboard
+
+BATCH_SIZE = 1000
+MAX_ERRORS = 1000  # erros detalhados no relatório; os demais só são contados
+
+TOOL_COLUMNS = dict(zip(TOOL_HEADER, [
+    'name', 'description', 'total_quantity', None, 'condition', 'unit_value',
+    'acquisition_date', 'maintenance_cost', 'last_maintenance_date',
+    'next_maintenance_date', 'supplier',
+]))
+EMPLOYEE_COLUMNS = dict(zip(EMPLOYEE_HEADER, ['name', 'registration_number']))
+CONDITIONS = {label.lower(): key for key, label in Tool.CONDITION_CHOICES}
+CONDITIONS.update({key: key for key, _ in Tool.CONDITION_CHOICES})
+
+
+class ImportFileError(Exception):
+    """ Arquivo inválido como um todo (ex.: falta a coluna obrigatória). """
+
+
+class RowError(Exception):
+    def __init__(self, errors):
+        self.errors = errors
+        super().__init__(errors)
+
+
+class ImportResult:
+    def __init__(self):
+        self.rows = 0
+        self.created = 0
+        self.updated = 0
+        self.error_count = 0
+        self.errors = []
+
+    def add_error(self, line, errors):
+        self.error_count += 1
+        if len(self.errors) < MAX_ERRORS:
+            self.errors.append({'row': line, 'errors': errors})
+
+    def as_dict(self):
+        return {
+            'rows': self.rows,
+            'created': self.created,
+            'updated': self.updated,
+            'error_count': self.error_count,
+            'errors': self.errors,
+        }
+
+
+# --- Conversão de células ---
+
+def _text(value, max_length=None, required=False):
+    value = value.strip()
+    if required and not value:
+        raise ValueError("Campo obrigatório.")
+    if max_length and len(value) > max_length:
+        raise ValueError(f"Máximo de {max_length} caracteres.")
+    return value or None
+
+
+def _int(value):
+    value = value.strip()
+    if not value:
+        return 0
+    number = int(value)
+    if number < 0:
+        raise ValueError("Não pode ser negativo.")
+    return number
+
+
+def _decimal(value):
+    value = value.strip()
+    if not value:
+        return None
+    if ',' in value and '.' not in value:
+        value = value.replace(',', '.')  # "12,50" de planilhas em português
+    try:
+        number = Decimal(value)
+    except InvalidOperation:
+        raise ValueError("Número inválido.")
+    if number < 0 or number >= 10 ** 8:
+        raise ValueError("Valor fora do intervalo permitido.")
+    return number.quantize(Decimal('0.01'))
+
+
+def _date(value):
+    value = value.strip()
+    if not value:
+        return None
+    day = parse_date(value)
+    if day is None:
+        raise ValueError("Data inválida, use AAAA-MM-DD.")
+    return day
+
+
+def _condition(value):
+    value = value.strip()
+    if not value:
+        return 'good'
+    try:
+        return CONDITIONS[value.lower()]
+    except KeyError:
+        raise ValueError("Condição inválida.")
+
+
+TOOL_PARSERS = {
+    'name': lambda v: _text(v, 255, required=True),
+    'description': _text,
+    'total_quantity': _int,
+    'condition': _condition,
+    'unit_value': lambda v: _decimal(v) or Decimal('0.00'),
+    'acquisition_date': _date,
+    'maintenance_cost': _decimal,
+    'last_maintenance_date': _date,
+    'next_maintenance_date': _date,
+    'supplier': lambda v: _text(v, 255),
+}
+EMPLOYEE_PARSERS = {
+    'name': lambda v: _text(v, 255, required=True),
+    'registration_number': lambda v: _text(v, 50, required=True),
+}
+
+
+def _parse_row(row, columns, parsers):
+    """ (valores, campos com célula vazia); os vazios recebem o padrão do parser. """
+    values, blank, errors = {}, set(), {}
+    for index, field in columns:
+        cell = row[index] if index < len(row) else ''
+        if not cell.strip():
+            blank.add(field)
+        try:
+            values[field] = parsers[field](cell)
+        except ValueError as exc:
+            errors[field] = str(exc)
+    if errors:
+        raise RowError(errors)
+    return values, blank
+
+
+# --- Leitura em lotes ---
+
+def _reader(lines):
+    lines = iter(lines)
+    first = next(lines, '')
+    delimiter = ';' if first.count(';') > first.count(',') else ','
+    return csv.reader(_chain(first, lines), delimiter=delimiter)
+
+
+def _chain(first, rest):
+    yield first
+    yield from rest
+
+
+def _batches(lines, header_map, parsers, required, result, batch_size):
+    """ Lotes de (linha, valores, campos vazios) já validados; erros vão para 'result'. """
+    reader = _reader(lines)
+    header = [name.strip() for name in next(reader, [])]
+    columns = [(index, header_map[name]) for index, name in enumerate(header) if header_map.get(name)]
+    present = {field for _, field in columns}
+    missing = [name for name, field in header_map.items() if field in required and field not in present]
+    if missing:
+        raise ImportFileError(f"Coluna obrigatória ausente: {', '.join(missing)}.")
+
+    batch = []
+    for row in reader:
+        if not any(cell.strip() for cell in row):
+            continue
+        result.rows += 1
+        try:
+            batch.append((reader.line_num, *_parse_row(row, columns, parsers)))
+        except RowError as exc:
+            result.add_error(reader.line_num, exc.errors)
+        if len(batch) >= batch_size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+# --- Ferramentas ---
+
+def _apply_maintenance_rule(values, blank, result, line):
+    """ Mesma regra do ToolSerializer para ferramentas 'Em Manutenção'. """
+    if values.get('condition') != 'maintenance':
+        return True
+    if not values.get('maintenance_cost'):
+        result.add_error(line, {'maintenance_cost': "Obrigatório e positivo para ferramentas em manutenção."})
+        return False
+    values['total_quantity'] = 0
+    values['last_maintenance_date'] = values.get('last_maintenance_date') or timezone.now().date()
+    blank -= {'total_quantity', 'last_maintenance_date'}  # definidos pela regra, gravados também na atualização
+    return True
+
+
+def _plan_tool_batch(rows, result, tools):
+    """
+    Separa as linhas em ferramentas novas e atualizadas. 'tools' é o
+    queryset das existentes: com select_for_update() na gravação, para que
+    nenhum empréstimo mude borrowed_quantity entre a checagem e o update.
+    """
+    existing = {}
+    stored = tools.filter(name__in=rows).order_by('-id').values_list(
+        'name', 'id', 'borrowed_quantity', 'last_maintenance_date', 'condition', 'maintenance_cost',
+    )
+    for name, *current in stored:
+        existing[name] = current  # o menor id prevalece
+
+    new, changed, maintenance = [], [], []
+    for name, (line, values, blank) in rows.items():
+        if name not in existing:
+            new.append(Tool(**values))
+            continue
+        pk, borrowed, last_maintenance, condition, cost = existing[name]
+        values = {field: value for field, value in values.items() if field not in blank}
+        if 'total_quantity' in values and values['total_quantity'] < borrowed:
+            result.add_error(line, {'total_quantity': f"Menor que as {borrowed} unidade(s) emprestada(s)."})
+            continue
+        # Condição e custo atuais completam o evento de manutenção; só 'values' é gravado
+        changed.append(Tool(pk=pk, **{'condition': condition, 'maintenance_cost': cost, **values}))
+        changed[-1]._imported = values.keys()
+        if values.get('last_maintenance_date') and values['last_maintenance_date'] != last_maintenance:
+            maintenance.append(changed[-1])
+
+    result.created += len(new)
+    result.updated += len(changed)
+    return new, changed, maintenance
+
+
+def _import_tool_batch(batch, result, dry_run):
+    rows = {}
+    for line, values, blank in batch:  # nome repetido no lote: vale a última linha
+        if _apply_maintenance_rule(values, blank, result, line):
+            rows[values['name']] = (line, values, blank)
+
+    if dry_run:
+        _plan_tool_batch(rows, result, Tool.objects.all())
+        return
+
+    with transaction.atomic():
+        new, changed, maintenance = _plan_tool_batch(rows, result, Tool.objects.select_for_update())
+        Tool.objects.bulk_create(new, batch_size=BATCH_SIZE)
+        # Colunas ausentes do arquivo ou vazias na linha mantêm o valor atual
+        fields = sorted({field for tool in changed for field in tool._imported} - {'name'})
+        if fields:
+            Tool.objects.bulk_update(changed, fields, batch_size=BATCH_SIZE)
+        # Histórico (record_maintenance nas views): um evento por nova data de manutenção
+        maintenance_events = MaintenanceEvent.objects.bulk_create(
+            MaintenanceEvent(tool_id=tool.pk, date=tool.last_maintenance_date,
+                             cost=tool.maintenance_cost, condition=tool.condition)
+            for tool in [t for t in new if t.last_maintenance_date] + maintenance
+        )
+        rollups.maintenance_events_created(maintenance_events)
+        versions.bump('tool', 'maintenanceevent')
+        events.stock_changed(tool.pk for tool in new + changed)
+
+
+def import_tools(lines, dry_run=False, batch_size=BATCH_SIZE):
+    result = ImportResult()
+    for batch in _batches(lines, TOOL_COLUMNS, TOOL_PARSERS, {'name'}, result, batch_size):
+        _import_tool_batch(batch, result, dry_run)
+    if not dry_run:
+        invalidate_dashboard()
+    return result
+
+
+# --- Funcionários ---
+
+def _import_employee_batch(batch, result, dry_run):
+    rows = {values['registration_number']: values for _, values, _ in batch}
+    known = set(Employee.objects.filter(registration_number__in=rows).values_list('registration_number', flat=True))
+    result.created += len(rows) - len(known)
+    result.updated += len(known)
+    if dry_run:
+        return
+    with transaction.atomic():
+        Employee.objects.bulk_create(
+            (Employee(**values) for values in rows.values()),
+            batch_size=BATCH_SIZE,
+            update_conflicts=True,
+            unique_fields=['registration_number'],
+            update_fields=['name'],
+        )
+        versions.bump('employee')
+
+
+def import_employees(lines, dry_run=False, batch_size=BATCH_SIZE):
+    result = ImportResult()
+    required = {'name', 'registration_number'}
+    for batch in _batches(lines, EMPLOYEE_COLUMNS, EMPLOYEE_PARSERS, required, result, batch_size):
+        _import_employee_batch(batch, result, dry_run)
+    return result
+
+
+# Nome da importação -> função (mesmos nomes das exportações)
+IMPORTS = {
+    'tools': import_tools,
+    'employees': import_employees,
+}
@@ -0,0 +1,223 @@
+# inventory/jobs.py
+
+"""
+Fila de tarefas em segundo plano guardada no próprio banco (modelo Job).
+
+Não depende de broker externo: o worker ('python manage.py run_jobs') busca
+tarefas pendentes, reserva cada uma com um UPDATE condicional e as executa
+num pool de threads com limite de concorrência. Tarefas que falham voltam
+para a fila com espera crescente até 'MAX_ATTEMPTS'. Periodicamente o
+worker apaga os resultados expirados e devolve à fila as tarefas presas em
+'running' há mais de 'STALE_AFTER' (worker ou thread que morreu).
+"""
+
+import json
+import logging
+import shutil
+import threading
+import traceback
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+from pathlib import Path
+
+from django.conf import settings
+from django.db import connections
+from django.db.models import F
+from django.utils import timezone
+from rest_framework.utils.encoders import JSONEncoder
+
+from .exports import EXPORTS, iter_csv, iter_encoded
+from .images import run_tool_images
+from .models import Job
+from .reports import analytics_data
+
+logger = logging.getLogger(__name__)
+
+DEFAULTS = {
+    'MAX_CONCURRENCY': 2,   # tarefas executando ao mesmo tempo por worker
+    'MAX_ATTEMPTS': 3,
+    'RETRY_DELAY': 30,      # segundos; dobra a cada nova tentativa
+    'RESULT_TTL': 24 * 60 * 60,
+    'POLL_INTERVAL': 2,
+    'STALE_AFTER': 60 * 60,  # 'running' há mais tempo que isso = worker morreu
+}
+
+
+def get_setting(name):
+    return getattr(settings, 'JOBS', {}).get(name, DEFAULTS[name])
+
+
+def _result_path(job, filename):
+    relative = f'jobs/{job.pk}/{filename}'
+    path = Path(settings.MEDIA_ROOT) / relative
+    path.parent.mkdir(parents=True, exist_ok=True)
+    return relative, path
+
+
+def run_export(job):
+    """ Gera o CSV de uma exportação em disco, sem carregá-lo na memória. """
+    rows, filename = EXPORTS[job.kind]
+    relative, path = _result_path(job, filename)
+    with open(path, 'wb') as f:
+        for chunk in iter_encoded(iter_csv(rows(**job.params))):
+            f.write(chunk)
+    return relative
+
+
+def run_analytics(job):
+    relative, path = _result_path(job, 'analise.json')
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(analytics_data(), f, cls=JSONEncoder, ensure_ascii=False)
+    return relative
+
+
+# Tipo da tarefa -> função que grava o resultado e devolve o caminho relativo a MEDIA_ROOT
+HANDLERS = {
+    **{name: run_export for name in EXPORTS},
+    'analytics': run_analytics,
+    'tool-images': run_tool_images,
+}
+# Tipos que os usuários podem agendar pela API; os demais são internos
+SUBMITTABLE = {*EXPORTS, 'analytics'}
+
+
+def submit(kind, params=None, user=None):
+    if kind not in HANDLERS:
+        raise ValueError(f"Tipo de tarefa desconhecido: {kind}")
+    return Job.objects.create(kind=kind, params=params or {}, created_by=user)
+
+
+def claim(job_id):
+    """ Reserva a tarefa para este worker. Só um worker consegue reservá-la. """
+    return Job.objects.filter(pk=job_id, status=Job.PENDING).update(
+        status=Job.RUNNING,
+        started_at=timezone.now(),
+        attempts=F('attempts') + 1,
+    ) == 1
+
+
+def execute(job_id):
+    """ Executa uma tarefa já reservada e registra o resultado ou a falha. """
+    job = Job.objects.get(pk=job_id)
+    try:
+        result = HANDLERS[job.kind](job)
+    except Exception:
+        now = timezone.now()
+        error = traceback.format_exc()
+        logger.exception("Falha na tarefa %s", job)
+        if job.attempts < get_setting('MAX_ATTEMPTS'):
+            delay = get_setting('RETRY_DELAY') * 2 ** (job.attempts - 1)
+            Job.objects.filter(pk=job.pk).update(
+                status=Job.PENDING, error=error, run_after=now + timedelta(seconds=delay),
+            )
+        else:
+            Job.objects.filter(pk=job.pk).update(
+                status=Job.FAILED, error=error, finished_at=now,
+                expires_at=now + timedelta(seconds=get_setting('RESULT_TTL')),
+            )
+        return False
+    now = timezone.now()
+    Job.objects.filter(pk=job.pk).update(
+        status=Job.DONE, result_file=result, error='', finished_at=now,
+        expires_at=now + timedelta(seconds=get_setting('RESULT_TTL')),
+    )
+    return True
+
+
+def ready_job_ids(limit):
+    return list(
+        Job.objects.filter(status=Job.PENDING, run_after__lte=timezone.now())
+        .order_by('run_after', 'id')
+        .values_list('id', flat=True)[:limit]
+    )
+
+
+def run_pending(limit=100):
+    """ Executa na thread atual as tarefas prontas (usado em '--once' e nos testes). """
+    done = 0
+    for job_id in ready_job_ids(limit):
+        if claim(job_id):
+            execute(job_id)
+            done += 1
+    return done
+
+
+def requeue_stale(exclude=()):
+    """
+    Devolve à fila tarefas presas em 'running' por um worker que morreu.
+    'exclude': tarefas que o worker que chama ainda está executando.
+    """
+    limit = timezone.now() - timedelta(seconds=get_setting('STALE_AFTER'))
+    stale = Job.objects.filter(status=Job.RUNNING, started_at__lt=limit).exclude(pk__in=exclude)
+    return stale.update(status=Job.PENDING)
+
+
+def cleanup_expired():
+    """ Apaga as tarefas concluídas ou falhas cujo resultado expirou, com os arquivos. """
+    expired = Job.objects.filter(status__in=[Job.DONE, Job.FAILED], expires_at__lt=timezone.now())
+    count = 0
+    for job in expired.only('id'):
+        shutil.rmtree(Path(settings.MEDIA_ROOT) / 'jobs' / str(job.pk), ignore_errors=True)
+        job.delete()
+        count += 1
+    return count
+
+
+class Worker:
+    """ Laço do worker: reserva tarefas prontas e as executa no pool de threads. """
+
+    def __init__(self, concurrency=None):
+        self.concurrency = concurrency or get_setting('MAX_CONCURRENCY')
+        self.executor = ThreadPoolExecutor(max_workers=self.concurrency, thread_name_prefix='inventory-job')
+        self.in_flight = set()
+        self.lock = threading.Lock()
+        self.stopped = threading.Event()
+
+    def _run(self, job_id):
+        try:
+            execute(job_id)
+        finally:
+            # Cada thread tem a própria conexão; fecha ao terminar a tarefa
+            connections.close_all()
+            with self.lock:
+                self.in_flight.discard(job_id)
+
+    def dispatch(self):
+        """ Reserva até preencher as vagas livres do pool. Devolve quantas foram iniciadas. """
+        with self.lock:
+            free = self.concurrency - len(self.in_flight)
+        if free <= 0:
+            return 0
+        started = 0
+        for job_id in ready_job_ids(free):
+            if claim(job_id):
+                with self.lock:
+                    self.in_flight.add(job_id)
+                self.executor.submit(self._run, job_id)
+                started += 1
+        return started
+
+    def housekeeping(self):
+        """
+        Passada periódica do laço: devolve à fila as tarefas presas (de
+        outro processo que morreu ou de uma thread que travou) e apaga as
+        expiradas. As tarefas em execução neste worker ficam de fora.
+        """
+        with self.lock:
+            in_flight = set(self.in_flight)
+        requeue_stale(exclude=in_flight)
+        cleanup_expired()
+
+    def run_forever(self, cleanup_every=60):
+        last_cleanup = None
+        while not self.stopped.is_set():
+            now = timezone.now()
+            if last_cleanup is None or (now - last_cleanup).total_seconds() >= cleanup_every:
+                self.housekeeping()
+                last_cleanup = now
+            self.dispatch()
+            self.stopped.wait(get_setting('POLL_INTERVAL'))
+        self.executor.shutdown(wait=True)
+
+    def stop(self):
+        self.stopped.set()
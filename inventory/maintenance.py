@@ -0,0 +1,29 @@
+# inventory/maintenance.py
+
+from .models import MaintenanceEvent
+
+
+def maintenance_state(tool):
+    """ Campos de manutenção da ferramenta antes de uma escrita. """
+    return tool.last_maintenance_date, tool.maintenance_cost
+
+
+def record_maintenance(tool, previous=None):
+    """
+    Registra no histórico a manutenção descrita pelos campos da ferramenta.
+
+    'previous' é o maintenance_state() antes da escrita (None na criação).
+    Uma nova data de manutenção gera um novo evento; mudar só o custo da
+    mesma data corrige o evento daquela data em vez de duplicá-lo.
+    """
+    date, cost = maintenance_state(tool)
+    if date is None or previous == (date, cost):
+        return None
+    if previous is not None and previous[0] == date:
+        event = tool.maintenance_events.filter(date=date).order_by('-id').first()
+        if event is not None:
+            event.cost = cost
+            event.condition = tool.condition
+            event.save(update_fields=['cost', 'condition'])
+            return event
+    return MaintenanceEvent.objects.create(tool=tool, date=date, cost=cost, condition=tool.condition)
@@ -0,0 +1,135 @@
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+
+from inventory import benchmark
+
+
+class Command(BaseCommand):
+    help = (
+        "Mede todas as rotas GET da API (latência p50/p95/p99, consultas SQL e pico "
+        "de memória) e, opcionalmente, compara com um resultado anterior. Com --mixed, "
+        "roda leitores e escritores simultâneos para comparar perfis de banco (DB_PROFILE). "
+        "Com --modes, compara o Dashboard e a Análise nos modos sync e async (ASYNC_VIEWS) sob carga concorrente. "
+        "Com --read-paths, compara as listas grandes pelo serializer e pelo caminho rápido (FAST_READS)."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--iterations', type=int, default=20, help="Requisições medidas por rota.")
+        parser.add_argument('--warmup', type=int, default=2, help="Requisições de aquecimento por rota.")
+        parser.add_argument('--user', help="Usuário usado nas requisições (padrão: primeiro superusuário).")
+        parser.add_argument('--only', nargs='*', default=None, help="Mede apenas as rotas com estes nomes.")
+        parser.add_argument('--output', help="Salva o resultado em JSON neste arquivo.")
+        parser.add_argument('--compare', help="Arquivo JSON de uma execução anterior para comparar.")
+        parser.add_argument('--threshold', type=float, default=0.2,
+                            help="Aumento relativo de p95 considerado regressão (padrão: 0.2 = 20%%).")
+        parser.add_argument('--fail-on-regression', action='store_true',
+                            help="Termina com erro se houver regressão em relação a --compare.")
+        parser.add_argument('--mixed', action='store_true',
+                            help="Carga mista de leitura e escrita em paralelo, em vez das rotas GET.")
+        parser.add_argument('--readers', type=int, default=4)
+        parser.add_argument('--writers', type=int, default=2)
+        parser.add_argument('--duration', type=float, default=10.0, help="Duração da carga mista, em segundos.")
+        parser.add_argument('--modes', action='store_true',
+                            help="Compara os modos sync e async de ASYNC_VIEWS pelo app ASGI.")
+        parser.add_argument('--concurrency', type=int, default=8, help="Requisições simultâneas em --modes.")
+        parser.add_argument('--requests', type=int, default=200, help="Requisições por rota e modo em --modes.")
+        parser.add_argument('--use-cache', action='store_true',
+                            help="Em --modes, mantém o cache do Dashboard (por padrão ele é desligado).")
+        parser.add_argument('--read-paths', action='store_true',
+                            help="Compara as listas pelo serializer e pelo caminho rápido (FAST_READS).")
+
+    def _user(self, username):
+        User = get_user_model()
+        if username:
+            user = User.objects.filter(username=username).first()
+            if user is None:
+                raise CommandError(f"Usuário '{username}' não encontrado.")
+            return user
+        user = User.objects.filter(is_superuser=True, is_active=True).order_by('pk').first()
+        if user is None:
+            raise CommandError("Nenhum superusuário encontrado; informe --user.")
+        return user
+
+    def _mixed(self, options):
+        try:
+            results = benchmark.mixed_workload(self._user(options['user']), readers=options['readers'],
+                                               writers=options['writers'], duration=options['duration'])
+        except ValueError as exc:
+            raise CommandError(str(exc))
+        self.stdout.write(f"perfil {results['profile']} ({results['database']}), "
+                          f"{results['readers']} leitor(es), {results['writers']} escritor(es)")
+        for role, row in results['results'].items():
+            line = (f"{role:<6} {row['operations']:>7} op  {row['throughput_per_s']:>8.1f} op/s  "
+                    f"p50 {row['p50_ms'] or 0:>8.2f}  p95 {row['p95_ms'] or 0:>8.2f}  erros {row['errors']}")
+            self.stdout.write(line if not row['errors'] else self.style.WARNING(line))
+        if options['output']:
+            benchmark.save(results, options['output'])
+
+    def _modes(self, options):
+        results = benchmark.report_modes(self._user(options['user']), concurrency=options['concurrency'],
+                                         requests=options['requests'], use_cache=options['use_cache'])
+        self.stdout.write(f"{results['database']}, {results['concurrency']} requisições simultâneas, "
+                          f"{results['requests']} por rota")
+        for mode, rows in results['results'].items():
+            for url, row in rows.items():
+                line = (f"{mode:<6} {url:<22} {row['throughput_per_s']:>8.1f} req/s  "
+                        f"p50 {row['p50_ms'] or 0:>8.2f}  p95 {row['p95_ms'] or 0:>8.2f}  erros {row['errors']}")
+                self.stdout.write(line if not row['errors'] else self.style.WARNING(line))
+        if options['output']:
+            benchmark.save(results, options['output'])
+
+    def _read_paths(self, options):
+        results = benchmark.read_paths(self._user(options['user']), iterations=options['iterations'],
+                                       warmup=options['warmup'])
+        self.stdout.write(f"{'rota':<56} {'serializer':>11} {'rápido':>9} {'ganho':>6} {'sql':>7} {'mem KB':>17}")
+        for url, row in results['results'].items():
+            slow, fast = row['serializer'], row['fast']
+            line = (f"{url:<56} {slow['p50_ms']:>11.2f} {fast['p50_ms']:>9.2f} {row['speedup'] or 0:>5.2f}x "
+                    f"{slow['queries']:>3}/{fast['queries']:<3} {slow['peak_memory_kb']:>8.1f}/{fast['peak_memory_kb']:<8.1f}")
+            if not row['identical']:
+                line += "  RESPOSTAS DIFERENTES"
+            self.stdout.write(line if row['identical'] else self.style.ERROR(line))
+        if options['output']:
+            benchmark.save(results, options['output'])
+        if not all(row['identical'] for row in results['results'].values()):
+            raise CommandError("O caminho rápido respondeu diferente do serializer.")
+
+    def handle(self, *args, **options):
+        if options['mixed']:
+            return self._mixed(options)
+        if options['modes']:
+            return self._modes(options)
+        if options['read_paths']:
+            return self._read_paths(options)
+        baseline = benchmark.load(options['compare']) if options['compare'] else None
+        routes = benchmark.discover_routes()
+        if options['only']:
+            routes = [(name, url) for name, url in routes if name in options['only']]
+        if not routes:
+            raise CommandError("Nenhuma rota para medir.")
+
+        self.stdout.write(f"{'rota':<40} {'status':>6} {'p50':>9} {'p95':>9} {'p99':>9} {'sql':>5} {'mem KB':>9}")
+
+        def report(name, row):
+            line = (f"{name:<40} {row['status']:>6} {row['p50_ms']:>9.2f} {row['p95_ms']:>9.2f} "
+                    f"{row['p99_ms']:>9.2f} {row['queries']:>5} {row['peak_memory_kb']:>9.1f}")
+            self.stdout.write(line if row['status'] < 400 else self.style.WARNING(line))
+
+        runner = benchmark.Runner(self._user(options['user']), iterations=options['iterations'],
+                                  warmup=options['warmup'])
+        results = runner.run(routes, on_result=report)
+
+        if options['output']:
+            benchmark.save(results, options['output'])
+            self.stdout.write(f"Resultado salvo em {options['output']}.")
+
+        if baseline is None:
+            return
+        regressions = benchmark.compare(baseline, results, threshold=options['threshold'])
+        if not regressions:
+            self.stdout.write(self.style.SUCCESS("Nenhuma regressão em relação ao resultado anterior."))
+            return
+        for name, metric, before, now in regressions:
+            self.stdout.write(self.style.ERROR(f"REGRESSÃO {name}: {metric} {before} -> {now}"))
+        if options['fail_on_regression']:
+            raise CommandError(f"{len(regressions)} regressão(ões) encontrada(s).")
@@ -0,0 +1,31 @@
+from django.contrib.staticfiles.storage import staticfiles_storage
+from django.core.management import call_command
+from django.core.management.base import BaseCommand
+
+from inventory import assets
+
+
+class Command(BaseCommand):
+    help = (
+        "Prepara os arquivos estáticos para produção: collectstatic com hash "
+        "do conteúdo no nome, um CSS por página e versões comprimidas (.gz/.br)."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--clear',
+            action='store_true',
+            help="Apaga o STATIC_ROOT antes (remove arquivos de builds antigos).",
+        )
+
+    def handle(self, *args, **options):
+        call_command('collectstatic', interactive=False, clear=options['clear'], verbosity=0)
+        bundles = assets.build_bundles(staticfiles_storage)
+        count, original, compressed = assets.precompress(staticfiles_storage)
+        self.stdout.write(f"{len(bundles)} pacote(s) de CSS: {', '.join(sorted(bundles))}")
+        if assets.brotli is None:
+            self.stdout.write(self.style.WARNING("Pacote 'brotli' não instalado: gerando apenas .gz."))
+        saved = 100 * (1 - compressed / original) if original else 0
+        self.stdout.write(self.style.SUCCESS(
+            f"{count} arquivo(s) comprimido(s): {original / 1024:.0f} KB -> {compressed / 1024:.0f} KB com gzip ({saved:.0f}% menor)."
+        ))
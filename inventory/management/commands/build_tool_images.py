@@ -0,0 +1,64 @@
+import os
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import django
+from django.conf import settings
+from django.core.files.storage import default_storage
+from django.core.management.base import BaseCommand
+from django.db import connections
+
+from inventory import images
+from inventory.models import Tool
+
+
+class Command(BaseCommand):
+    help = (
+        "Gera as versões redimensionadas (WebP e JPEG) das fotos de ferramentas "
+        "que ainda não as têm, em vários processos."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--workers',
+            type=int,
+            default=os.cpu_count() or 1,
+            help="Processos em paralelo (padrão: número de CPUs).",
+        )
+        parser.add_argument(
+            '--force',
+            action='store_true',
+            help="Refaz também as ferramentas que já têm versões geradas.",
+        )
+
+    def handle(self, *args, **options):
+        tools = Tool.objects.exclude(image='').exclude(image__isnull=True).only('id', 'image', 'image_renditions')
+        pending = [tool for tool in tools.iterator() if options['force'] or images.needs_renditions(tool)]
+        if not pending:
+            self.stdout.write(self.style.SUCCESS("Nenhuma foto pendente."))
+            return
+
+        render_options = images.render_options()
+        done = failed = 0
+        # Os processos só leem e gravam arquivos; o banco fica com este processo
+        connections.close_all()
+        with ProcessPoolExecutor(max_workers=max(1, options['workers']), initializer=django.setup) as pool:
+            futures = {
+                pool.submit(images.render_file, default_storage.path(tool.image.name), settings.MEDIA_ROOT, render_options): tool
+                for tool in pending
+            }
+            for future in as_completed(futures):
+                tool = futures[future]
+                try:
+                    renditions = future.result()
+                except Exception as exc:
+                    failed += 1
+                    self.stderr.write(f"Ferramenta {tool.pk} ({tool.image.name}): {exc}")
+                    continue
+                if images.save_renditions(tool.pk, tool.image.name, renditions):
+                    done += 1
+
+        message = f"{done} foto(s) processada(s)"
+        if failed:
+            self.stdout.write(self.style.WARNING(f"{message}, {failed} com erro."))
+        else:
+            self.stdout.write(self.style.SUCCESS(f"{message}."))
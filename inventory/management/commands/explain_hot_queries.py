@@ -0,0 +1,96 @@
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.db.models import Q
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+
+from inventory.models import Tool, Loan, MaintenanceEvent
+from inventory.reports import dashboard_data, maintenance_cost_report
+
+
+def _hot_queries():
+    """
+    Consultas mais frequentes da API, montadas como as views as executam.
+    Cada item: (nome, função que executa a consulta, tabelas que podem ser
+    percorridas inteiras sem problema).
+    """
+    today = timezone.now().date()
+    page = 51  # tamanho de página padrão + 1 (ver KeysetPagination)
+    loans = Loan.objects.with_related()
+    active = loans.filter(returned_date__isnull=True).order_by('-borrowed_date', '-id')
+    history = loans.filter(returned_date__isnull=False).order_by('-borrowed_date', '-id')
+    cursor = Q(borrowed_date__lt=today) | Q(borrowed_date=today, id__lt=1000)
+    return [
+        ('dashboard', dashboard_data, {'inventory_tool'}),
+        ('loans-active', lambda: list(active[:page]), set()),
+        ('loans-overdue', lambda: list(active.filter(due_date__lt=today)[:page]), set()),
+        ('loans-history', lambda: list(history[:page]), set()),
+        ('loans-history-next-page', lambda: list(history.filter(cursor)[:page]), set()),
+        ('tool-loan-totals', lambda: list(Tool.objects.with_loan_totals().order_by('name', 'id')[:page]), set()),
+        ('maintenance-history', lambda: list(
+            MaintenanceEvent.objects.filter(tool_id=1, date__gte=today - timedelta(days=365))[:page]
+        ), set()),
+        ('maintenance-costs', lambda: maintenance_cost_report(date_from=today - timedelta(days=30)), set()),
+    ]
+
+
+class Command(BaseCommand):
+    help = (
+        "Executa as consultas mais frequentes da API e mostra o plano de execução "
+        "(EXPLAIN QUERY PLAN no SQLite) de cada uma, apontando varreduras completas de tabela."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--fail-on-scan',
+            action='store_true',
+            help="Termina com erro se alguma consulta fizer varredura completa de tabela.",
+        )
+
+    def _explain(self, sql):
+        prefix = 'EXPLAIN QUERY PLAN' if connection.vendor == 'sqlite' else 'EXPLAIN'
+        with connection.cursor() as cursor:
+            cursor.execute(f'{prefix} {sql}')
+            rows = cursor.fetchall()
+        # SQLite: (id, parent, notused, detail); outros bancos: uma coluna de texto
+        return [row[-1] for row in rows]
+
+    @staticmethod
+    def _full_scans(plan, allowed):
+        scans = []
+        for line in plan:
+            words = line.replace('"', '').split()
+            if connection.vendor == 'sqlite':
+                # "SCAN tabela" sem "USING ... INDEX" lê a tabela inteira
+                if words[:1] == ['SCAN'] and 'USING' not in words:
+                    scans.append(words[1])
+            elif 'Seq Scan on' in line:
+                scans.append(line.split('Seq Scan on', 1)[1].split()[0])
+        return [table for table in scans if table not in allowed]
+
+    def handle(self, *args, **options):
+        problems = []
+        for name, run, allowed in _hot_queries():
+            with CaptureQueriesContext(connection) as captured:
+                run()
+            self.stdout.write(self.style.MIGRATE_HEADING(f"== {name}"))
+            for query in captured.captured_queries:
+                sql = query['sql']
+                plan = self._explain(sql)
+                scans = self._full_scans(plan, allowed)
+                self.stdout.write(f"  {sql[:200]}{'...' if len(sql) > 200 else ''}")
+                for line in plan:
+                    self.stdout.write(f"    {line}")
+                if scans:
+                    problems.append((name, scans))
+                    self.stdout.write(self.style.ERROR(f"    VARREDURA COMPLETA: {', '.join(scans)}"))
+                else:
+                    self.stdout.write(self.style.SUCCESS("    ok"))
+
+        if not problems:
+            self.stdout.write(self.style.SUCCESS("Nenhuma varredura completa nas consultas frequentes."))
+        elif options['fail_on_scan']:
+            raise CommandError(f"{len(problems)} consulta(s) com varredura completa: "
+                               + "; ".join(f"{name} ({', '.join(tables)})" for name, tables in problems))
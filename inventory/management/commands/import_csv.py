@@ -0,0 +1,43 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from inventory.imports import BATCH_SIZE, IMPORTS, ImportFileError
+
+
+class Command(BaseCommand):
+    help = (
+        "Importa ferramentas ou funcionários de um CSV no layout das "
+        "exportações, atualizando os registros existentes e criando os novos."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('kind', choices=sorted(IMPORTS))
+        parser.add_argument('path')
+        parser.add_argument('--batch-size', type=int, default=BATCH_SIZE)
+        parser.add_argument(
+            '--dry-run',
+            action='store_true',
+            help="Apenas valida o arquivo, sem gravar nada.",
+        )
+
+    def handle(self, *args, **options):
+        try:
+            with open(options['path'], encoding='utf-8-sig', newline='') as lines:
+                result = IMPORTS[options['kind']](
+                    lines, dry_run=options['dry_run'], batch_size=max(1, options['batch_size']),
+                )
+        except (OSError, UnicodeDecodeError, ImportFileError) as exc:
+            raise CommandError(str(exc))
+
+        for error in result.errors:
+            details = '; '.join(f"{field}: {message}" for field, message in error['errors'].items())
+            self.stderr.write(f"Linha {error['row']}: {details}")
+        if result.error_count > len(result.errors):
+            self.stderr.write(f"... e mais {result.error_count - len(result.errors)} erro(s).")
+        summary = (
+            f"{result.rows} linha(s): {result.created} criada(s), "
+            f"{result.updated} atualizada(s), {result.error_count} com erro"
+        )
+        if options['dry_run']:
+            self.stdout.write(self.style.WARNING(f"{summary} (nada foi gravado)."))
+        else:
+            self.stdout.write(self.style.SUCCESS(f"{summary}."))
@@ -0,0 +1,17 @@
+from django.core.management.base import BaseCommand
+
+from inventory import rollups
+
+
+class Command(BaseCommand):
+    help = (
+        "Recalcula do zero os resumos mensais (empréstimos e manutenções) "
+        "usados pela página de Análise."
+    )
+
+    def handle(self, *args, **options):
+        loan_months, maintenance_months = rollups.rebuild()
+        self.stdout.write(self.style.SUCCESS(
+            f"Resumos recalculados: {loan_months} mês(es) de empréstimos, "
+            f"{maintenance_months} mês(es) de manutenções."
+        ))
@@ -0,0 +1,54 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import F
+
+from inventory import events, versions
+from inventory.models import Tool, active_loan_quantity
+from inventory.reports import invalidate_dashboard
+
+
+class Command(BaseCommand):
+    help = (
+        "Recalcula o contador 'borrowed_quantity' de cada ferramenta a partir "
+        "dos empréstimos ativos e informa as divergências encontradas."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--dry-run',
+            action='store_true',
+            help="Apenas informa as divergências, sem corrigir os contadores.",
+        )
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            drifted = list(
+                Tool.objects.with_loan_totals()
+                .exclude(borrowed_quantity=F('loaned_quantity'))
+                .values('id', 'name', 'borrowed_quantity', 'loaned_quantity')
+                .order_by('id')
+            )
+            for tool in drifted:
+                self.stdout.write(
+                    f"Ferramenta {tool['id']} ({tool['name']}): contador={tool['borrowed_quantity']} "
+                    f"empréstimos ativos={tool['loaned_quantity']} "
+                    f"diferença={tool['borrowed_quantity'] - tool['loaned_quantity']:+d}"
+                )
+
+            if not drifted:
+                self.stdout.write(self.style.SUCCESS("Nenhuma divergência encontrada."))
+                return
+
+            if options['dry_run']:
+                self.stdout.write(self.style.WARNING(f"{len(drifted)} ferramenta(s) com divergência (nada foi alterado)."))
+                return
+
+            # Um único UPDATE com a subquery: o valor gravado é o da tabela de
+            # empréstimos no momento da escrita, não o lido acima.
+            ids = [t['id'] for t in drifted]
+            Tool.objects.filter(pk__in=ids).update(borrowed_quantity=active_loan_quantity())
+            # Mesmas invalidações das escritas do inventory.stock (o update não dispara signals)
+            invalidate_dashboard()
+            versions.bump('tool')
+            events.stock_changed(ids)
+        self.stdout.write(self.style.SUCCESS(f"{len(drifted)} contador(es) corrigido(s)."))
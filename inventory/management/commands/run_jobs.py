@@ -0,0 +1,45 @@
+import signal
+
+from django.core.management.base import BaseCommand
+
+from inventory import jobs
+
+
+class Command(BaseCommand):
+    help = (
+        "Inicia o worker da fila de tarefas em segundo plano (exportações e "
+        "relatórios). Usa apenas o banco de dados, sem broker externo."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--concurrency',
+            type=int,
+            default=None,
+            help="Número máximo de tarefas executando ao mesmo tempo (padrão: JOBS['MAX_CONCURRENCY']).",
+        )
+        parser.add_argument(
+            '--once',
+            action='store_true',
+            help="Executa as tarefas prontas na thread atual, limpa as expiradas e sai.",
+        )
+
+    def handle(self, *args, **options):
+        if options['once']:
+            stale = jobs.requeue_stale()
+            done = jobs.run_pending()
+            removed = jobs.cleanup_expired()
+            self.stdout.write(self.style.SUCCESS(
+                f"{done} tarefa(s) executada(s), {stale} devolvida(s) à fila, {removed} expirada(s) removida(s)."
+            ))
+            return
+
+        worker = jobs.Worker(concurrency=options['concurrency'])
+        signal.signal(signal.SIGTERM, lambda *_: worker.stop())
+        self.stdout.write(f"Worker iniciado com até {worker.concurrency} tarefa(s) simultânea(s). Ctrl+C para parar.")
+        try:
+            worker.run_forever()
+        except KeyboardInterrupt:
+            worker.stop()
+            worker.executor.shutdown(wait=True)
+        self.stdout.write("Worker finalizado.")
@@ -0,0 +1,137 @@
+import random
+from datetime import timedelta
+from decimal import Decimal
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.db.models import F
+from django.utils import timezone
+
+from inventory import rollups, versions
+from inventory.models import Tool, Loan, Employee, MaintenanceEvent, active_loan_quantity
+from inventory.reports import invalidate_dashboard
+
+TOOL_NAMES = [
+    'Martelo', 'Chave de Fenda', 'Chave Philips', 'Alicate', 'Furadeira', 'Serra Circular',
+    'Esmerilhadeira', 'Trena', 'Nível', 'Parafusadeira', 'Marreta', 'Chave Inglesa',
+    'Serrote', 'Lixadeira', 'Soprador Térmico', 'Multímetro', 'Escada', 'Compressor',
+]
+FIRST_NAMES = ['Ana', 'Bruno', 'Carla', 'Diego', 'Elisa', 'Fábio', 'Gabriela', 'Hugo', 'Isabela', 'João', 'Larissa', 'Marcos']
+LAST_NAMES = ['Silva', 'Souza', 'Oliveira', 'Santos', 'Lima', 'Pereira', 'Costa', 'Almeida', 'Ribeiro', 'Gomes']
+SUPPLIERS = ['Ferragens Central', 'Casa do Construtor', 'Distribuidora Norte', 'Ferramentas Brasil', None]
+
+
+class Command(BaseCommand):
+    help = (
+        "Gera dados sintéticos em massa (ferramentas, funcionários, empréstimos e "
+        "manutenções) com bulk_create em lotes, para medir a API em tamanho de produção."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--tools', type=int, default=1000)
+        parser.add_argument('--employees', type=int, default=500)
+        parser.add_argument('--loans', type=int, default=50000)
+        parser.add_argument('--days', type=int, default=365, help="Período coberto pelos empréstimos, em dias.")
+        parser.add_argument('--returned-ratio', type=float, default=0.8, help="Fração de empréstimos já devolvidos.")
+        parser.add_argument('--overdue-ratio', type=float, default=0.3, help="Fração dos ativos que está atrasada.")
+        parser.add_argument('--batch-size', type=int, default=2000)
+        parser.add_argument('--seed', type=int, default=None, help="Semente aleatória, para gerar sempre os mesmos dados.")
+        parser.add_argument('--clear', action='store_true', help="Apaga ferramentas, funcionários e empréstimos existentes antes.")
+
+    def handle(self, *args, **options):
+        if options['tools'] < 1 and options['loans'] > 0:
+            raise CommandError("É preciso gerar pelo menos uma ferramenta para criar empréstimos.")
+        rng = random.Random(options['seed'])
+        batch_size = options['batch_size']
+        today = timezone.now().date()
+
+        with transaction.atomic():
+            if options['clear']:
+                Loan.objects.all().delete()
+                Tool.objects.all().delete()
+                Employee.objects.all().delete()
+
+            tools = Tool.objects.bulk_create(
+                (self._tool(rng, i, today) for i in range(options['tools'])), batch_size=batch_size,
+            )
+            self.stdout.write(f"{len(tools)} ferramenta(s) criada(s).")
+
+            existing = Employee.objects.count()
+            employees = Employee.objects.bulk_create(
+                (
+                    Employee(
+                        name=f"{rng.choice(FIRST_NAMES)} {rng.choice(LAST_NAMES)}",
+                        registration_number=f"B{existing + i:07d}",
+                    )
+                    for i in range(options['employees'])
+                ),
+                batch_size=batch_size,
+            )
+            self.stdout.write(f"{len(employees)} funcionário(s) criado(s).")
+
+            events = MaintenanceEvent.objects.bulk_create(
+                (
+                    MaintenanceEvent(
+                        tool=tool,
+                        date=today - timedelta(days=rng.randrange(options['days'])),
+                        cost=Decimal(rng.randrange(2000, 50000)) / 100,
+                        condition='maintenance',
+                    )
+                    for tool in tools if rng.random() < 0.3
+                    for _ in range(rng.randint(1, 3))
+                ),
+                batch_size=batch_size,
+            )
+            self.stdout.write(f"{len(events)} manutenção(ões) criada(s).")
+
+            created = 0
+            for start in range(0, options['loans'], batch_size):
+                size = min(batch_size, options['loans'] - start)
+                loans = [self._loan(rng, tools, employees, today, options) for _ in range(size)]
+                borrowed = [loan.borrowed_date for loan in loans]
+                Loan.objects.bulk_create(loans)
+                # borrowed_date é auto_now_add: o bulk_create grava hoje, então corrige em seguida
+                for loan, day in zip(loans, borrowed):
+                    loan.borrowed_date = day
+                Loan.objects.bulk_update(loans, ['borrowed_date'])
+                created += size
+            self.stdout.write(f"{created} empréstimo(s) criado(s).")
+
+            # Sincroniza os contadores de estoque e garante estoque suficiente para os ativos
+            Tool.objects.update(borrowed_quantity=active_loan_quantity())
+            Tool.objects.filter(borrowed_quantity__gt=F('total_quantity')).update(total_quantity=F('borrowed_quantity'))
+            rollups.rebuild()
+            invalidate_dashboard()
+            versions.bump('tool', 'employee', 'loan', 'maintenanceevent')
+
+        self.stdout.write(self.style.SUCCESS("Dados de benchmark gerados."))
+
+    def _tool(self, rng, i, today):
+        condition = rng.choices(['good', 'new', 'recovered', 'maintenance'], weights=[60, 20, 12, 8])[0]
+        return Tool(
+            name=f"{rng.choice(TOOL_NAMES)} {i:05d}",
+            description=f"Ferramenta gerada para benchmark #{i}",
+            total_quantity=rng.randint(1, 40),
+            condition=condition,
+            unit_value=Decimal(rng.randrange(1000, 200000)) / 100,
+            acquisition_date=today - timedelta(days=rng.randrange(5 * 365)),
+            supplier=rng.choice(SUPPLIERS),
+        )
+
+    def _loan(self, rng, tools, employees, today, options):
+        borrowed = today - timedelta(days=rng.randrange(options['days']))
+        loan = Loan(
+            tool=rng.choice(tools),
+            employee=rng.choice(employees) if employees else None,
+            quantity=rng.choices([1, 2, 3, 5], weights=[70, 18, 8, 4])[0],
+            borrowed_date=borrowed,
+            due_date=borrowed + timedelta(days=rng.randint(1, 30)),
+        )
+        if rng.random() < options['returned_ratio']:
+            loan.returned_date = min(today, borrowed + timedelta(days=rng.randint(0, 35)))
+        elif rng.random() < options['overdue_ratio']:
+            loan.due_date = today - timedelta(days=rng.randint(1, 20))
+            loan.borrowed_date = min(borrowed, loan.due_date)
+        else:
+            loan.due_date = today + timedelta(days=rng.randint(0, 30))
+        return loan
@@ -0,0 +1,44 @@
+from django.core.management.base import BaseCommand
+from django.db.models import F
+
+from inventory.models import SlowQuery
+
+ORDERINGS = {
+    'total': F('total_time').desc(),
+    'max': F('max_time').desc(),
+    'count': F('count').desc(),
+    'avg': (F('total_time') / F('count')).desc(),
+}
+
+
+class Command(BaseCommand):
+    help = "Lista as consultas lentas registradas (ver inventory.slow_queries), agrupadas por impressão digital."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--limit', type=int, default=10)
+        parser.add_argument('--order', choices=sorted(ORDERINGS), default='total',
+                            help="Critério de ordenação (padrão: tempo total).")
+        parser.add_argument('--explain', action='store_true', help="Mostra também o plano de execução.")
+        parser.add_argument('--clear', action='store_true', help="Apaga o registro de consultas lentas.")
+
+    def handle(self, *args, **options):
+        if options['clear']:
+            deleted, _ = SlowQuery.objects.all().delete()
+            self.stdout.write(self.style.SUCCESS(f"{deleted} registro(s) apagado(s)."))
+            return
+
+        queries = list(SlowQuery.objects.order_by(ORDERINGS[options['order']])[:options['limit']])
+        if not queries:
+            self.stdout.write("Nenhuma consulta lenta registrada.")
+            return
+
+        for position, query in enumerate(queries, 1):
+            self.stdout.write(self.style.MIGRATE_HEADING(
+                f"#{position} {query.count}x  total {query.total_time * 1000:.1f} ms  "
+                f"média {query.avg_time * 1000:.1f} ms  máx {query.max_time * 1000:.1f} ms"
+            ))
+            self.stdout.write(f"  origem: {query.call_site or '?'}  rota: {query.route or '-'}")
+            self.stdout.write(f"  {query.sql[:500]}{'...' if len(query.sql) > 500 else ''}")
+            if options['explain'] and query.explain:
+                for line in query.explain.splitlines():
+                    self.stdout.write(f"    {line}")
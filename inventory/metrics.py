@@ -0,0 +1,220 @@
+# inventory/metrics.py
+
+"""
+Métricas de desempenho por rota, expostas em /api/_metrics no formato texto
+do Prometheus.
+
+O MetricsMiddleware mede cada requisição (tempo total, tempo no banco,
+número de consultas), devolve o cabeçalho Server-Timing e soma tudo no
+registro em memória do processo, agrupado pelo nome da rota resolvida
+(ex.: 'loan-active-loans').
+
+Funciona nas pilhas WSGI e ASGI (sync e async) e conta também as consultas
+das threads de run_concurrently (ver request_queries em inventory/db.py).
+
+O registro não usa lock: cada thread escreve apenas no seu próprio
+fragmento e a leitura (/api/_metrics) soma os fragmentos de todas as
+threads. Os valores são por processo; com vários workers, o Prometheus
+agrega as séries de cada um.
+"""
+
+import bisect
+import hmac
+import threading
+import time
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.http import HttpResponse, HttpResponseForbidden
+from rest_framework.exceptions import AuthenticationFailed
+from users.authentication import CachedJWTAuthentication
+
+from .db import request_queries
+
+# Limites dos buckets de latência, em segundos (padrão dos clientes Prometheus)
+BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+UNMATCHED = 'unmatched'
+# Métodos fora desta lista viram 'other': o cliente escolhe o método, e
+# cada valor novo criaria mais séries no Prometheus
+METHODS = frozenset({'GET', 'HEAD', 'POST', 'PUT', 'PATCH', 'DELETE', 'OPTIONS'})
+OTHER_METHOD = 'other'
+
+
+class _Series:
+    __slots__ = ('count', 'duration', 'db_duration', 'queries', 'buckets', 'statuses')
+
+    def __init__(self):
+        self.count = 0
+        self.duration = 0.0
+        self.db_duration = 0.0
+        self.queries = 0
+        self.buckets = [0] * (len(BUCKETS) + 1)  # último = +Inf
+        self.statuses = {}
+
+
+class Registry:
+    def __init__(self):
+        self._local = threading.local()
+        # list.append é atômico; cada fragmento só é alterado pela sua thread
+        self._shards = []
+
+    def _shard(self):
+        shard = getattr(self._local, 'shard', None)
+        if shard is None:
+            shard = self._local.shard = {}
+            self._shards.append(shard)
+        return shard
+
+    def observe(self, route, method, status, duration, db_duration, queries):
+        shard = self._shard()
+        series = shard.get((route, method))
+        if series is None:
+            series = shard[(route, method)] = _Series()
+        series.count += 1
+        series.duration += duration
+        series.db_duration += db_duration
+        series.queries += queries
+        series.buckets[bisect.bisect_left(BUCKETS, duration)] += 1
+        series.statuses[status] = series.statuses.get(status, 0) + 1
+
+    def snapshot(self):
+        """ Soma os fragmentos: {(rota, método): _Series}. """
+        merged = {}
+        for shard in list(self._shards):
+            for key, series in list(shard.items()):
+                total = merged.get(key)
+                if total is None:
+                    total = merged[key] = _Series()
+                total.count += series.count
+                total.duration += series.duration
+                total.db_duration += series.db_duration
+                total.queries += series.queries
+                total.buckets = [a + b for a, b in zip(total.buckets, series.buckets)]
+                for status, count in list(series.statuses.items()):
+                    total.statuses[status] = total.statuses.get(status, 0) + count
+        return merged
+
+    def reset(self):
+        for shard in list(self._shards):
+            shard.clear()
+
+
+registry = Registry()
+
+
+def _labels(**labels):
+    return ','.join(f'{name}="{value}"' for name, value in labels.items())
+
+
+def render(snapshot):
+    """ Texto no formato de exposição do Prometheus (versão 0.0.4). """
+    lines = [
+        '# HELP http_request_duration_seconds Tempo de resposta por rota.',
+        '# TYPE http_request_duration_seconds histogram',
+    ]
+    keys = sorted(snapshot)
+    for route, method in keys:
+        series = snapshot[(route, method)]
+        cumulative = 0
+        for bound, count in zip(BUCKETS + ('+Inf',), series.buckets):
+            cumulative += count
+            lines.append(f'http_request_duration_seconds_bucket{{{_labels(route=route, method=method, le=bound)}}} {cumulative}')
+        lines.append(f'http_request_duration_seconds_sum{{{_labels(route=route, method=method)}}} {series.duration:.6f}')
+        lines.append(f'http_request_duration_seconds_count{{{_labels(route=route, method=method)}}} {series.count}')
+
+    lines += ['# HELP http_requests_total Requisições por rota e status.', '# TYPE http_requests_total counter']
+    for route, method in keys:
+        for status, count in sorted(snapshot[(route, method)].statuses.items()):
+            lines.append(f'http_requests_total{{{_labels(route=route, method=method, status=status)}}} {count}')
+
+    lines += ['# HELP http_db_duration_seconds_total Tempo gasto no banco por rota.', '# TYPE http_db_duration_seconds_total counter']
+    for route, method in keys:
+        lines.append(f'http_db_duration_seconds_total{{{_labels(route=route, method=method)}}} {snapshot[(route, method)].db_duration:.6f}')
+
+    lines += ['# HELP http_db_queries_total Consultas SQL por rota.', '# TYPE http_db_queries_total counter']
+    for route, method in keys:
+        lines.append(f'http_db_queries_total{{{_labels(route=route, method=method)}}} {snapshot[(route, method)].queries}')
+    return '\n'.join(lines) + '\n'
+
+
+class _QueryTimer:
+    """ execute_wrapper que conta as consultas e soma o tempo gasto nelas. """
+
+    def __init__(self):
+        self.queries = 0
+        self.duration = 0.0
+        # No modo async, consultas de várias threads somam no mesmo timer
+        self._lock = threading.Lock()
+
+    def __call__(self, execute, sql, params, many, context):
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            duration = time.perf_counter() - start
+            with self._lock:
+                self.duration += duration
+                self.queries += 1
+
+
+class MetricsMiddleware:
+    """
+    Mede cada requisição e registra em 'registry'. Respostas em streaming
+    (exportações CSV) são medidas só até o início do envio.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        timer = _QueryTimer()
+        start = time.perf_counter()
+        with request_queries(timer):
+            response = self.get_response(request)
+        return self._observe(request, response, timer, time.perf_counter() - start)
+
+    async def __acall__(self, request):
+        timer = _QueryTimer()
+        start = time.perf_counter()
+        with request_queries(timer):
+            response = await self.get_response(request)
+        return self._observe(request, response, timer, time.perf_counter() - start)
+
+    @staticmethod
+    def _observe(request, response, timer, duration):
+        match = getattr(request, 'resolver_match', None)
+        route = (match.url_name if match else None) or UNMATCHED
+        method = request.method if request.method in METHODS else OTHER_METHOD
+        registry.observe(route, method, response.status_code, duration, timer.duration, timer.queries)
+
+        response['Server-Timing'] = (
+            f'db;dur={timer.duration * 1000:.1f};desc="{timer.queries} queries", '
+            f'app;dur={(duration - timer.duration) * 1000:.1f}, '
+            f'total;dur={duration * 1000:.1f}'
+        )
+        return response
+
+
+def _authorized(request):
+    token = getattr(settings, 'METRICS', {}).get('TOKEN')
+    if token:
+        header = request.headers.get('Authorization', '')
+        return hmac.compare_digest(header.encode(), f'Bearer {token}'.encode())
+    # Sem token configurado, apenas administradores autenticados via JWT
+    try:
+        result = CachedJWTAuthentication().authenticate(request)
+    except AuthenticationFailed:
+        return False
+    return bool(result and result[0].is_staff)
+
+
+def metrics_view(request):
+    if not _authorized(request):
+        return HttpResponseForbidden()
+    return HttpResponse(render(registry.snapshot()), content_type='text/plain; version=0.0.4; charset=utf-8')
@@ -0,0 +1,40 @@
+# Generated by Django 5.2.7 on 2026-10-18 08:58
+
+from django.db import migrations, models
+from django.db.models import OuterRef, Subquery, Sum, IntegerField
+from django.db.models.functions import Coalesce
+
+
+def fill_borrowed_quantity(apps, schema_editor):
+    Tool = apps.get_model('inventory', 'Tool')
+    Loan = apps.get_model('inventory', 'Loan')
+    active_loans = (
+        Loan.objects.filter(tool=OuterRef('pk'), returned_date__isnull=True)
+        .order_by()
+        .values('tool')
+        .annotate(total=Sum('quantity'))
+        .values('total')
+    )
+    Tool.objects.update(
+        borrowed_quantity=Coalesce(Subquery(active_loans, output_field=IntegerField()), 0)
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('inventory', '0008_employee_remove_loan_borrower_loan_employee'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='tool',
+            name='borrowed_quantity',
+            field=models.IntegerField(default=0, editable=False),
+        ),
+        migrations.RunPython(fill_borrowed_quantity, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='tool',
+            constraint=models.CheckConstraint(condition=models.Q(('borrowed_quantity__gte', 0)), name='tool_borrowed_quantity_non_negative'),
+        ),
+    ]
@@ -0,0 +1,69 @@
+# Generated by Django 5.2.7 on 2026-10-18 09:04
+
+from decimal import Decimal
+
+from django.db import migrations, models
+from django.db.models import Count, Q, Sum
+from django.db.models.functions import Coalesce, TruncMonth
+
+
+def build_rollups(apps, schema_editor):
+    Tool = apps.get_model('inventory', 'Tool')
+    Loan = apps.get_model('inventory', 'Loan')
+    LoanMonthlyStats = apps.get_model('inventory', 'LoanMonthlyStats')
+    MaintenanceMonthlyStats = apps.get_model('inventory', 'MaintenanceMonthlyStats')
+    loans = (
+        Loan.objects.annotate(month=TruncMonth('borrowed_date'))
+        .values('month')
+        .annotate(loan_count=Count('id'), quantity_total=Coalesce(Sum('quantity'), 0))
+        .order_by('month')
+    )
+    LoanMonthlyStats.objects.bulk_create(LoanMonthlyStats(**row) for row in loans)
+    maintenance = (
+        Tool.objects.filter(last_maintenance_date__isnull=False)
+        .annotate(month=TruncMonth('last_maintenance_date'))
+        .values('month')
+        .annotate(
+            tool_count=Count('id'),
+            total_cost=Coalesce(Sum('maintenance_cost'), Decimal('0')),
+            maintenance_count=Count('id', filter=Q(condition='maintenance')),
+        )
+        .order_by('month')
+    )
+    MaintenanceMonthlyStats.objects.bulk_create(MaintenanceMonthlyStats(**row) for row in maintenance)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('inventory', '0011_job'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='LoanMonthlyStats',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('month', models.DateField(unique=True)),
+                ('loan_count', models.IntegerField(default=0)),
+                ('quantity_total', models.IntegerField(default=0)),
+            ],
+            options={
+                'ordering': ['month'],
+            },
+        ),
+        migrations.CreateModel(
+            name='MaintenanceMonthlyStats',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('month', models.DateField(unique=True)),
+                ('tool_count', models.IntegerField(default=0)),
+                ('total_cost', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('maintenance_count', models.IntegerField(default=0)),
+            ],
+            options={
+                'ordering': ['month'],
+            },
+        ),
+        migrations.RunPython(build_rollups, migrations.RunPython.noop),
+    ]
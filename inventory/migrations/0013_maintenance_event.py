@@ -0,0 +1,63 @@
+# Generated by Django 5.2.7 on 2026-10-18 09:05
+
+from decimal import Decimal
+
+import django.db.models.deletion
+from django.db import migrations, models
+from django.db.models import Count, Sum
+from django.db.models.functions import Coalesce, TruncMonth
+
+
+def backfill_events(apps, schema_editor):
+    """ Cria um evento para a última manutenção de cada ferramenta e refaz o resumo mensal. """
+    Tool = apps.get_model('inventory', 'Tool')
+    MaintenanceEvent = apps.get_model('inventory', 'MaintenanceEvent')
+    MaintenanceMonthlyStats = apps.get_model('inventory', 'MaintenanceMonthlyStats')
+    tools = Tool.objects.filter(last_maintenance_date__isnull=False).values_list(
+        'id', 'last_maintenance_date', 'maintenance_cost', 'condition'
+    )
+    MaintenanceEvent.objects.bulk_create(
+        (
+            MaintenanceEvent(tool_id=tool_id, date=date, cost=cost, condition=condition)
+            for tool_id, date, cost, condition in tools.iterator()
+        ),
+        batch_size=1000,
+    )
+    MaintenanceMonthlyStats.objects.all().delete()
+    months = (
+        MaintenanceEvent.objects.annotate(month=TruncMonth('date'))
+        .values('month')
+        .annotate(maintenance_count=Count('id'), total_cost=Coalesce(Sum('cost'), Decimal('0')))
+        .order_by('month')
+    )
+    MaintenanceMonthlyStats.objects.bulk_create(MaintenanceMonthlyStats(**row) for row in months)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('inventory', '0012_monthly_rollups'),
+    ]
+
+    operations = [
+        migrations.RemoveField(
+            model_name='maintenancemonthlystats',
+            name='tool_count',
+        ),
+        migrations.CreateModel(
+            name='MaintenanceEvent',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField()),
+                ('cost', models.DecimalField(blank=True, decimal_places=2, max_digits=10, null=True)),
+                ('condition', models.CharField(blank=True, choices=[('good', 'Boa Condição'), ('new', 'Novo'), ('recovered', 'Recuperada'), ('maintenance', 'Em Manutenção')], max_length=20)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('tool', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='maintenance_events', to='inventory.tool')),
+            ],
+            options={
+                'ordering': ['-date', '-id'],
+                'indexes': [models.Index(fields=['date'], name='maintenance_date_idx'), models.Index(fields=['tool', 'date'], name='maintenance_tool_date_idx')],
+            },
+        ),
+        migrations.RunPython(backfill_events, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,29 @@
+# Generated by Django 5.2.7 on 2026-10-18 09:07
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('inventory', '0013_maintenance_event'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='loan',
+            index=models.Index(condition=models.Q(('returned_date__isnull', True)), fields=['due_date'], name='loan_active_due_date_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='loan',
+            index=models.Index(condition=models.Q(('returned_date__isnull', True)), fields=['tool', 'quantity'], name='loan_active_tool_qty_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='loan',
+            index=models.Index(condition=models.Q(('returned_date__isnull', True)), fields=['borrowed_date', 'id'], name='loan_active_borrowed_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='loan',
+            index=models.Index(condition=models.Q(('returned_date__isnull', False)), fields=['borrowed_date', 'id', 'returned_date'], name='loan_history_borrowed_idx'),
+        ),
+    ]
@@ -0,0 +1,79 @@
+# Índices de busca textual (FTS5) de ferramentas e funcionários. Só no
+# SQLite; nos outros bancos inventory.search usa icontains.
+#
+# O SQL fica aqui, congelado: mudanças em inventory.search não alteram o
+# que esta migração cria. Lá só resta o post_migrate que restaura os
+# triggers apagados quando uma migração recria a tabela.
+
+from django.db import migrations
+
+CREATE_SEARCH_INDEX = [
+    # Ferramentas: nome, descrição e fornecedor
+    "CREATE VIRTUAL TABLE inventory_tool_fts USING fts5(name, description, supplier, "
+    "content='inventory_tool', content_rowid='id', tokenize='unicode61 remove_diacritics 2', prefix='2 3')",
+    "CREATE TRIGGER IF NOT EXISTS inventory_tool_fts_ai AFTER INSERT ON inventory_tool BEGIN "
+    "INSERT INTO inventory_tool_fts(rowid, name, description, supplier) "
+    "VALUES (new.id, new.name, new.description, new.supplier); END",
+    "CREATE TRIGGER IF NOT EXISTS inventory_tool_fts_ad AFTER DELETE ON inventory_tool BEGIN "
+    "INSERT INTO inventory_tool_fts(inventory_tool_fts, rowid, name, description, supplier) "
+    "VALUES ('delete', old.id, old.name, old.description, old.supplier); END",
+    # Só as colunas indexadas: reservas de estoque não reescrevem o índice
+    "CREATE TRIGGER IF NOT EXISTS inventory_tool_fts_au AFTER UPDATE OF name, description, supplier "
+    "ON inventory_tool BEGIN "
+    "INSERT INTO inventory_tool_fts(inventory_tool_fts, rowid, name, description, supplier) "
+    "VALUES ('delete', old.id, old.name, old.description, old.supplier); "
+    "INSERT INTO inventory_tool_fts(rowid, name, description, supplier) "
+    "VALUES (new.id, new.name, new.description, new.supplier); END",
+    "INSERT INTO inventory_tool_fts(inventory_tool_fts) VALUES ('rebuild')",
+
+    # Funcionários: nome e matrícula
+    "CREATE VIRTUAL TABLE inventory_employee_fts USING fts5(name, registration_number, "
+    "content='inventory_employee', content_rowid='id', tokenize='unicode61 remove_diacritics 2', prefix='2 3')",
+    "CREATE TRIGGER IF NOT EXISTS inventory_employee_fts_ai AFTER INSERT ON inventory_employee BEGIN "
+    "INSERT INTO inventory_employee_fts(rowid, name, registration_number) "
+    "VALUES (new.id, new.name, new.registration_number); END",
+    "CREATE TRIGGER IF NOT EXISTS inventory_employee_fts_ad AFTER DELETE ON inventory_employee BEGIN "
+    "INSERT INTO inventory_employee_fts(inventory_employee_fts, rowid, name, registration_number) "
+    "VALUES ('delete', old.id, old.name, old.registration_number); END",
+    "CREATE TRIGGER IF NOT EXISTS inventory_employee_fts_au AFTER UPDATE OF name, registration_number "
+    "ON inventory_employee BEGIN "
+    "INSERT INTO inventory_employee_fts(inventory_employee_fts, rowid, name, registration_number) "
+    "VALUES ('delete', old.id, old.name, old.registration_number); "
+    "INSERT INTO inventory_employee_fts(rowid, name, registration_number) "
+    "VALUES (new.id, new.name, new.registration_number); END",
+    "INSERT INTO inventory_employee_fts(inventory_employee_fts) VALUES ('rebuild')",
+]
+
+DROP_SEARCH_INDEX = [
+    'DROP TRIGGER IF EXISTS inventory_tool_fts_ai',
+    'DROP TRIGGER IF EXISTS inventory_tool_fts_ad',
+    'DROP TRIGGER IF EXISTS inventory_tool_fts_au',
+    'DROP TABLE IF EXISTS inventory_tool_fts',
+    'DROP TRIGGER IF EXISTS inventory_employee_fts_ai',
+    'DROP TRIGGER IF EXISTS inventory_employee_fts_ad',
+    'DROP TRIGGER IF EXISTS inventory_employee_fts_au',
+    'DROP TABLE IF EXISTS inventory_employee_fts',
+]
+
+
+class SQLiteRunSQL(migrations.RunSQL):
+    """ RunSQL aplicado apenas no SQLite (FTS5 não existe nos outros bancos). """
+
+    def database_forwards(self, app_label, schema_editor, from_state, to_state):
+        if schema_editor.connection.vendor == 'sqlite':
+            super().database_forwards(app_label, schema_editor, from_state, to_state)
+
+    def database_backwards(self, app_label, schema_editor, from_state, to_state):
+        if schema_editor.connection.vendor == 'sqlite':
+            super().database_backwards(app_label, schema_editor, from_state, to_state)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('inventory', '0016_model_version'),
+    ]
+
+    operations = [
+        SQLiteRunSQL(CREATE_SEARCH_INDEX, DROP_SEARCH_INDEX),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 5.2.7 on 2026-10-18 10:11
+
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('inventory', '0018_tool_image_renditions'),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='loan',
+            name='loan_history_borrowed_idx',
+        ),
+    ]
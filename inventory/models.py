@@ -1,11 +1,47 @@
-from django.db import models
-from django.db.models import Sum
+from django.conf import settings
+from django.db import models, transaction
+from django.db.models import Sum, OuterRef, Subquery, IntegerField
+from django.db.models.functions import Coalesce
 from django.utils import timezone
 
+
+def active_loan_quantity():
+    """
+    Expressão com a soma dos empréstimos ativos da ferramenta da query externa
+    (uma única subquery correlacionada). Usada para conferir e reconstruir o
+    contador 'borrowed_quantity' (ver reconcile_stock).
+    """
+    active_loans = (
+        Loan.objects.filter(tool=OuterRef('pk'), returned_date__isnull=True)
+        .order_by()
+        .values('tool')
+        .annotate(total=Sum('quantity'))
+        .values('total')
+    )
+    return Coalesce(Subquery(active_loans, output_field=IntegerField()), 0)
+
+
+class ToolQuerySet(models.QuerySet):
+    def with_loan_totals(self):
+        """ Anota 'loaned_quantity', calculada a partir da tabela de empréstimos. """
+        return self.annotate(loaned_quantity=active_loan_quantity())
+
+
+class LoanQuerySet(models.QuerySet):
+    def with_related(self):
+        """ Carrega ferramenta e funcionário na mesma query (JOIN). """
+        return self.select_related('tool', 'employee')
+
+
 class Employee(models.Model):
     name = models.CharField(max_length=255, verbose_name="Nome")
     registration_number = models.CharField(max_length=50, unique=True, verbose_name="Matrícula")
 
+    class Meta:
+        indexes = [
+            models.Index(fields=['name', 'id'], name='employee_name_id_idx'),
+        ]
+
     def __str__(self):
         return f"{self.name} - {self.registration_number}"
 class Tool(models.Model):
@@ -20,6 +56,8 @@ class Tool(models.Model):
     description = models.TextField(blank=True, null=True)
     total_quantity = models.IntegerField(default=0)
     image = models.ImageField(upload_to='tool_images/', max_length=300, blank=True, null=True)
+    # Versões redimensionadas da foto, gravadas por inventory.images
+    image_renditions = models.JSONField(default=dict, blank=True, editable=False)
     condition = models.CharField(max_length=20, choices=CONDITION_CHOICES, default='good')
     unit_value = models.DecimalField(max_digits=10, decimal_places=2, default=0.00)
     acquisition_date = models.DateField(blank=True, null=True)
@@ -27,16 +65,28 @@ class Tool(models.Model):
     last_maintenance_date = models.DateField(blank=True, null=True)
     next_maintenance_date = models.DateField(blank=True, null=True)
     supplier = models.CharField(max_length=255, blank=True, null=True)
+    # Contador desnormalizado da soma dos empréstimos ativos. Só deve ser
+    # alterado pelo inventory.stock (updates condicionais com F()).
+    borrowed_quantity = models.IntegerField(default=0, editable=False)
 
-    @property
-    def borrowed_quantity(self):
-        # Isto SOMA corretamente a quantidade de todos os empréstimos ativos
-        result = self.loan_set.filter(returned_date__isnull=True).aggregate(total=Sum('quantity'))
-        return result['total'] or 0
+    objects = ToolQuerySet.as_manager()
 
     @property
     def available_quantity(self):
         return self.total_quantity - self.borrowed_quantity
+
+    # O contador só é gravado pelo inventory.stock (e as versões da foto por
+    # inventory.images): o UPDATE de um save() comum, de uma instância
+    # carregada antes, não pode sobrescrevê-los.
+    WRITTEN_ELSEWHERE = ('borrowed_quantity', 'image_renditions')
+
+    def _do_update(self, base_qs, using, pk_val, values, update_fields, forced_update):
+        # Só o UPDATE deixa as colunas de fora: se nenhuma linha for afetada,
+        # o save() continua caindo no INSERT completo, como no Django
+        if update_fields is None:
+            values = [value for value in values if value[0].name not in self.WRITTEN_ELSEWHERE]
+        return super()._do_update(base_qs, using, pk_val, values, update_fields, forced_update)
+
     class Meta:
             permissions = [
                 ("dashboard", "Pode ver o Dashboard"),
@@ -47,6 +97,15 @@ class Tool(models.Model):
                 ("history", "Pode ver o Histórico de Empréstimos"),
                 ("analytics", "Pode ver a página de Análise e Relatórios"),
             ]
+            constraints = [
+                models.CheckConstraint(
+                    condition=models.Q(borrowed_quantity__gte=0),
+                    name='tool_borrowed_quantity_non_negative',
+                ),
+            ]
+            indexes = [
+                models.Index(fields=['name', 'id'], name='tool_name_id_idx'),
+            ]
 
     def __str__(self):
             return self.name
@@ -65,8 +124,174 @@ class Loan(models.Model):
     due_date = models.DateField()
     returned_date = models.DateField(blank=True, null=True)
 
+    objects = LoanQuerySet.as_manager()
+
+    def save(self, *args, **kwargs):
+        # O post_save reserva o estoque (inventory.signals): se faltar
+        # unidade, o INSERT/UPDATE é desfeito junto
+        with transaction.atomic():
+            super().save(*args, **kwargs)
+
+    class Meta:
+        indexes = [
+            # Lista completa, histórico e filtros por período (a maior parte das linhas já foi devolvida)
+            models.Index(fields=['borrowed_date', 'id'], name='loan_borrowed_date_id_idx'),
+            # Índices parciais só com os empréstimos ativos (o conjunto "quente"),
+            # pequenos e usados pelo Dashboard, páginas de empréstimos e estoque
+            models.Index(
+                fields=['due_date'],
+                name='loan_active_due_date_idx',
+                condition=models.Q(returned_date__isnull=True),
+            ),
+            models.Index(
+                fields=['tool', 'quantity'],
+                name='loan_active_tool_qty_idx',
+                condition=models.Q(returned_date__isnull=True),
+            ),
+            models.Index(
+                fields=['borrowed_date', 'id'],
+                name='loan_active_borrowed_idx',
+                condition=models.Q(returned_date__isnull=True),
+            ),
+        ]
+
     def is_overdue(self):
         return self.due_date < timezone.now().date() and self.returned_date is None
 
     def __str__(self):
-        return f"{self.quantity}x {self.tool.name} emprestado para {self.borrower.username}"
+        return f"{self.quantity}x {self.tool.name} emprestado para {self.employee.name if self.employee else '-'}"
+
+
+class Job(models.Model):
+    """
+    Tarefa em segundo plano (exportações e relatórios pesados), executada
+    pelo worker de inventory.jobs fora da thread da requisição.
+    """
+    PENDING = 'pending'
+    RUNNING = 'running'
+    DONE = 'done'
+    FAILED = 'failed'
+    STATUS_CHOICES = [
+        (PENDING, 'Na fila'),
+        (RUNNING, 'Em execução'),
+        (DONE, 'Concluída'),
+        (FAILED, 'Falhou'),
+    ]
+
+    kind = models.CharField(max_length=50)
+    params = models.JSONField(default=dict, blank=True)
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default=PENDING)
+    attempts = models.PositiveIntegerField(default=0)
+    error = models.TextField(blank=True)
+    result_file = models.FileField(upload_to='jobs/', max_length=300, blank=True)
+    created_by = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, null=True, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    run_after = models.DateTimeField(default=timezone.now)
+    started_at = models.DateTimeField(blank=True, null=True)
+    finished_at = models.DateTimeField(blank=True, null=True)
+    expires_at = models.DateTimeField(blank=True, null=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['status', 'run_after'], name='job_status_run_after_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.kind} #{self.pk} ({self.get_status_display()})"
+
+
+class LoanMonthlyStats(models.Model):
+    """
+    Total de empréstimos por mês (data do empréstimo), mantido de forma
+    incremental por inventory.rollups. Lido pelo gráfico de Análise no lugar
+    de um GROUP BY sobre a tabela inteira de empréstimos.
+    """
+    month = models.DateField(unique=True)  # primeiro dia do mês
+    loan_count = models.IntegerField(default=0)
+    quantity_total = models.IntegerField(default=0)
+
+    class Meta:
+        ordering = ['month']
+
+    def __str__(self):
+        return f"{self.month:%Y-%m}: {self.loan_count} empréstimo(s)"
+
+
+class MaintenanceMonthlyStats(models.Model):
+    """
+    Custos e quantidade de manutenções por mês, mantidos de forma incremental
+    por inventory.rollups a partir do histórico de manutenções (MaintenanceEvent).
+    """
+    month = models.DateField(unique=True)  # primeiro dia do mês
+    total_cost = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    maintenance_count = models.IntegerField(default=0)
+
+    class Meta:
+        ordering = ['month']
+
+    def __str__(self):
+        return f"{self.month:%Y-%m}: {self.maintenance_count} manutenção(ões)"
+
+
+class MaintenanceEvent(models.Model):
+    """
+    Registro de uma manutenção de ferramenta. Só recebe inclusões: os campos
+    de manutenção em Tool guardam apenas a última, enquanto esta tabela guarda
+    o histórico completo, indexado para consultas por período.
+    """
+    tool = models.ForeignKey(Tool, on_delete=models.CASCADE, related_name='maintenance_events')
+    date = models.DateField()
+    cost = models.DecimalField(max_digits=10, decimal_places=2, blank=True, null=True)
+    condition = models.CharField(max_length=20, choices=Tool.CONDITION_CHOICES, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        ordering = ['-date', '-id']
+        indexes = [
+            models.Index(fields=['date'], name='maintenance_date_idx'),
+            models.Index(fields=['tool', 'date'], name='maintenance_tool_date_idx'),
+        ]
+
+    def __str__(self):
+        return f"Manutenção de {self.tool.name} em {self.date}"
+
+
+class SlowQuery(models.Model):
+    """
+    Consulta lenta agrupada pela impressão digital do SQL (valores
+    literais removidos), gravada por inventory.slow_queries.
+    """
+    fingerprint = models.CharField(max_length=40, unique=True)
+    sql = models.TextField()
+    params = models.TextField(blank=True)
+    call_site = models.CharField(max_length=300, blank=True)
+    route = models.CharField(max_length=100, blank=True)
+    explain = models.TextField(blank=True)
+    count = models.PositiveIntegerField(default=0)
+    total_time = models.FloatField(default=0, help_text="Segundos")
+    max_time = models.FloatField(default=0, help_text="Segundos")
+    first_seen = models.DateTimeField(auto_now_add=True)
+    last_seen = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        ordering = ['-total_time']
+        verbose_name_plural = 'slow queries'
+
+    @property
+    def avg_time(self):
+        return self.total_time / self.count if self.count else 0
+
+    def __str__(self):
+        return f"{self.call_site or '?'}: {self.sql[:80]}"
+
+
+class ModelVersion(models.Model):
+    """
+    Contador de versão por tabela, incrementado a cada escrita (ver
+    inventory.versions). Os ETags das listagens derivam dele.
+    """
+    name = models.CharField(max_length=50, primary_key=True)
+    version = models.PositiveBigIntegerField(default=0)
+
+    def __str__(self):
+        return f"{self.name} v{self.version}"
@@ -0,0 +1,140 @@
+# inventory/pagination.py
+
+import base64
+import json
+
+from django.core.exceptions import ValidationError
+from django.db.models import Q
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination
+from rest_framework.response import Response
+from rest_framework.settings import api_settings
+from rest_framework.utils.urls import replace_query_param
+
+
+class KeysetPagination(BasePagination):
+    """
+    Paginação por cursor (keyset) sobre um par (campo, id).
+
+    Em vez de OFFSET, cada página filtra a partir da última linha da página
+    anterior, usando o índice composto (campo, id): o custo é o mesmo na
+    primeira ou na milésima página. O cursor é opaco para o cliente, que só
+    segue o link 'next'.
+
+    Chamadores internos (ex.: listas de seleção) podem desligar a paginação
+    com '?paginate=false'.
+    """
+    ordering = ('id', 'id')
+    page_size = api_settings.PAGE_SIZE or 50
+    max_page_size = 500
+    cursor_query_param = 'cursor'
+    page_size_query_param = 'page_size'
+    opt_out_query_param = 'paginate'
+    invalid_cursor_message = 'Cursor inválido.'
+
+    def paginate_queryset(self, queryset, request, view=None):
+        if request.query_params.get(self.opt_out_query_param) == 'false':
+            return None
+
+        self.request = request
+        self.page_size = self.get_page_size(request)
+        field, tiebreaker = self.ordering
+        descending = field.startswith('-')
+        field = field.lstrip('-')
+        tiebreaker = tiebreaker.lstrip('-')
+
+        queryset = queryset.order_by(*(
+            (f'-{name}' if descending else name) for name in (field, tiebreaker)
+        ))
+        cursor = self.decode_cursor(request, queryset.model, field, tiebreaker)
+        if cursor is not None:
+            value, last_id = cursor
+            op = 'lt' if descending else 'gt'
+            queryset = queryset.filter(
+                Q(**{f'{field}__{op}': value}) | Q(**{field: value, f'{tiebreaker}__{op}': last_id})
+            )
+
+        # Busca uma linha a mais só para saber se existe próxima página
+        rows = list(queryset[:self.page_size + 1])
+        self.has_next = len(rows) > self.page_size
+        rows = rows[:self.page_size]
+        self.next_position = None
+        if self.has_next:
+            last = rows[-1]
+            self.next_position = (self._get_value(last, field), self._get_value(last, tiebreaker))
+        return rows
+
+    def get_page_size(self, request):
+        try:
+            size = int(request.query_params[self.page_size_query_param])
+        except (KeyError, ValueError):
+            return self.page_size
+        return max(1, min(size, self.max_page_size))
+
+    def decode_cursor(self, request, model, field, tiebreaker):
+        """ (valor, id) do cursor, já convertidos pelos campos do model; 404 se inválido. """
+        encoded = request.query_params.get(self.cursor_query_param)
+        if not encoded:
+            return None
+        try:
+            position = json.loads(base64.urlsafe_b64decode(encoded.encode('ascii')))
+            if not isinstance(position, list) or len(position) != 2:
+                raise ValueError(position)
+            cursor = tuple(
+                model._meta.get_field(name).to_python(item) for name, item in zip((field, tiebreaker), position)
+            )
+        except (TypeError, ValueError, UnicodeError, ValidationError):
+            raise NotFound(self.invalid_cursor_message)
+        if None in cursor:
+            raise NotFound(self.invalid_cursor_message)
+        return cursor
+
+    def encode_cursor(self, position):
+        encoded = base64.urlsafe_b64encode(json.dumps(position).encode('utf-8')).decode('ascii')
+        url = self.request.build_absolute_uri()
+        return replace_query_param(url, self.cursor_query_param, encoded)
+
+    def get_next_link(self):
+        if not self.has_next:
+            return None
+        return self.encode_cursor(self.next_position)
+
+    def get_paginated_response(self, data):
+        return Response({
+            'next': self.get_next_link(),
+            'results': data,
+        })
+
+    def get_paginated_response_schema(self, schema):
+        return {
+            'type': 'object',
+            'required': ['results'],
+            'properties': {
+                'next': {'type': 'string', 'nullable': True, 'format': 'uri'},
+                'results': schema,
+            },
+        }
+
+    @staticmethod
+    def _get_value(instance, name):
+        value = getattr(instance, name)
+        # Datas viram 'YYYY-MM-DD', que o ORM aceita de volta no filtro
+        return value.isoformat() if hasattr(value, 'isoformat') else value
+
+
+class ToolPagination(KeysetPagination):
+    ordering = ('name', 'id')
+
+
+class EmployeePagination(KeysetPagination):
+    ordering = ('name', 'id')
+
+
+class LoanPagination(KeysetPagination):
+    # Mais recentes primeiro
+    ordering = ('-borrowed_date', '-id')
+
+
+class MaintenanceEventPagination(KeysetPagination):
+    # Mais recentes primeiro, pelo índice (tool, date)
+    ordering = ('-date', '-id')
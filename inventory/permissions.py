@@ -0,0 +1,41 @@
+# inventory/permissions.py
+
+"""
+Permissões de página (Tool.Meta.permissions) aplicadas também na API.
+
+Cada view declara em 'model_permissions' quais permissões dão acesso:
+
+    model_permissions = {
+        'read': ('manage_tools', 'virtual_warehouse'),  # GET/HEAD/OPTIONS
+        'write': ('manage_tools',),                      # demais métodos
+        'bulk': ('register_loan',),                      # uma action específica
+    }
+
+Basta ter uma das permissões listadas: elas são por página, e várias
+páginas leem os mesmos dados. A checagem usa o conjunto já carregado no
+usuário (users.authentication), sem consultas por requisição.
+"""
+
+from rest_framework.permissions import SAFE_METHODS, BasePermission
+
+
+def has_any(user, codenames):
+    return any(user.has_perm(f'inventory.{codename}') for codename in codenames)
+
+
+def required_permissions(view, request):
+    mapping = getattr(view, 'model_permissions', {})
+    action = getattr(view, 'action', None)
+    if action in mapping:
+        return mapping[action]
+    return mapping.get('read' if request.method in SAFE_METHODS else 'write', ())
+
+
+class HasModelPermission(BasePermission):
+    message = "Você não tem permissão para acessar esta página."
+
+    def has_permission(self, request, view):
+        user = request.user
+        if not (user and user.is_authenticated):
+            return False
+        return user.is_superuser or has_any(user, required_permissions(view, request))
@@ -0,0 +1,246 @@
+# inventory/profiling.py
+
+"""
+Profiler por requisição, ativado sob demanda.
+
+Uma requisição é executada sob cProfile quando um administrador envia o
+cabeçalho 'X-Profile: 1' (ou '?_profile=1'), ou por amostragem
+(PROFILING['SAMPLE_RATE']). Nas demais, o custo é só a checagem do
+cabeçalho e um número aleatório.
+
+Cada perfil vira três arquivos em PROFILING['DIR'], em anel limitado a
+PROFILING['MAX_PROFILES']:
+  <id>.prof       dados do pstats (abrir com snakeviz, pstats etc.)
+  <id>.collapsed  pilhas "a;b;c microssegundos" para flame graph
+  <id>.json       método, caminho, status e duração
+A listagem e o download ficam em /api/profiles/ (apenas administradores).
+
+Na pilha ASGI o middleware é async. O cProfile só vê a thread em que foi
+ligado; lá ele perfila a thread síncrona da requisição (DRF, serializers,
+ORM), que o Django reserva para cada requisição. O tempo no event loop e
+nas threads de run_concurrently entra só na duração total.
+"""
+
+import cProfile
+import json
+import pstats
+import random
+import re
+import time
+import uuid
+from pathlib import Path
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, sync_to_async
+from django.conf import settings
+from django.utils import timezone
+from rest_framework.exceptions import AuthenticationFailed
+from users.authentication import CachedJWTAuthentication
+
+DEFAULTS = {
+    'SAMPLE_RATE': 0.0,
+    'MAX_PROFILES': 50,
+    'DIR': None,  # padrão: BASE_DIR / 'profiles'
+}
+HEADER = 'X-Profile'
+QUERY_PARAM = '_profile'
+PROFILE_ID = re.compile(r'^[0-9A-Za-z_-]+$')
+MAX_STACK_DEPTH = 64
+
+
+def get_setting(name):
+    return getattr(settings, 'PROFILING', {}).get(name, DEFAULTS[name])
+
+
+def profile_dir():
+    return Path(get_setting('DIR') or settings.BASE_DIR / 'profiles')
+
+
+def _staff_request(request):
+    user = getattr(request, 'user', None)
+    if user is not None and user.is_authenticated:
+        return user.is_staff
+    try:
+        result = CachedJWTAuthentication().authenticate(request)
+    except AuthenticationFailed:
+        return False
+    return bool(result and result[0].is_staff)
+
+
+def _flagged(request):
+    return request.headers.get(HEADER) == '1' or request.GET.get(QUERY_PARAM) == '1'
+
+
+def _sampled():
+    rate = get_setting('SAMPLE_RATE')
+    return rate > 0 and random.random() < rate
+
+
+def should_profile(request):
+    if _flagged(request):
+        return _staff_request(request)
+    return _sampled()
+
+
+def collapsed_stacks(stats):
+    """
+    Converte pstats em pilhas colapsadas. O cProfile guarda apenas pares
+    chamador -> chamado, não pilhas completas; aqui cada função fica sob o
+    chamador que mais tempo gastou nela, formando uma árvore (aproximação
+    suficiente para achar os trechos caros num flame graph).
+    """
+    def label(func):
+        filename, line, name = func
+        return f"{name} ({Path(filename).name}:{line})" if line else name
+
+    parents = {}
+    for func, (_, _, _, _, callers) in stats.stats.items():
+        heaviest = max(callers.items(), key=lambda item: item[1][3], default=None)
+        parents[func] = heaviest[0] if heaviest and heaviest[0] in stats.stats else None
+
+    paths = {}
+
+    def path(func):
+        chain = []
+        node = func
+        while node is not None and node not in paths and node not in chain and len(chain) < MAX_STACK_DEPTH:
+            chain.append(node)
+            node = parents[node]
+        prefix = paths.get(node, '')
+        for item in reversed(chain):
+            prefix = paths[item] = f"{prefix};{label(item)}" if prefix else label(item)
+        return paths[func]
+
+    lines = {}
+    for func, (_, _, tt, _, _) in stats.stats.items():
+        value = int(tt * 1_000_000)
+        if value:
+            key = path(func)
+            lines[key] = lines.get(key, 0) + value
+    return ''.join(f"{stack} {value}\n" for stack, value in sorted(lines.items()))
+
+
+def new_profile_id():
+    return f"{timezone.now():%Y%m%dT%H%M%S%f}-{uuid.uuid4().hex[:8]}"
+
+
+def save_profile(profile_id, profiler, request, status_code, duration):
+    directory = profile_dir()
+    directory.mkdir(parents=True, exist_ok=True)
+    stats = pstats.Stats(profiler)
+    stats.dump_stats(directory / f'{profile_id}.prof')
+    (directory / f'{profile_id}.collapsed').write_text(collapsed_stacks(stats), encoding='utf-8')
+    match = getattr(request, 'resolver_match', None)
+    meta = {
+        'id': profile_id,
+        'created_at': timezone.now().isoformat(),
+        'method': request.method,
+        'path': request.get_full_path(),
+        'route': match.url_name if match else None,
+        'status': status_code,
+        'duration_ms': round(duration * 1000, 3),
+        'total_calls': stats.total_calls,
+    }
+    (directory / f'{profile_id}.json').write_text(json.dumps(meta), encoding='utf-8')
+    _trim(directory)
+    return profile_id
+
+
+def _trim(directory):
+    """ Mantém apenas os MAX_PROFILES perfis mais recentes. """
+    metas = sorted(directory.glob('*.json'))
+    for meta in metas[:max(len(metas) - get_setting('MAX_PROFILES'), 0)]:
+        for suffix in ('.prof', '.collapsed', '.json'):
+            meta.with_suffix(suffix).unlink(missing_ok=True)
+
+
+def list_profiles():
+    profiles = []
+    for meta in sorted(profile_dir().glob('*.json'), reverse=True):
+        try:
+            profiles.append(json.loads(meta.read_text(encoding='utf-8')))
+        except (OSError, ValueError):
+            continue  # removido ou ainda sendo gravado
+    return profiles
+
+
+def profile_file(profile_id, suffix):
+    """ Caminho de um arquivo do perfil, ou None se não existir. """
+    if not PROFILE_ID.match(profile_id):
+        return None
+    path = profile_dir() / f'{profile_id}{suffix}'
+    return path if path.exists() else None
+
+
+class ProfilingMiddleware:
+    """
+    Executa a requisição sob cProfile quando should_profile() permitir.
+    Respostas em streaming são perfiladas também durante o envio, e o
+    perfil é gravado quando o último bloco sai (no modo async, quando a
+    resposta começa a sair).
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        if not should_profile(request):
+            return self.get_response(request)
+
+        profile_id = new_profile_id()
+        profiler = cProfile.Profile()
+        start = time.perf_counter()
+        profiler.enable()
+        try:
+            response = self.get_response(request)
+        finally:
+            profiler.disable()
+
+        if response.streaming:
+            response.streaming_content = self._profiled_stream(
+                response.streaming_content, profile_id, profiler, request, response.status_code, start,
+            )
+        else:
+            save_profile(profile_id, profiler, request, response.status_code, time.perf_counter() - start)
+        response['X-Profile-Id'] = profile_id
+        return response
+
+    async def __acall__(self, request):
+        # Só a checagem de administrador consulta o banco; sem o cabeçalho, nenhuma troca de thread
+        if not (await sync_to_async(_staff_request)(request) if _flagged(request) else _sampled()):
+            return await self.get_response(request)
+
+        profile_id = new_profile_id()
+        profiler = cProfile.Profile()
+        start = time.perf_counter()
+        # enable/disable na mesma thread síncrona que executa o resto da requisição
+        await sync_to_async(profiler.enable)()
+        try:
+            response = await self.get_response(request)
+        finally:
+            await sync_to_async(profiler.disable)()
+        await sync_to_async(save_profile)(profile_id, profiler, request, response.status_code,
+                                          time.perf_counter() - start)
+        response['X-Profile-Id'] = profile_id
+        return response
+
+    @staticmethod
+    def _profiled_stream(content, profile_id, profiler, request, status_code, start):
+        iterator = iter(content)
+        try:
+            while True:
+                profiler.enable()
+                try:
+                    chunk = next(iterator)
+                except StopIteration:
+                    break
+                finally:
+                    profiler.disable()
+                yield chunk
+        finally:
+            save_profile(profile_id, profiler, request, status_code, time.perf_counter() - start)
@@ -0,0 +1,194 @@
+# inventory/reports.py
+
+from datetime import datetime, time, timedelta
+
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import Count, Sum, F, Q, DecimalField
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+
+from .async_views import run_concurrently
+from .models import Tool, Loan, LoanMonthlyStats, MaintenanceEvent, MaintenanceMonthlyStats
+
+DASHBOARD_CACHE_KEY = 'inventory:dashboard'
+
+
+def _tool_totals():
+    return Tool.objects.aggregate(
+        total_tool_types=Count('id'),
+        total_items=Coalesce(Sum('total_quantity'), 0),
+        tools_in_maintenance=Coalesce(Sum('total_quantity', filter=Q(condition='maintenance')), 0),
+        total_maintenance_cost=Coalesce(Sum('maintenance_cost'), 0.00, output_field=DecimalField()),
+        # Valor total (preço unitário * quantidade total de cada ferramenta)
+        total_inventory_value=Coalesce(
+            Sum(F('total_quantity') * F('unit_value'), output_field=DecimalField()), 0.00, output_field=DecimalField()
+        ),
+    )
+
+
+def _loan_totals(today):
+    # Só empréstimos ativos: a consulta lê o índice parcial, não a tabela toda
+    return Loan.objects.filter(returned_date__isnull=True).aggregate(
+        active_loans_count=Count('id'),
+        overdue_loans_count=Count('id', filter=Q(due_date__lt=today)),
+        total_borrowed=Coalesce(Sum('quantity'), 0),
+    )
+
+
+def _dashboard_payload(tools, loans):
+    return {
+        "total_tool_types": tools['total_tool_types'],
+        "active_loans_count": loans['active_loans_count'],
+        "overdue_loans_count": loans['overdue_loans_count'],
+        "available_in_warehouse": tools['total_items'] - loans['total_borrowed'],
+        "tools_in_maintenance": tools['tools_in_maintenance'],
+        "total_maintenance_cost": f"{tools['total_maintenance_cost']:.2f}",
+        "total_inventory_value": f"{tools['total_inventory_value']:.2f}",
+    }
+
+
+def dashboard_data():
+    """
+    Números do Dashboard com uma única consulta por tabela, usando agregação
+    condicional (Sum/Count com filter=Q(...)) em vez de uma query por número.
+    """
+    return _dashboard_payload(_tool_totals(), _loan_totals(timezone.now().date()))
+
+
+async def adashboard_data():
+    """ dashboard_data() com as duas consultas ao mesmo tempo (ver async_views.run_concurrently). """
+    today = timezone.now().date()
+    tools, loans = await run_concurrently(_tool_totals, lambda: _loan_totals(today))
+    return _dashboard_payload(tools, loans)
+
+
+def _cached_entry(entry, now):
+    if entry is not None and entry['date'] == now.date():
+        return entry['data'], True, (now - entry['computed_at']).total_seconds()
+    return None
+
+
+def _cache_timeout(now):
+    midnight = datetime.combine(now.date() + timedelta(days=1), time.min, tzinfo=now.tzinfo)
+    return max(1, int((midnight - now).total_seconds()))
+
+
+def cached_dashboard_data():
+    """
+    Devolve (dados, veio_do_cache, idade_em_segundos).
+
+    O cache é apagado a cada escrita em Tool/Loan (ver inventory.signals) e
+    expira à meia-noite, quando empréstimos passam a contar como atrasados
+    sem nenhuma escrita no banco.
+    """
+    now = timezone.now()
+    cached = _cached_entry(cache.get(DASHBOARD_CACHE_KEY), now)
+    if cached is not None:
+        return cached
+    data = dashboard_data()
+    cache.set(DASHBOARD_CACHE_KEY, {'data': data, 'date': now.date(), 'computed_at': now}, timeout=_cache_timeout(now))
+    return data, False, 0
+
+
+async def acached_dashboard_data():
+    """ Versão async de cached_dashboard_data(), com o mesmo cache. """
+    now = timezone.now()
+    cached = _cached_entry(await cache.aget(DASHBOARD_CACHE_KEY), now)
+    if cached is not None:
+        return cached
+    data = await adashboard_data()
+    await cache.aset(DASHBOARD_CACHE_KEY, {'data': data, 'date': now.date(), 'computed_at': now},
+                     timeout=_cache_timeout(now))
+    return data, False, 0
+
+
+def invalidate_dashboard():
+    """
+    Apaga o cache do Dashboard agora e de novo após o commit, para que uma
+    leitura concorrente não guarde dados anteriores à transação.
+    """
+    cache.delete(DASHBOARD_CACHE_KEY)
+    transaction.on_commit(lambda: cache.delete(DASHBOARD_CACHE_KEY))
+
+
+def _analytics_queries(month_from=None, month_to=None):
+    """ Consultas independentes dos gráficos, por nome. """
+    months = Q()
+    if month_from:
+        months &= Q(month__gte=month_from)
+    if month_to:
+        months &= Q(month__lte=month_to)
+    return {
+        # 1. Ferramentas por Condição (Gráfico de Pizza)
+        'tools_by_condition': Tool.objects.values('condition').annotate(count=Count('id')).order_by('condition'),
+        # 2. Valor Total do Inventário por Ferramenta (Gráfico de Barras)
+        'inventory_value': Tool.objects.annotate(
+            total_value=F('total_quantity') * F('unit_value')
+        ).values('name', 'total_value').order_by('-total_value')[:10],
+        # 3 e 5. Custos e quantidade de manutenções por mês (Gráficos de Linha)
+        'maintenance': MaintenanceMonthlyStats.objects.filter(months, maintenance_count__gt=0)
+        .values('month', 'total_cost', 'maintenance_count'),
+        # 4. Empréstimos por Mês (Gráfico de Barras)
+        'loan_activity': LoanMonthlyStats.objects.filter(months, loan_count__gt=0).values('month', 'loan_count'),
+    }
+
+
+def _analytics_payload(rows):
+    maintenance = rows['maintenance']
+    return {
+        'tools_by_condition': rows['tools_by_condition'],
+        'inventory_value_by_tool': rows['inventory_value'],
+        'maintenance_cost_over_time': [
+            {'month': entry['month'].strftime('%Y-%m'), 'total_cost': entry['total_cost']} for entry in maintenance
+        ],
+        'loan_activity': [
+            {'month': entry['month'].strftime('%Y-%m'), 'count': entry['loan_count']} for entry in rows['loan_activity']
+        ],
+        'maintenances_per_month': [
+            {'month': entry['month'].strftime('%Y-%m'), 'count': entry['maintenance_count']} for entry in maintenance
+        ],
+    }
+
+
+def analytics_data(month_from=None, month_to=None):
+    """
+    Dados dos gráficos da página de Análise. As séries mensais vêm das
+    tabelas de resumo (inventory.rollups), opcionalmente limitadas ao
+    intervalo [month_from, month_to] (primeiro dia de cada mês).
+    """
+    queries = _analytics_queries(month_from, month_to)
+    return _analytics_payload({name: list(queryset) for name, queryset in queries.items()})
+
+
+async def aanalytics_data(month_from=None, month_to=None):
+    """ analytics_data() com as consultas dos gráficos ao mesmo tempo. """
+    queries = _analytics_queries(month_from, month_to)
+    results = await run_concurrently(*(lambda qs=queryset: list(qs) for queryset in queries.values()))
+    return _analytics_payload(dict(zip(queries, results)))
+
+
+def maintenance_cost_report(date_from=None, date_to=None):
+    """
+    Custo de manutenção por ferramenta num período. Filtra o histórico
+    (MaintenanceEvent) pelo índice de data, lendo só os eventos do período.
+    """
+    events = MaintenanceEvent.objects.all()
+    if date_from:
+        events = events.filter(date__gte=date_from)
+    if date_to:
+        events = events.filter(date__lte=date_to)
+    rows = (
+        events.values('tool', 'tool__name')
+        .annotate(maintenance_count=Count('id'), total_cost=Coalesce(Sum('cost'), 0.00, output_field=DecimalField()))
+        .order_by('-total_cost', 'tool')
+    )
+    return [
+        {
+            'tool': row['tool'],
+            'tool_name': row['tool__name'],
+            'maintenance_count': row['maintenance_count'],
+            'total_cost': row['total_cost'],
+        }
+        for row in rows
+    ]
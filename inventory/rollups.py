@@ -0,0 +1,111 @@
+# inventory/rollups.py
+
+"""
+Tabelas de resumo mensal usadas pela página de Análise.
+
+Cada escrita em Loan/MaintenanceEvent aplica apenas a diferença no mês afetado (ver
+inventory.signals), então os gráficos leem algumas dezenas de linhas em vez
+de agrupar a tabela inteira. 'rebuild()' recalcula tudo do zero (comando
+rebuild_analytics).
+"""
+
+from decimal import Decimal
+
+from django.db import IntegrityError, transaction
+from django.db.models import Count, Sum, F
+from django.db.models.functions import Coalesce, TruncMonth
+
+from .models import Loan, LoanMonthlyStats, MaintenanceEvent, MaintenanceMonthlyStats
+
+
+def month_of(day):
+    return day.replace(day=1) if day else None
+
+
+def _bump(model, month, **deltas):
+    """ Soma 'deltas' na linha do mês, criando-a se ainda não existir. """
+    deltas = {field: value for field, value in deltas.items() if value}
+    if month is None or not deltas:
+        return
+    increments = {field: F(field) + value for field, value in deltas.items()}
+    if model.objects.filter(month=month).update(**increments):
+        return
+    try:
+        with transaction.atomic():
+            model.objects.create(month=month, **deltas)
+    except IntegrityError:
+        # Outra requisição criou a linha ao mesmo tempo
+        model.objects.filter(month=month).update(**increments)
+
+
+def loan_created(loan, sign=1):
+    _bump(LoanMonthlyStats, month_of(loan.borrowed_date), loan_count=sign, quantity_total=sign * loan.quantity)
+
+
+def loan_deleted(loan):
+    loan_created(loan, sign=-1)
+
+
+def loans_created(loans):
+    """ Para bulk_create, que não dispara post_save: uma atualização por mês. """
+    months = {}
+    for loan in loans:
+        count, quantity = months.get(month_of(loan.borrowed_date), (0, 0))
+        months[month_of(loan.borrowed_date)] = (count + 1, quantity + loan.quantity)
+    for month, (count, quantity) in months.items():
+        _bump(LoanMonthlyStats, month, loan_count=count, quantity_total=quantity)
+
+
+def maintenance_snapshot(event):
+    """ Contribuição de um evento de manutenção para o resumo mensal. """
+    if event is None:
+        return None
+    return {'month': month_of(event.date), 'cost': event.cost or Decimal('0')}
+
+
+def maintenance_events_created(events):
+    """ Para bulk_create de MaintenanceEvent: uma atualização por mês. """
+    months = {}
+    for event in events:
+        count, cost = months.get(month_of(event.date), (0, Decimal('0')))
+        months[month_of(event.date)] = (count + 1, cost + (event.cost or Decimal('0')))
+    for month, (count, cost) in months.items():
+        _bump(MaintenanceMonthlyStats, month, maintenance_count=count, total_cost=cost)
+
+
+def _apply_snapshot(snapshot, sign):
+    if snapshot is None or snapshot['month'] is None:
+        return
+    _bump(MaintenanceMonthlyStats, snapshot['month'], maintenance_count=sign, total_cost=sign * snapshot['cost'])
+
+
+def maintenance_changed(old, new):
+    """ Troca a contribuição antiga do evento pela nova (ambas podem ser None). """
+    if old == new:
+        return
+    _apply_snapshot(old, -1)
+    _apply_snapshot(new, 1)
+
+
+@transaction.atomic
+def rebuild():
+    """ Recalcula os resumos mensais a partir das tabelas de origem. """
+    LoanMonthlyStats.objects.all().delete()
+    MaintenanceMonthlyStats.objects.all().delete()
+
+    loans = (
+        Loan.objects.annotate(month=TruncMonth('borrowed_date'))
+        .values('month')
+        .annotate(loan_count=Count('id'), quantity_total=Coalesce(Sum('quantity'), 0))
+        .order_by('month')
+    )
+    LoanMonthlyStats.objects.bulk_create(LoanMonthlyStats(**row) for row in loans)
+
+    maintenance = (
+        MaintenanceEvent.objects.annotate(month=TruncMonth('date'))
+        .values('month')
+        .annotate(maintenance_count=Count('id'), total_cost=Coalesce(Sum('cost'), Decimal('0')))
+        .order_by('month')
+    )
+    MaintenanceMonthlyStats.objects.bulk_create(MaintenanceMonthlyStats(**row) for row in maintenance)
+    return LoanMonthlyStats.objects.count(), MaintenanceMonthlyStats.objects.count()
@@ -0,0 +1,152 @@
+# inventory/search.py
+
+"""
+Busca textual de ferramentas e funcionários.
+
+No SQLite a busca usa tabelas virtuais FTS5 de conteúdo externo (o texto
+fica só nas tabelas originais), mantidas por triggers: qualquer escrita,
+inclusive bulk_create/bulk_update e .update(), atualiza o índice sem
+depender de signals. Cada palavra digitada vira um prefixo ("mar" acha
+"Martelo"), acentos são ignorados e o resultado vem ordenado por bm25.
+Nos outros bancos (ou se o índice não existir) cai em icontains.
+"""
+
+import re
+
+from django.db import connection, connections
+from django.db.models import Case, IntegerField, Q, Value, When
+
+from .models import Employee, Tool
+
+DEFAULT_LIMIT = 20
+MAX_LIMIT = 100
+
+# tabela original -> (tabela FTS, colunas indexadas, pesos do bm25)
+FTS_TABLES = {
+    'inventory_tool': ('inventory_tool_fts', ('name', 'description', 'supplier'), (10.0, 1.0, 2.0)),
+    'inventory_employee': ('inventory_employee_fts', ('name', 'registration_number'), (5.0, 10.0)),
+}
+
+_fts_ready = {}  # nome do banco -> índices criados?
+
+
+def _trigger_statements(table, fts, columns):
+    cols = ', '.join(columns)
+    new = ', '.join(f'new.{c}' for c in columns)
+    old = ', '.join(f'old.{c}' for c in columns)
+    insert = f"INSERT INTO {fts}(rowid, {cols}) VALUES (new.id, {new});"
+    delete = f"INSERT INTO {fts}({fts}, rowid, {cols}) VALUES ('delete', old.id, {old});"
+    return [
+        f"CREATE TRIGGER IF NOT EXISTS {fts}_ai AFTER INSERT ON {table} BEGIN {insert} END",
+        f"CREATE TRIGGER IF NOT EXISTS {fts}_ad AFTER DELETE ON {table} BEGIN {delete} END",
+        # Só as colunas indexadas: reservas de estoque não reescrevem o índice
+        f"CREATE TRIGGER IF NOT EXISTS {fts}_au AFTER UPDATE OF {cols} ON {table} BEGIN {delete} {insert} END",
+    ]
+
+
+def restore_fts_triggers(sender, using, **kwargs):
+    """
+    Receptor de post_migrate. O índice e os triggers são criados pela
+    migração 0017_search_index, com o SQL dela. Migrações que recriam a
+    tabela no SQLite (ex.: AddField) apagam os triggers dela; aqui eles
+    voltam e o índice é reconstruído, pois escritas feitas sem trigger não
+    foram indexadas.
+    """
+    conn = connections[using]
+    if conn.vendor != 'sqlite':
+        return
+    _fts_ready.clear()  # a migração 0017 pode ter criado ou removido o índice
+    with conn.cursor() as cursor:
+        cursor.execute("SELECT type, name FROM sqlite_master WHERE type IN ('table', 'trigger')")
+        existing = set(cursor.fetchall())
+        for table, (fts, columns, _) in FTS_TABLES.items():
+            if ('table', fts) not in existing:
+                continue  # migração do índice ainda não aplicada
+            triggers = {('trigger', f'{fts}_{suffix}') for suffix in ('ai', 'ad', 'au')}
+            if triggers <= existing:
+                continue
+            for statement in _trigger_statements(table, fts, columns):
+                cursor.execute(statement)
+            cursor.execute(f"INSERT INTO {fts}({fts}) VALUES ('rebuild')")
+
+
+def fts_available():
+    if connection.vendor != 'sqlite':
+        return False
+    name = connection.settings_dict['NAME']
+    if name not in _fts_ready:
+        tables = set(connection.introspection.table_names())
+        _fts_ready[name] = all(fts in tables for fts, _, _ in FTS_TABLES.values())
+    return _fts_ready[name]
+
+
+def terms(query):
+    """ Palavras da busca (letras e dígitos), sem a sintaxe do FTS5. """
+    return re.findall(r'\w+', query or '')[:10]
+
+
+def match_expression(words):
+    """ "mar ele" -> '"mar"* "ele"*' (todas as palavras, como prefixo). """
+    return ' '.join(f'"{word}"*' for word in words)
+
+
+def _ranked_ids(table, words, limit, where='', params=()):
+    fts, _, weights = FTS_TABLES[table]
+    sql = (
+        f"SELECT t.id FROM {fts} JOIN {table} t ON t.id = {fts}.rowid "
+        f"WHERE {fts} MATCH %s {where} "
+        f"ORDER BY bm25({fts}, {', '.join(map(str, weights))}), t.id LIMIT %s"
+    )
+    with connection.cursor() as cursor:
+        cursor.execute(sql, [match_expression(words), *params, limit])
+        return [row[0] for row in cursor.fetchall()]
+
+
+def _in_order(queryset, ids):
+    found = queryset.in_bulk(ids)
+    return [found[pk] for pk in ids if pk in found]
+
+
+def _fallback(queryset, words, fields, limit):
+    """ icontains em todas as palavras; quem começa pelo termo vem primeiro. """
+    for word in words:
+        condition = Q()
+        for field in fields:
+            condition |= Q(**{f'{field}__icontains': word})
+        queryset = queryset.filter(condition)
+    starts = Q(**{f'{fields[0]}__istartswith': words[0]})
+    return list(
+        queryset.annotate(rank=Case(When(starts, then=Value(0)), default=Value(1), output_field=IntegerField()))
+        .order_by('rank', fields[0], 'id')[:limit]
+    )
+
+
+def search_tools(query, conditions=None, limit=DEFAULT_LIMIT, queryset=None):
+    """
+    Ferramentas por nome, descrição ou fornecedor; sem termo, as primeiras por
+    nome. 'queryset' permite carregar só parte das colunas (ex.: '?fields=').
+    """
+    words = terms(query)
+    base = Tool.objects.all() if queryset is None else queryset
+    tools = base
+    if conditions:
+        tools = tools.filter(condition__in=conditions)
+    if not words:
+        return list(tools.order_by('name', 'id')[:limit])
+    if fts_available():
+        where, params = '', ()
+        if conditions:
+            where = f"AND t.condition IN ({', '.join(['%s'] * len(conditions))})"
+            params = tuple(conditions)
+        return _in_order(base, _ranked_ids('inventory_tool', words, limit, where, params))
+    return _fallback(tools, words, ('name', 'description', 'supplier'), limit)
+
+
+def search_employees(query, limit=DEFAULT_LIMIT):
+    """ Funcionários por nome ou matrícula; sem termo, os primeiros por nome. """
+    words = terms(query)
+    if not words:
+        return list(Employee.objects.order_by('name', 'id')[:limit])
+    if fts_available():
+        return _in_order(Employee.objects.all(), _ranked_ids('inventory_employee', words, limit))
+    return _fallback(Employee.objects.all(), words, ('name', 'registration_number'), limit)
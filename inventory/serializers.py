@@ -1,9 +1,89 @@
 # inventory/serializers.py
 
 from rest_framework import serializers
-from .models import Tool, Loan, Employee
+from rest_framework.permissions import SAFE_METHODS
+from . import images
+from .models import Tool, Loan, Employee, Job, MaintenanceEvent
 
-class ToolSerializer(serializers.ModelSerializer):
+
+def _names(value):
+    return [name.strip() for name in (value or '').split(',') if name.strip()]
+
+
+class DynamicFieldsMixin:
+    """
+    Campos sob demanda nas leituras (GET):
+
+        ?fields=id,name            só esses campos
+        ?expand=available_quantity acrescenta campos caros (Meta.expandable_fields)
+
+    Com qualquer um dos dois a resposta tem os campos de '?fields=' (ou
+    todos os que não são caros) mais os de '?expand='. Sem nenhum, a saída
+    é a completa de sempre.
+
+    restrict_queryset() aplica a mesma escolha ao SQL: only() com as colunas
+    usadas e select_related() só das relações pedidas. Campos que não são
+    colunas declaram as colunas que leem em Meta.field_sources.
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        selected = self.requested_fields(self.context.get('request'))
+        if selected is not None:
+            for name in set(self.fields) - set(selected):
+                self.fields.pop(name)
+
+    @classmethod
+    def requested_fields(cls, request):
+        """ Campos pedidos, na ordem de Meta.fields, ou None para a saída completa. """
+        if request is None or request.method not in SAFE_METHODS:
+            return None
+        params = getattr(request, 'query_params', request.GET)
+        if 'fields' not in params and 'expand' not in params:
+            return None
+        fields, expand = _names(params.get('fields')), _names(params.get('expand'))
+        expandable = set(cls.Meta.expandable_fields)
+        errors = {}
+        unknown = [name for name in fields if name not in cls.Meta.fields or name in expandable]
+        if unknown:
+            errors['fields'] = f"Campos inválidos: {', '.join(unknown)}. Campos caros vão em '?expand='."
+        unknown = [name for name in expand if name not in expandable]
+        if unknown:
+            errors['expand'] = f"Use um destes valores: {', '.join(cls.Meta.expandable_fields)}."
+        if errors:
+            raise serializers.ValidationError(errors)
+        wanted = set(fields or (name for name in cls.Meta.fields if name not in expandable)) | set(expand)
+        return [name for name in cls.Meta.fields if name in wanted]
+
+    @classmethod
+    def _sources(cls):
+        # Colunas (lookups do ORM) de cada campo; calculado uma vez por classe
+        if '_field_columns' not in cls.__dict__:
+            declared = getattr(cls.Meta, 'field_sources', {})
+            cls._field_columns = {
+                name: tuple(declared.get(name) or (field.source.replace('.', '__'),))
+                for name, field in cls().fields.items()
+            }
+        return cls._field_columns
+
+    @classmethod
+    def restrict_queryset(cls, queryset, names, extra=()):
+        """ 'queryset' lendo só as colunas e relações dos campos 'names' (e das colunas 'extra'). """
+        columns, related = set(extra), set()
+        for name in names:
+            for column in cls._sources()[name]:
+                columns.add(column)
+                if '__' in column:
+                    relation = column.split('__', 1)[0]
+                    related.add(relation)
+                    columns.add(relation)
+        queryset = queryset.select_related(None)
+        if related:  # select_related() sem argumentos seguiria todas as chaves estrangeiras
+            queryset = queryset.select_related(*sorted(related))
+        return queryset.only(*sorted(columns))
+
+
+class ToolSerializer(DynamicFieldsMixin, serializers.ModelSerializer):
     """
     Serializador para o modelo Tool.
     Inclui campos calculados para quantidade disponível e emprestada.
@@ -12,6 +92,24 @@ class ToolSerializer(serializers.ModelSerializer):
     available_quantity = serializers.ReadOnlyField()
     borrowed_quantity = serializers.ReadOnlyField()
     condition_display = serializers.CharField(source='get_condition_display', read_only=True)
+    # Versões redimensionadas da foto (inventory.images); null enquanto não forem geradas
+    image_thumb = serializers.SerializerMethodField()
+    image_card = serializers.SerializerMethodField()
+    image_full = serializers.SerializerMethodField()
+
+    def _renditions(self, tool):
+        request = self.context.get('request')
+        return images.rendition_urls(tool, request.build_absolute_uri if request else None)
+
+    def get_image_thumb(self, tool):
+        return self._renditions(tool).get('thumb')
+
+    def get_image_card(self, tool):
+        return self._renditions(tool).get('card')
+
+    def get_image_full(self, tool):
+        return self._renditions(tool).get('full')
+
     class Meta:
         model = Tool
         fields = [
@@ -22,6 +120,9 @@ class ToolSerializer(serializers.ModelSerializer):
             'available_quantity', # <-- Campo calculado
             'borrowed_quantity',  # <-- Campo calculado
             'image',
+            'image_thumb',
+            'image_card',
+            'image_full',
             'condition',
             'condition_display',
             'unit_value',
@@ -31,6 +132,23 @@ class ToolSerializer(serializers.ModelSerializer):
             'next_maintenance_date',
             'supplier'
         ]
+        expandable_fields = ['available_quantity', 'borrowed_quantity', 'image_thumb', 'image_card', 'image_full']
+        field_sources = {
+            'available_quantity': ('total_quantity', 'borrowed_quantity'),
+            'condition_display': ('condition',),
+            'image_thumb': ('image', 'image_renditions'),
+            'image_card': ('image', 'image_renditions'),
+            'image_full': ('image', 'image_renditions'),
+        }
+
+class MaintenanceEventSerializer(serializers.ModelSerializer):
+    """ Uma manutenção do histórico da ferramenta. """
+    condition_display = serializers.CharField(source='get_condition_display', read_only=True)
+
+    class Meta:
+        model = MaintenanceEvent
+        fields = ['id', 'tool', 'date', 'cost', 'condition', 'condition_display', 'created_at']
+        read_only_fields = fields
 
 # NOVO SERIALIZER
 class EmployeeSerializer(serializers.ModelSerializer):
@@ -38,7 +156,7 @@ class EmployeeSerializer(serializers.ModelSerializer):
         model = Employee
         fields = ['id', 'name', 'registration_number']
 
-class LoanSerializer(serializers.ModelSerializer):
+class LoanSerializer(DynamicFieldsMixin, serializers.ModelSerializer):
     """
     Serializador para o modelo Loan.
     """
@@ -55,14 +173,21 @@ class LoanSerializer(serializers.ModelSerializer):
             'id', 'tool', 'employee', 'quantity', 'borrowed_date', 
             'due_date', 'returned_date', 'tool_name', 'employee_name', 'employee_registration'
         ]
+        # Cada um exige um JOIN com a ferramenta ou o funcionário
+        expandable_fields = ['tool_name', 'employee_name', 'employee_registration']
         read_only_fields = ['borrowed_date']
 
+    def validate_quantity(self, value):
+        if value < 1:
+            raise serializers.ValidationError("A quantidade deve ser pelo menos 1.")
+        return value
+
     def validate(self, data):
             # Pega a condição do dado que está chegando. Se não estiver lá, pega do objeto existente (em caso de edição)
-            condition = data.get('condition', self.instance.condition if self.instance else None)
+            condition = data.get('condition', getattr(self.instance, 'condition', None))
 
             if condition == 'maintenance':
-                maintenance_cost = data.get('maintenance_cost', self.instance.maintenance_cost if self.instance else None)
+                maintenance_cost = data.get('maintenance_cost', getattr(self.instance, 'maintenance_cost', None))
                 
                 # 1. VALIDAÇÃO: Custo de manutenção é obrigatório e positivo
                 if not maintenance_cost or float(maintenance_cost) <= 0:
@@ -80,4 +205,53 @@ class LoanSerializer(serializers.ModelSerializer):
                     from django.utils import timezone
                     data['last_maintenance_date'] = timezone.now().date()
             
-            return data
\ No newline at end of file
+            return data
+
+
+class BulkLoanItemSerializer(serializers.Serializer):
+    tool = serializers.IntegerField()
+    quantity = serializers.IntegerField(min_value=1, default=1)
+
+
+class BulkLoanSerializer(serializers.Serializer):
+    """
+    Vários empréstimos de uma vez para o mesmo funcionário e prazo.
+    mode='atomic' grava tudo ou nada; 'partial' grava os itens possíveis.
+    """
+    MAX_ITEMS = 200
+
+    employee = serializers.PrimaryKeyRelatedField(queryset=Employee.objects.all(), allow_null=True, required=False)
+    due_date = serializers.DateField()
+    items = BulkLoanItemSerializer(many=True, allow_empty=False, max_length=MAX_ITEMS)
+    mode = serializers.ChoiceField(choices=['atomic', 'partial'], default='atomic')
+
+
+class BulkReturnSerializer(serializers.Serializer):
+    MAX_ITEMS = 500
+
+    ids = serializers.ListField(child=serializers.IntegerField(), allow_empty=False, max_length=MAX_ITEMS)
+    mode = serializers.ChoiceField(choices=['atomic', 'partial'], default='atomic')
+
+
+class JobSerializer(serializers.ModelSerializer):
+    """
+    Estado de uma tarefa em segundo plano. 'download_url' só é preenchido
+    quando o resultado estiver pronto.
+    """
+    status_display = serializers.CharField(source='get_status_display', read_only=True)
+    download_url = serializers.SerializerMethodField()
+
+    class Meta:
+        model = Job
+        fields = [
+            'id', 'kind', 'params', 'status', 'status_display', 'attempts', 'error',
+            'created_at', 'started_at', 'finished_at', 'expires_at', 'download_url',
+        ]
+        read_only_fields = fields
+
+    def get_download_url(self, obj):
+        if obj.status != Job.DONE or not obj.result_file:
+            return None
+        url = f'/api/export/jobs/{obj.pk}/download/'
+        request = self.context.get('request')
+        return request.build_absolute_uri(url) if request else url
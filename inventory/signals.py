@@ -0,0 +1,137 @@
+# inventory/signals.py
+
+from django.db import transaction
+from django.db.models.signals import pre_save, post_save, pre_delete, post_delete
+from django.dispatch import receiver
+
+from . import events, images, jobs, rollups, stock, versions
+from .models import Tool, Loan, Employee, MaintenanceEvent
+from .reports import invalidate_dashboard
+
+
+@receiver([post_save, post_delete], sender=Tool)
+@receiver([post_save, post_delete], sender=Loan)
+def invalidate_cached_reports(sender, **kwargs):
+    invalidate_dashboard()
+
+
+@receiver([post_save, post_delete], sender=Tool)
+@receiver([post_save, post_delete], sender=Loan)
+@receiver([post_save, post_delete], sender=Employee)
+@receiver([post_save, post_delete], sender=MaintenanceEvent)
+def bump_model_version(sender, raw=False, **kwargs):
+    # ETags das listagens (inventory.versions)
+    if not raw:
+        versions.bump(sender._meta.model_name)
+
+
+@receiver(post_save, sender=Tool)
+def schedule_tool_images(sender, instance, raw=False, **kwargs):
+    # Versões redimensionadas da foto (inventory.images), geradas pelo worker
+    if raw:
+        return
+    if images.needs_renditions(instance):
+        transaction.on_commit(lambda: jobs.submit('tool-images', {'tool_id': instance.pk}))
+    elif not instance.image and instance.image_renditions:
+        Tool.objects.filter(pk=instance.pk).update(image_renditions={})
+
+
+# --- Contador de estoque (Tool.borrowed_quantity, inventory.stock) ---
+# Vale para qualquer save/delete de Loan: API, admin, cascata de Employee ou
+# Tool. Caminhos sem signals (bulk_create, devolução por UPDATE) chamam
+# inventory.stock diretamente.
+
+def _reservation(loan):
+    """ (ferramenta, unidades reservadas); devolvido não reserva nada. """
+    return loan.tool_id, (loan.quantity if loan.returned_date is None else 0)
+
+
+def _stored_reservation(instance):
+    # Lida do banco: a instância em memória pode estar desatualizada
+    old = Loan.objects.filter(pk=instance.pk).only('tool', 'quantity', 'returned_date').first()
+    return _reservation(old) if old is not None else (None, 0)
+
+
+@receiver(pre_save, sender=Loan)
+def loan_stock_snapshot(sender, instance, raw=False, **kwargs):
+    instance._stock_snapshot = (None, 0)
+    if not raw and not instance._state.adding and instance.pk is not None:
+        instance._stock_snapshot = _stored_reservation(instance)
+
+
+@receiver(post_save, sender=Loan)
+def loan_stock_on_save(sender, instance, raw=False, **kwargs):
+    if raw:
+        return
+    old, new = getattr(instance, '_stock_snapshot', (None, 0)), _reservation(instance)
+    if old != new:
+        stock.release(*old)  # (None, 0) para empréstimo novo: nada a liberar
+        stock.reserve(*new)  # InsufficientStock: Loan.save() desfaz a gravação
+
+
+@receiver(pre_delete, sender=Loan)
+def loan_stock_delete_snapshot(sender, instance, **kwargs):
+    instance._stock_snapshot = _stored_reservation(instance)
+
+
+@receiver(post_delete, sender=Loan)
+def loan_stock_on_delete(sender, instance, **kwargs):
+    stock.release(*getattr(instance, '_stock_snapshot', _reservation(instance)))
+
+
+# --- Resumos mensais da página de Análise (inventory.rollups) ---
+
+@receiver(post_save, sender=Loan)
+def loan_rollup_on_save(sender, instance, created, raw=False, **kwargs):
+    if created and not raw:
+        rollups.loan_created(instance)
+
+
+@receiver(post_delete, sender=Loan)
+def loan_rollup_on_delete(sender, instance, **kwargs):
+    rollups.loan_deleted(instance)
+
+
+@receiver(pre_save, sender=MaintenanceEvent)
+def maintenance_rollup_snapshot(sender, instance, raw=False, **kwargs):
+    # Guarda a contribuição atual (do banco) para aplicar só a diferença no post_save
+    instance._rollup_snapshot = None
+    if raw or instance._state.adding or instance.pk is None:
+        return
+    old = MaintenanceEvent.objects.filter(pk=instance.pk).only('date', 'cost').first()
+    instance._rollup_snapshot = rollups.maintenance_snapshot(old)
+
+
+@receiver(post_save, sender=MaintenanceEvent)
+def maintenance_rollup_on_save(sender, instance, raw=False, **kwargs):
+    if raw:
+        return
+    rollups.maintenance_changed(
+        getattr(instance, '_rollup_snapshot', None),
+        rollups.maintenance_snapshot(instance),
+    )
+
+
+@receiver(post_delete, sender=MaintenanceEvent)
+def maintenance_rollup_on_delete(sender, instance, **kwargs):
+    rollups.maintenance_changed(rollups.maintenance_snapshot(instance), None)
+
+
+# --- Feed de mudanças (inventory.events) ---
+
+@receiver(post_save, sender=Loan)
+def publish_loan_saved(sender, instance, created, raw=False, **kwargs):
+    if not raw:
+        events.loan_saved(instance, created)
+
+
+@receiver(post_delete, sender=Loan)
+def publish_loan_deleted(sender, instance, **kwargs):
+    events.loan_deleted(instance.pk)
+
+
+@receiver(post_save, sender=Tool)
+def publish_tool_stock(sender, instance, created, raw=False, update_fields=None, **kwargs):
+    if raw or not (created or update_fields is None or 'total_quantity' in update_fields):
+        return
+    events.stock_changed([instance.pk])
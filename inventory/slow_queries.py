@@ -0,0 +1,223 @@
+# inventory/slow_queries.py
+
+"""
+Registro de consultas lentas.
+
+O SlowQueryMiddleware observa as consultas de cada requisição; as que
+passam de SLOW_QUERIES['THRESHOLD_MS'] são guardadas com o SQL, os
+parâmetros, o trecho do projeto que as originou (ex.:
+'inventory/models.py:70 Tool.available_quantity') e o plano de execução.
+Consultas iguais a menos dos valores literais compartilham a mesma
+impressão digital e viram uma linha de SlowQuery com contagem e tempo
+total. Ver o comando 'slow_queries' e o admin.
+"""
+
+import hashlib
+import logging
+import re
+import sys
+import time
+from pathlib import Path
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, sync_to_async
+from django.conf import settings
+from django.db import IntegrityError, connection, transaction
+from django.db.models import F
+from django.db.models.functions import Greatest
+from django.utils import timezone
+
+from .db import request_queries
+from .models import SlowQuery
+
+DEFAULTS = {
+    'THRESHOLD_MS': 200,
+    'EXPLAIN': True,
+}
+MAX_PARAMS_LENGTH = 1000
+
+logger = logging.getLogger(__name__)
+
+_STRING = re.compile(r"'(?:[^']|'')*'")
+_NUMBER = re.compile(r'\b\d+(?:\.\d+)?\b')
+_IN_LIST = re.compile(r'\bIN\s*\((?:\s*(?:%s|\?|\$\d+)\s*,?)+\)', re.IGNORECASE)
+_PLACEHOLDER = re.compile(r'%s|\?|\$\d+')
+_SPACES = re.compile(r'\s+')
+
+
+def get_setting(name):
+    return getattr(settings, 'SLOW_QUERIES', {}).get(name, DEFAULTS[name])
+
+
+def normalize(sql):
+    """ SQL sem literais e com listas IN (...) de qualquer tamanho unificadas. """
+    sql = _STRING.sub('?', sql)
+    sql = _NUMBER.sub('?', sql)
+    sql = _PLACEHOLDER.sub('?', sql)
+    sql = _IN_LIST.sub('IN (...)', sql)
+    return _SPACES.sub(' ', sql).strip()
+
+
+def fingerprint(sql):
+    return hashlib.sha1(normalize(sql).encode()).hexdigest()
+
+
+_PROJECT_ROOT = str(Path(settings.BASE_DIR).resolve())
+_SKIP = (__file__,) + tuple(str(Path(__file__).with_name(name)) for name in ('metrics.py', 'profiling.py', 'db.py'))
+
+
+def call_site():
+    """ Frame mais interno do projeto (fora de site-packages e deste módulo). """
+    frame = sys._getframe(1)
+    while frame is not None:
+        filename = frame.f_code.co_filename
+        if (filename.startswith(_PROJECT_ROOT) and 'site-packages' not in filename
+                and filename not in _SKIP):
+            relative = Path(filename).relative_to(_PROJECT_ROOT).as_posix()
+            return f"{relative}:{frame.f_lineno} {frame.f_code.co_qualname}"
+        frame = frame.f_back
+    return ''
+
+
+def explain(sql, params):
+    """ Plano da consulta (apenas SELECT, para não executar escritas). """
+    if not get_setting('EXPLAIN') or not sql.lstrip().upper().startswith('SELECT'):
+        return ''
+    prefix = 'EXPLAIN QUERY PLAN' if connection.vendor == 'sqlite' else 'EXPLAIN'
+    try:
+        with transaction.atomic():
+            with connection.cursor() as cursor:
+                cursor.execute(f'{prefix} {sql}', params)
+                rows = cursor.fetchall()
+    except Exception as exc:  # plano é opcional; não derruba a requisição
+        return f'EXPLAIN falhou: {exc}'
+    return '\n'.join(str(row[-1]) for row in rows)
+
+
+def record(sql, params, duration, site='', route=''):
+    key = fingerprint(sql)
+    now = timezone.now()
+    updated = SlowQuery.objects.filter(fingerprint=key).update(
+        count=F('count') + 1,
+        total_time=F('total_time') + duration,
+        max_time=Greatest('max_time', duration),
+        last_seen=now,
+    )
+    if updated:
+        return
+    values = {
+        'sql': sql,
+        'params': repr(params)[:MAX_PARAMS_LENGTH],
+        'call_site': site[:300],
+        'route': route[:100],
+        'explain': explain(sql, params),
+        'count': 1,
+        'total_time': duration,
+        'max_time': duration,
+        'last_seen': now,
+    }
+    try:
+        with transaction.atomic():
+            SlowQuery.objects.create(fingerprint=key, **values)
+    except IntegrityError:
+        # Outra requisição registrou a mesma consulta ao mesmo tempo
+        record(sql, params, duration, site, route)
+
+
+class _Collector:
+    """ execute_wrapper que separa as consultas acima do limite. """
+
+    def __init__(self, threshold):
+        self.threshold = threshold
+        self.slow = []
+
+    def __call__(self, execute, sql, params, many, context):
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            duration = time.perf_counter() - start
+            if duration >= self.threshold and not many:
+                self.slow.append((sql, params, duration, call_site()))
+
+
+class SlowQueryMiddleware:
+    """
+    Coleta as consultas lentas durante a requisição e as grava no final,
+    fora do request_queries (assim as próprias gravações não são medidas).
+    Em respostas em streaming (exportações CSV) a coleta continua enquanto
+    o corpo é gerado, e a gravação fica para quando o último bloco sair.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        collector = _Collector(get_setting('THRESHOLD_MS') / 1000)
+        with request_queries(collector):
+            response = self.get_response(request)
+        if response.streaming:
+            self._collect_stream(response, collector, request)
+        elif collector.slow:
+            self._record(request, collector.slow)
+        return response
+
+    async def __acall__(self, request):
+        collector = _Collector(get_setting('THRESHOLD_MS') / 1000)
+        with request_queries(collector):
+            response = await self.get_response(request)
+        if response.streaming:
+            self._collect_stream(response, collector, request)
+        elif collector.slow:
+            await sync_to_async(self._record)(request, collector.slow)
+        return response
+
+    def _collect_stream(self, response, collector, request):
+        if response.is_async:
+            response.streaming_content = self._acollected(response.streaming_content, collector, request)
+        else:
+            response.streaming_content = self._collected(response.streaming_content, collector, request)
+
+    def _collected(self, content, collector, request):
+        iterator = iter(content)
+        try:
+            while True:
+                # O wrapper só vale durante next(): não vaza para quem consome o corpo
+                with request_queries(collector):
+                    try:
+                        chunk = next(iterator)
+                    except StopIteration:
+                        break
+                yield chunk
+        finally:
+            if collector.slow:
+                self._record(request, collector.slow)
+
+    async def _acollected(self, content, collector, request):
+        iterator = aiter(content)
+        try:
+            while True:
+                with request_queries(collector):
+                    try:
+                        chunk = await anext(iterator)
+                    except StopAsyncIteration:
+                        break
+                yield chunk
+        finally:
+            if collector.slow:
+                await sync_to_async(self._record)(request, collector.slow)
+
+    @staticmethod
+    def _record(request, slow):
+        match = getattr(request, 'resolver_match', None)
+        route = (match.url_name if match else None) or ''
+        try:
+            for sql, params, duration, site in slow:
+                record(sql, params, duration, site, route)
+        except Exception:
+            logger.exception("Falha ao registrar consultas lentas de %s", request.path)
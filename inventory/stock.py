@@ -0,0 +1,112 @@
+# inventory/stock.py
+
+from django.db import transaction
+from django.db.models import Case, F, IntegerField, Value, When
+from django.db.models.functions import Greatest
+
+from . import events, versions
+from .models import Tool
+from .reports import invalidate_dashboard
+
+
+class InsufficientStock(Exception):
+    """ Levantada quando um empréstimo deixaria o estoque negativo. """
+
+    def __init__(self, tool_id, quantity):
+        self.tool_id = tool_id
+        self.quantity = quantity
+        super().__init__(f"Estoque insuficiente para emprestar {quantity} unidade(s) da ferramenta {tool_id}.")
+
+
+def reserve(tool_id, quantity):
+    """
+    Reserva 'quantity' unidades da ferramenta, incrementando o contador
+    'borrowed_quantity'. O UPDATE é condicional: só altera a linha se ainda
+    houver estoque suficiente, então dois empréstimos simultâneos nunca
+    ultrapassam o total, sem precisar de lock explícito.
+    """
+    if quantity <= 0:
+        return
+    updated = Tool.objects.filter(
+        pk=tool_id,
+        total_quantity__gte=F('borrowed_quantity') + quantity,
+    ).update(borrowed_quantity=F('borrowed_quantity') + quantity)
+    if not updated:
+        raise InsufficientStock(tool_id, quantity)
+    invalidate_dashboard()
+    versions.bump('tool')
+    events.stock_changed([tool_id])
+
+
+def release(tool_id, quantity):
+    """
+    Devolve 'quantity' unidades ao estoque da ferramenta. Nunca deixa o
+    contador negativo, mesmo que ele esteja fora de sincronia.
+    """
+    if quantity <= 0:
+        return
+    Tool.objects.filter(pk=tool_id).update(
+        borrowed_quantity=Greatest(F('borrowed_quantity') - quantity, 0)
+    )
+    # Updates em massa não disparam post_save
+    invalidate_dashboard()
+    versions.bump('tool')
+    events.stock_changed([tool_id])
+
+
+def _per_tool(quantities):
+    return Case(
+        *(When(pk=tool_id, then=Value(quantity)) for tool_id, quantity in quantities.items()),
+        default=Value(0),
+        output_field=IntegerField(),
+    )
+
+
+def available(tool_ids):
+    """ Estoque livre de cada ferramenta ({tool_id: unidades}); ausentes não aparecem. """
+    return {
+        pk: total - borrowed
+        for pk, total, borrowed in Tool.objects.filter(pk__in=tool_ids).values_list(
+            'pk', 'total_quantity', 'borrowed_quantity'
+        )
+    }
+
+
+def reserve_many(quantities):
+    """
+    Reserva várias ferramentas ({tool_id: quantidade}) num único UPDATE
+    condicional. É tudo ou nada: se alguma não tiver estoque, nenhuma é
+    alterada e InsufficientStock é levantada com a primeira que faltou.
+    """
+    quantities = {tool_id: q for tool_id, q in quantities.items() if q > 0}
+    if not quantities:
+        return
+    wanted = _per_tool(quantities)
+    try:
+        with transaction.atomic():
+            updated = Tool.objects.filter(
+                pk__in=quantities,
+                total_quantity__gte=F('borrowed_quantity') + wanted,
+            ).update(borrowed_quantity=F('borrowed_quantity') + wanted)
+            if updated != len(quantities):
+                raise InsufficientStock(None, 0)  # desfaz as linhas já alteradas
+    except InsufficientStock:
+        free = available(quantities)
+        tool_id = next((pk for pk, q in quantities.items() if free.get(pk, 0) < q), next(iter(quantities)))
+        raise InsufficientStock(tool_id, quantities[tool_id])
+    invalidate_dashboard()
+    versions.bump('tool')
+    events.stock_changed(quantities)
+
+
+def release_many(quantities):
+    """ Devolve várias ferramentas ao estoque num único UPDATE ({tool_id: quantidade}). """
+    quantities = {tool_id: q for tool_id, q in quantities.items() if q > 0}
+    if not quantities:
+        return
+    Tool.objects.filter(pk__in=quantities).update(
+        borrowed_quantity=Greatest(F('borrowed_quantity') - _per_tool(quantities), 0)
+    )
+    invalidate_dashboard()
+    versions.bump('tool')
+    events.stock_changed(quantities)
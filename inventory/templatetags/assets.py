@@ -0,0 +1,25 @@
+from django import template
+from django.conf import settings
+from django.contrib.staticfiles.storage import staticfiles_storage
+from django.templatetags.static import static
+from django.utils.html import format_html, format_html_join
+
+from inventory.assets import bundle_name
+
+register = template.Library()
+
+
+@register.simple_tag
+def css_bundle(page):
+    """
+    <link> do CSS da página (STATIC_BUNDLES). Depois do build_assets é um
+    único arquivo com hash; antes dele (ou com DEBUG), um <link> por arquivo.
+    """
+    name = bundle_name(page)
+    hashed_files = getattr(staticfiles_storage, 'hashed_files', {})
+    if not settings.DEBUG and staticfiles_storage.hash_key(name) in hashed_files:
+        return format_html('<link rel="stylesheet" href="{}">', static(name))
+    return format_html_join(
+        '\n    ', '<link rel="stylesheet" href="{}">',
+        ((static(source),) for source in settings.STATIC_BUNDLES[page]),
+    )
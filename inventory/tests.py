@@ -1,3 +1,1223 @@
-from django.test import TestCase
+import asyncio
+import base64
+import csv
+import gzip
+import io
+import json
+import os
+import tempfile
+from datetime import timedelta
+from types import ModuleType
+from unittest import mock
 
-# Create your tests here.
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.contrib.auth.models import Group, Permission
+from django.contrib.staticfiles.storage import staticfiles_storage
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import connection
+from django.test import AsyncClient, TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import include, path, resolve
+from django.utils import timezone
+from PIL import Image
+from rest_framework.test import APIClient
+from rest_framework_simplejwt.tokens import RefreshToken
+from users import authentication
+
+from .models import Tool, Loan, Employee, Job, LoanMonthlyStats, MaintenanceEvent, MaintenanceMonthlyStats, SlowQuery
+from . import assets, benchmark, events, fast_reads, images, jobs, metrics, profiling, reports, rollups, search, slow_queries, stock
+from .urls import report_patterns
+
+
+def page_permissions(*codenames):
+    """ Permissões de página de Tool.Meta (todas, sem argumentos). """
+    codenames = codenames or [codename for codename, _ in Tool._meta.permissions]
+    return Permission.objects.filter(content_type__app_label='inventory', codename__in=codenames)
+
+
+class InventoryAPITestCase(TestCase):
+    """ Base com usuário autenticado e alguns dados de exemplo. """
+
+    def setUp(self):
+        cache.clear()
+        authentication.invalidate()
+        user = get_user_model().objects.create_user(username='tester', password='secret123')
+        user.user_permissions.set(page_permissions())
+        # Recarregado com as permissões em cache, como faz o CachedJWTAuthentication
+        self.user = get_user_model().objects.get(pk=user.pk)
+        self.user.get_all_permissions()
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        self.today = timezone.now().date()
+
+    def make_tool(self, name='Martelo', total_quantity=10, **kwargs):
+        return Tool.objects.create(name=name, total_quantity=total_quantity, **kwargs)
+
+    def make_employee(self, name='João', registration_number='001'):
+        return Employee.objects.create(name=name, registration_number=registration_number)
+
+    def make_loan(self, tool, employee=None, quantity=1, due_in=7, returned=False):
+        # O estoque é reservado pelo signal de Loan
+        return Loan.objects.create(
+            tool=tool,
+            employee=employee,
+            quantity=quantity,
+            due_date=self.today + timedelta(days=due_in),
+            returned_date=self.today if returned else None,
+        )
+
+
+class QueryCountTests(InventoryAPITestCase):
+
+    def test_tool_list_query_count_is_constant(self):
+        employee = self.make_employee()
+        for i in range(5):
+            self.make_loan(self.make_tool(name=f'Ferramenta {i}'), employee)
+        with self.assertNumQueries(2):  # versão para o ETag + listagem
+            response = self.client.get('/api/tools/')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual({t['borrowed_quantity'] for t in response.json()['results']}, {1})
+
+    def test_loan_list_query_count_is_constant(self):
+        employee = self.make_employee()
+        for i in range(5):
+            self.make_loan(self.make_tool(name=f'Ferramenta {i}'), employee)
+        with self.assertNumQueries(2):
+            response = self.client.get('/api/loans/active_loans/')
+        self.assertEqual(len(response.json()['results']), 5)
+        self.assertEqual(response.json()['results'][0]['employee_name'], 'João')
+
+
+class StockLedgerTests(InventoryAPITestCase):
+
+    def post_loan(self, tool, quantity):
+        return self.client.post('/api/loans/', {
+            'tool': tool.pk,
+            'quantity': quantity,
+            'due_date': str(self.today + timedelta(days=3)),
+        }, format='json')
+
+    def test_checkout_reserves_and_rejects_oversubscription(self):
+        tool = self.make_tool(total_quantity=5)
+        self.assertEqual(self.post_loan(tool, 3).status_code, 201)
+        response = self.post_loan(tool, 3)
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('quantity', response.json())
+        tool.refresh_from_db()
+        self.assertEqual(tool.borrowed_quantity, 3)
+        self.assertEqual(Loan.objects.count(), 1)
+
+    def test_return_and_destroy_release_stock_once(self):
+        tool = self.make_tool(total_quantity=5)
+        returned = self.make_loan(tool, quantity=2)
+        deleted = self.make_loan(tool, quantity=1)
+        self.assertEqual(self.client.post(f'/api/loans/{returned.pk}/return/').status_code, 200)
+        self.assertEqual(self.client.post(f'/api/loans/{returned.pk}/return/').status_code, 400)
+        self.client.delete(f'/api/loans/{deleted.pk}/')
+        tool.refresh_from_db()
+        self.assertEqual(tool.borrowed_quantity, 0)
+
+    def test_tool_update_does_not_overwrite_counter(self):
+        tool = self.make_tool(total_quantity=5)
+        self.post_loan(tool, 2)
+        tool.name = 'Martelo novo'
+        tool.save()
+        tool.refresh_from_db()
+        self.assertEqual(tool.borrowed_quantity, 2)
+
+    def test_tool_save_falls_back_to_insert(self):
+        tool = self.make_tool(name='Serra', total_quantity=5)
+        Tool.objects.filter(pk=tool.pk).delete()
+        tool.save()  # linha apagada em outro lugar: o UPDATE não acha nada e vira INSERT
+        self.assertEqual(Tool.objects.get(pk=tool.pk).name, 'Serra')
+
+        loaded = Tool(pk=tool.pk + 100, name='Trena', total_quantity=2, borrowed_quantity=0)
+        loaded._state.adding = False  # como objetos desserializados (fixtures)
+        loaded.save()
+        self.assertEqual(Tool.objects.get(pk=loaded.pk).name, 'Trena')
+
+    def borrowed(self, tool):
+        tool.refresh_from_db()
+        return tool.borrowed_quantity
+
+    def test_loan_writes_outside_the_api_keep_counter(self):
+        tool = self.make_tool(total_quantity=5)
+        loan = self.make_loan(tool, quantity=2)
+        self.assertEqual(self.borrowed(tool), 2)
+        loan.quantity = 3
+        loan.save()
+        self.assertEqual(self.borrowed(tool), 3)
+        loan.returned_date = self.today
+        loan.save()
+        self.assertEqual(self.borrowed(tool), 0)
+        self.make_loan(tool, quantity=4).delete()
+        self.assertEqual(self.borrowed(tool), 0)
+        with self.assertRaises(stock.InsufficientStock):
+            self.make_loan(tool, quantity=6)
+        self.assertEqual(Loan.objects.count(), 1)
+
+    def test_employee_with_active_loans(self):
+        tool, employee = self.make_tool(total_quantity=5), self.make_employee()
+        loan = self.make_loan(tool, employee, quantity=3)
+        response = self.client.delete(f'/api/employees/{employee.pk}/')
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(self.borrowed(tool), 3)
+
+        # Pelo ORM a cascata apaga os empréstimos e devolve o estoque
+        employee.delete()
+        self.assertFalse(Loan.objects.filter(pk=loan.pk).exists())
+        self.assertEqual(self.borrowed(tool), 0)
+
+        other = self.make_employee(name='Maria', registration_number='002')
+        self.make_loan(tool, other, returned=True)
+        self.assertEqual(self.client.delete(f'/api/employees/{other.pk}/').status_code, 204)
+
+    def test_reconcile_stock_fixes_drift(self):
+        tool = self.make_tool(total_quantity=5)
+        self.make_loan(tool, quantity=2)
+        Tool.objects.filter(pk=tool.pk).update(borrowed_quantity=4)
+        self.client.get('/api/dashboard/')
+        etag = self.client.get('/api/tools/')['ETag']
+        out = io.StringIO()
+        with self.captureOnCommitCallbacks(execute=True):
+            call_command('reconcile_stock', stdout=out)
+        self.assertIn('diferença=+2', out.getvalue())
+        tool.refresh_from_db()
+        self.assertEqual(tool.borrowed_quantity, 2)
+        self.assertEqual(self.client.get('/api/dashboard/')['X-Cache'], 'MISS')
+        self.assertEqual(self.client.get('/api/tools/', HTTP_IF_NONE_MATCH=etag).status_code, 200)
+
+
+class KeysetPaginationTests(InventoryAPITestCase):
+
+    def test_tools_are_paged_by_name_and_id(self):
+        for name in ['C', 'A', 'B', 'A', 'D']:
+            self.make_tool(name=name)
+        seen = []
+        url = '/api/tools/?page_size=2'
+        while url:
+            with self.assertNumQueries(2):
+                page = self.client.get(url).json()
+            seen += [(t['name'], t['id']) for t in page['results']]
+            url = page['next']
+        self.assertEqual(seen, sorted(seen))
+        self.assertEqual(len(seen), 5)
+
+    def test_loan_history_is_newest_first_across_pages(self):
+        tool = self.make_tool()
+        loans = [self.make_loan(tool, returned=True) for _ in range(3)]
+        Loan.objects.filter(pk=loans[0].pk).update(borrowed_date=self.today - timedelta(days=1))
+        first = self.client.get('/api/loans/loan_history/?page_size=2').json()
+        second = self.client.get(first['next']).json()
+        ids = [l['id'] for l in first['results'] + second['results']]
+        self.assertEqual(ids, [loans[2].pk, loans[1].pk, loans[0].pk])
+        self.assertIsNone(second['next'])
+
+    def test_opt_out_returns_plain_list(self):
+        self.make_tool()
+        response = self.client.get('/api/tools/?paginate=false')
+        self.assertIsInstance(response.json(), list)
+
+    def test_invalid_cursor_is_404(self):
+        self.assertEqual(self.client.get('/api/tools/?cursor=xyz').status_code, 404)
+
+    def test_well_formed_cursor_with_bad_values_is_404(self):
+        self.make_loan(self.make_tool())
+
+        def cursor(value):
+            return base64.urlsafe_b64encode(json.dumps(value).encode()).decode()
+
+        for url, value in [('/api/loans/', ['abc', 1]), ('/api/tools/', {'a': 1, 'b': 2}),
+                           ('/api/tools/', ['Martelo', 'x']), ('/api/tools/', ['Martelo']),
+                           ('/api/tools/', [None, 1])]:
+            self.assertEqual(self.client.get(f'{url}?cursor={cursor(value)}').status_code, 404, (url, value))
+        self.assertEqual(self.client.get(f"/api/loans/?cursor={cursor(['2025-01-01', 1])}").status_code, 200)
+
+
+class StreamingExportTests(InventoryAPITestCase):
+
+    def read_csv(self, response):
+        body = b''.join(response.streaming_content)
+        if response.get('Content-Encoding') == 'gzip':
+            body = gzip.decompress(body)
+        return list(csv.reader(io.StringIO(body.decode('utf-8'))))
+
+    def test_loan_history_export_uses_employee_and_quotes_fields(self):
+        tool = self.make_tool(name='Chave "inglesa", 10mm')
+        self.make_loan(tool, self.make_employee(), quantity=2, returned=True)
+        response = self.client.get('/api/export/loan-history/')
+        self.assertTrue(response.streaming)
+        rows = self.read_csv(response)
+        self.assertEqual(rows[0][0], 'Ferramenta')
+        self.assertEqual(rows[1][:3], ['Chave "inglesa", 10mm', 'João', '2'])
+
+    def test_active_loans_export_marks_overdue(self):
+        tool = self.make_tool()
+        self.make_loan(tool, due_in=-1)
+        self.make_loan(tool, due_in=3)
+        rows = self.read_csv(self.client.get('/api/export/active-loans/'))
+        self.assertEqual(sorted(r[-1] for r in rows[1:]), ['Ativo', 'Atrasado'])
+
+    def test_tools_export_gzip_and_date_range(self):
+        self.make_tool(name='Antiga', acquisition_date=self.today - timedelta(days=400))
+        self.make_tool(name='Nova', acquisition_date=self.today)
+        response = self.client.get(
+            f'/api/export/tools/?from={self.today - timedelta(days=30)}',
+            HTTP_ACCEPT_ENCODING='gzip, deflate',
+        )
+        self.assertEqual(response['Content-Encoding'], 'gzip')
+        rows = self.read_csv(response)
+        self.assertEqual([r[0] for r in rows[1:]], ['Nova'])
+        self.assertEqual(rows[1][3], '10')
+
+    def test_gzip_refused_with_zero_quality(self):
+        self.make_tool()
+        response = self.client.get('/api/export/tools/', HTTP_ACCEPT_ENCODING='gzip;q=0, deflate')
+        self.assertFalse(response.has_header('Content-Encoding'))
+        self.assertEqual(self.read_csv(response)[1][0], 'Martelo')
+
+    def test_invalid_date_filter_is_400(self):
+        self.assertEqual(self.client.get('/api/export/tools/?to=ontem').status_code, 400)
+
+
+@override_settings(MEDIA_ROOT=tempfile.mkdtemp(prefix='inventory-jobs-'))
+class BackgroundJobTests(InventoryAPITestCase):
+
+    def test_export_job_runs_and_serves_result(self):
+        tool = self.make_tool()
+        self.make_loan(tool, self.make_employee(), returned=True)
+        response = self.client.post('/api/export/jobs/', {'kind': 'loan-history', 'from': str(self.today)}, format='json')
+        self.assertEqual(response.status_code, 202)
+        job_id = response.json()['id']
+        self.assertEqual(response.json()['status'], Job.PENDING)
+        self.assertEqual(self.client.get(f'/api/export/jobs/{job_id}/download/').status_code, 409)
+
+        self.assertEqual(jobs.run_pending(), 1)
+        status_data = self.client.get(f'/api/export/jobs/{job_id}/').json()
+        self.assertEqual(status_data['status'], Job.DONE)
+        download = self.client.get(status_data['download_url'])
+        rows = list(csv.reader(io.StringIO(b''.join(download.streaming_content).decode('utf-8'))))
+        self.assertEqual(rows[1][:2], ['Martelo', 'João'])
+
+    def test_failed_job_is_retried_then_marked_failed(self):
+        job = jobs.submit('tools', {'date_from': 'inválida'}, user=self.user)
+        with self.assertLogs('inventory.jobs', 'ERROR'):
+            jobs.run_pending()
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.attempts), (Job.PENDING, 1))
+        for _ in range(2):
+            Job.objects.filter(pk=job.pk).update(run_after=timezone.now())
+            with self.assertLogs('inventory.jobs', 'ERROR'):
+                jobs.run_pending()
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.attempts), (Job.FAILED, 3))
+        self.assertIn('ValidationError', job.error)
+
+    def test_expired_jobs_are_cleaned_up(self):
+        job = jobs.submit('analytics', user=self.user)
+        jobs.run_pending()
+        Job.objects.filter(pk=job.pk).update(expires_at=timezone.now() - timedelta(seconds=1))
+        self.assertEqual(jobs.cleanup_expired(), 1)
+        self.assertFalse(Job.objects.exists())
+
+    def test_worker_requeues_stale_jobs_periodically(self):
+        stale, own = (jobs.submit('tools', user=self.user) for _ in range(2))
+        Job.objects.update(status=Job.RUNNING, started_at=timezone.now() - timedelta(days=1))
+        worker = jobs.Worker(concurrency=1)
+        self.addCleanup(worker.executor.shutdown)
+        worker.in_flight.add(own.pk)
+        worker.housekeeping()
+        self.assertEqual(dict(Job.objects.values_list('pk', 'status')), {stale.pk: Job.PENDING, own.pk: Job.RUNNING})
+
+    def test_jobs_of_other_users_are_hidden(self):
+        other = get_user_model().objects.create_user(username='other', password='secret123')
+        job = jobs.submit('tools', user=other)
+        self.assertEqual(self.client.get(f'/api/export/jobs/{job.pk}/').status_code, 404)
+
+
+class DashboardCacheTests(InventoryAPITestCase):
+
+    def test_dashboard_uses_one_query_per_table_then_cache(self):
+        tool = self.make_tool(total_quantity=10, unit_value=2, condition='maintenance', maintenance_cost=5)
+        self.make_loan(tool, quantity=3, due_in=-2)
+        self.make_loan(tool, quantity=1)
+        with self.assertNumQueries(2):
+            response = self.client.get('/api/dashboard/')
+        self.assertEqual(response['X-Cache'], 'MISS')
+        self.assertEqual(response.json(), {
+            'total_tool_types': 1,
+            'active_loans_count': 2,
+            'overdue_loans_count': 1,
+            'available_in_warehouse': 6,
+            'tools_in_maintenance': 10,
+            'total_maintenance_cost': '5.00',
+            'total_inventory_value': '20.00',
+        })
+        with self.assertNumQueries(0):
+            response = self.client.get('/api/dashboard/')
+        self.assertEqual(response['X-Cache'], 'HIT')
+
+    def test_writes_invalidate_cache(self):
+        tool = self.make_tool()
+        loan = self.make_loan(tool)
+        self.client.get('/api/dashboard/')
+        self.client.post(f'/api/loans/{loan.pk}/return/')
+        response = self.client.get('/api/dashboard/')
+        self.assertEqual(response['X-Cache'], 'MISS')
+        self.assertEqual(response.json()['active_loans_count'], 0)
+
+
+class AnalyticsRollupTests(InventoryAPITestCase):
+
+    def snapshot(self):
+        return (
+            list(LoanMonthlyStats.objects.values_list('month', 'loan_count', 'quantity_total')),
+            list(MaintenanceMonthlyStats.objects.values_list('month', 'maintenance_count', 'total_cost')),
+        )
+
+    def test_incremental_rollups_match_rebuild(self):
+        tool = self.make_tool()
+        self.make_loan(tool, quantity=2)
+        old = self.make_loan(tool, quantity=1)
+        Loan.objects.filter(pk=old.pk).update(borrowed_date=self.today - timedelta(days=70))
+        rollups.rebuild()
+        self.make_loan(tool, quantity=3).delete()
+        self.make_loan(tool)
+        event = MaintenanceEvent.objects.create(tool=tool, date=self.today, cost=50)
+        event.cost = 30
+        event.save()
+        MaintenanceEvent.objects.create(tool=tool, date=self.today - timedelta(days=70), cost=5)
+        self.make_tool(name='Serra').maintenance_events.create(date=self.today, cost=20)
+        Tool.objects.get(name='Serra').delete()
+        incremental = self.snapshot()
+        rollups.rebuild()
+        self.assertEqual(incremental, self.snapshot())
+
+    def test_analytics_reads_rollups_with_month_range(self):
+        tool = self.make_tool()
+        tool.maintenance_events.create(date=self.today, cost=10)
+        loan = self.make_loan(tool)
+        Loan.objects.filter(pk=loan.pk).update(borrowed_date=self.today - timedelta(days=70))
+        rollups.rebuild()
+        self.make_loan(tool)
+        month = self.today.strftime('%Y-%m')
+        data = self.client.get(f'/api/analytics/?from={month}').json()
+        self.assertEqual(data['loan_activity'], [{'month': month, 'count': 1}])
+        self.assertEqual(data['maintenances_per_month'], [{'month': month, 'count': 1}])
+        self.assertEqual(data['maintenance_cost_over_time'][0]['month'], month)
+        self.assertEqual(len(self.client.get('/api/analytics/').json()['loan_activity']), 2)
+        self.assertEqual(self.client.get('/api/analytics/?from=2025-13').status_code, 400)
+
+
+class MaintenanceEventTests(InventoryAPITestCase):
+
+    def test_tool_writes_append_maintenance_events(self):
+        first = self.today - timedelta(days=40)
+        response = self.client.post('/api/tools/', {
+            'name': 'Furadeira', 'total_quantity': 2, 'maintenance_cost': '100.00',
+            'last_maintenance_date': str(first),
+        }, format='json')
+        tool_id = response.json()['id']
+        # Nova manutenção em outra data: acrescenta; só o custo mudou: corrige
+        self.client.patch(f'/api/tools/{tool_id}/', {
+            'maintenance_cost': '80.00', 'last_maintenance_date': str(self.today),
+        }, format='json')
+        self.client.patch(f'/api/tools/{tool_id}/', {'maintenance_cost': '90.00'}, format='json')
+        self.client.patch(f'/api/tools/{tool_id}/', {'name': 'Furadeira de impacto'}, format='json')
+
+        history = self.client.get(f'/api/tools/{tool_id}/maintenance-history/').json()['results']
+        self.assertEqual([(e['date'], e['cost']) for e in history], [
+            (str(self.today), '90.00'), (str(first), '100.00'),
+        ])
+        recent = self.client.get(f'/api/tools/{tool_id}/maintenance-history/?from={self.today}').json()
+        self.assertEqual(len(recent['results']), 1)
+
+        costs = self.client.get('/api/analytics/maintenance-costs/').json()
+        self.assertEqual(costs, [{'tool': tool_id, 'tool_name': 'Furadeira de impacto', 'maintenance_count': 2, 'total_cost': 190.0}])
+        months = self.client.get('/api/analytics/').json()['maintenance_cost_over_time']
+        self.assertEqual(len(months), 2)
+
+
+class HotQueryPlanTests(InventoryAPITestCase):
+
+    def test_hot_queries_use_indexes(self):
+        out = io.StringIO()
+        call_command('explain_hot_queries', '--fail-on-scan', stdout=out)
+        self.assertIn('Nenhuma varredura completa', out.getvalue())
+
+
+class BenchmarkTests(InventoryAPITestCase):
+
+    def test_seed_data_keeps_counters_and_rollups_consistent(self):
+        call_command('seed_benchmark_data', '--tools', '5', '--employees', '3', '--loans', '40',
+                     '--batch-size', '16', '--seed', '1', stdout=io.StringIO())
+        self.assertEqual(Loan.objects.count(), 40)
+        for tool in Tool.objects.with_loan_totals():
+            self.assertEqual(tool.borrowed_quantity, tool.loaned_quantity)
+            self.assertLessEqual(tool.borrowed_quantity, tool.total_quantity)
+        self.assertEqual(sum(LoanMonthlyStats.objects.values_list('loan_count', flat=True)), 40)
+
+    def test_benchmark_measures_get_routes_and_flags_regressions(self):
+        self.user.is_superuser = True
+        self.user.save()
+        self.make_loan(self.make_tool())
+        routes = dict(benchmark.discover_routes())
+        self.assertIn('loan-loan-history', routes)
+        self.assertIn('tool-detail', routes)
+        self.assertNotIn('export-create-job', routes)  # POST apenas
+
+        output = os.path.join(tempfile.mkdtemp(), 'bench.json')
+        call_command('benchmark_endpoints', '--iterations', '2', '--warmup', '0',
+                     '--only', 'tool-list', 'dashboard-list', '--output', output, stdout=io.StringIO())
+        results = benchmark.load(output)
+        self.assertEqual(set(results['endpoints']), {'tool-list', 'dashboard-list'})
+        self.assertEqual(results['endpoints']['tool-list']['status'], 200)
+
+        slower = {'endpoints': {name: dict(row, p95_ms=row['p95_ms'] + 50, queries=row['queries'] + 1)
+                                for name, row in results['endpoints'].items()}}
+        metrics = {metric for _, metric, _, _ in benchmark.compare(results, slower)}
+        self.assertEqual(metrics, {'p95_ms', 'queries'})
+        self.assertEqual(benchmark.percentile([1, 2, 3, 4], 50), 2.5)
+
+
+class MetricsTests(InventoryAPITestCase):
+
+    def setUp(self):
+        super().setUp()
+        metrics.registry.reset()
+
+    def test_requests_are_aggregated_per_route(self):
+        self.make_loan(self.make_tool())
+        response = self.client.get('/api/loans/active_loans/')
+        self.assertRegex(response['Server-Timing'], r'^db;dur=[\d.]+;desc="\d+ queries", app;dur=')
+        self.client.get('/api/loans/active_loans/')
+        self.client.get('/api/does-not-exist/')
+        self.client.generic('FOO', '/api/does-not-exist/')
+        self.client.generic('BAR', '/api/does-not-exist/')
+
+        series = metrics.registry.snapshot()
+        active = series[('loan-active-loans', 'GET')]
+        self.assertEqual(active.count, 2)
+        self.assertEqual(sum(active.buckets), 2)
+        self.assertGreater(active.queries, 0)
+        self.assertEqual(series[(metrics.UNMATCHED, 'GET')].statuses, {404: 1})
+        self.assertEqual(series[(metrics.UNMATCHED, metrics.OTHER_METHOD)].count, 2)
+        self.assertNotIn((metrics.UNMATCHED, 'FOO'), series)
+
+    def test_metrics_endpoint_requires_staff_or_token(self):
+        self.client.get('/api/dashboard/')
+        self.assertEqual(self.client.get('/api/_metrics').status_code, 403)
+
+        self.user.is_staff = True
+        self.user.save()
+        token = str(RefreshToken.for_user(self.user).access_token)
+        body = APIClient().get('/api/_metrics', HTTP_AUTHORIZATION=f'Bearer {token}').content.decode()
+        self.assertIn('http_request_duration_seconds_count{route="dashboard-list",method="GET"} 1', body)
+        self.assertIn('http_requests_total{route="dashboard-list",method="GET",status="200"} 1', body)
+
+        with override_settings(METRICS={'TOKEN': 's3cret'}):
+            self.assertEqual(APIClient().get('/api/_metrics', HTTP_AUTHORIZATION=f'Bearer {token}').status_code, 403)
+            self.assertEqual(APIClient().get('/api/_metrics', HTTP_AUTHORIZATION='Bearer s3cret').status_code, 200)
+
+
+class ProfilingTests(InventoryAPITestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.profiles = tempfile.mkdtemp()
+        self.settings_override = override_settings(PROFILING={'DIR': self.profiles, 'MAX_PROFILES': 2})
+        self.settings_override.enable()
+        self.addCleanup(self.settings_override.disable)
+        self.user.is_staff = True
+        self.user.save()
+        self.client = APIClient()
+        token = str(RefreshToken.for_user(self.user).access_token)
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {token}')
+
+    def test_only_flagged_staff_requests_are_profiled(self):
+        self.assertNotIn('X-Profile-Id', self.client.get('/api/dashboard/'))
+        response = self.client.get('/api/dashboard/', HTTP_X_PROFILE='1')
+        profile_id = response['X-Profile-Id']
+
+        listed = self.client.get('/api/profiles/').json()
+        self.assertEqual([p['id'] for p in listed], [profile_id])
+        self.assertEqual(listed[0]['route'], 'dashboard-list')
+        collapsed = b''.join(self.client.get(f'/api/profiles/{profile_id}/collapsed/').streaming_content).decode()
+        self.assertIn('cached_dashboard_data', collapsed)
+        self.assertEqual(self.client.get(f'/api/profiles/{profile_id}/download/').status_code, 200)
+
+        self.user.is_staff = False
+        self.user.save()
+        self.assertNotIn('X-Profile-Id', self.client.get('/api/dashboard/', HTTP_X_PROFILE='1'))
+        self.assertEqual(self.client.get('/api/profiles/').status_code, 403)
+
+    def test_streamed_exports_are_profiled_and_buffer_is_bounded(self):
+        self.make_loan(self.make_tool())
+        for _ in range(3):
+            response = self.client.get('/api/export/loan-history/?_profile=1')
+            b''.join(response.streaming_content)
+        listed = self.client.get('/api/profiles/').json()
+        self.assertEqual(len(listed), 2)
+        self.assertEqual(listed[0]['id'], response['X-Profile-Id'])
+        self.assertEqual(self.client.get('/api/profiles/missing/').status_code, 404)
+
+
+class SlowQueryTests(InventoryAPITestCase):
+
+    def test_fingerprint_ignores_literals_and_in_list_size(self):
+        self.assertEqual(
+            slow_queries.fingerprint('SELECT * FROM t WHERE id IN (%s, %s) AND name = %s'),
+            slow_queries.fingerprint("SELECT *  FROM t WHERE id IN (%s) AND name = 'x'"),
+        )
+        self.assertNotEqual(slow_queries.fingerprint('SELECT a FROM t'), slow_queries.fingerprint('SELECT b FROM t'))
+
+    @override_settings(SLOW_QUERIES={'THRESHOLD_MS': 0})
+    def test_slow_queries_are_grouped_with_call_site_and_plan(self):
+        tool = self.make_tool()
+        self.client.get('/api/loans/active_loans/')
+        self.client.get(f'/api/loans/active_loans/?tool={tool.pk}')
+
+        query = SlowQuery.objects.get(sql__contains='"inventory_loan"."returned_date" IS NULL')
+        self.assertEqual(query.count, 2)
+        self.assertEqual(query.route, 'loan-active-loans')
+        self.assertTrue(query.call_site.startswith('inventory/'), query.call_site)
+        self.assertIn('inventory_loan', query.explain)
+        self.assertFalse(SlowQuery.objects.filter(sql__contains='inventory_slowquery').exists())
+
+        out = io.StringIO()
+        call_command('slow_queries', '--order', 'avg', '--explain', stdout=out)
+        self.assertIn('origem: inventory/', out.getvalue())
+        call_command('slow_queries', '--clear', stdout=io.StringIO())
+        self.assertFalse(SlowQuery.objects.exists())
+
+
+    @override_settings(SLOW_QUERIES={'THRESHOLD_MS': 0, 'EXPLAIN': False})
+    def test_queries_of_streamed_exports_are_recorded(self):
+        self.make_loan(self.make_tool())
+        response = self.client.get('/api/export/loan-history/')
+        self.assertFalse(SlowQuery.objects.filter(route='export-export-loan-history').exists())
+        b''.join(response.streaming_content)
+        response.close()
+        self.assertTrue(SlowQuery.objects.filter(sql__contains='"inventory_loan"', route='export-export-loan-history').exists())
+
+class DatabaseProfileTests(TestCase):
+
+    def pragma(self, name):
+        with connection.cursor() as cursor:
+            cursor.execute(f'PRAGMA {name}')
+            return cursor.fetchone()[0]
+
+    def test_sqlite_pragmas_are_applied_on_connect(self):
+        self.assertEqual(settings.SQLITE_PRAGMAS['synchronous'], 'NORMAL')
+        self.assertEqual(self.pragma('synchronous'), 1)
+        self.assertEqual(self.pragma('busy_timeout'), settings.SQLITE_PRAGMAS['busy_timeout'])
+        self.assertEqual(self.pragma('journal_mode'), 'memory')  # WAL é ignorado em banco de memória
+
+
+class ConditionalGetTests(InventoryAPITestCase):
+
+    def test_unchanged_lists_answer_304_without_querying(self):
+        tool = self.make_tool()
+        response = self.client.get('/api/tools/')
+        etag = response['ETag']
+        self.assertIn('no-cache', response['Cache-Control'])
+
+        with self.assertNumQueries(1):  # só a versão
+            response = self.client.get('/api/tools/', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response.content, b'')
+        self.assertEqual(response['ETag'], etag)
+        # Outra URL, outro ETag
+        self.assertNotEqual(self.client.get(f'/api/tools/{tool.pk}/')['ETag'], etag)
+
+    def test_writes_change_the_etag(self):
+        tool = self.make_tool()
+        employee = self.make_employee()
+        tools_etag = self.client.get('/api/tools/')['ETag']
+        loans_etag = self.client.get('/api/loans/active_loans/')['ETag']
+        employees_etag = self.client.get('/api/employees/')['ETag']
+
+        loan = self.client.post('/api/loans/', {
+            'tool': tool.pk, 'employee': employee.pk, 'quantity': 1,
+            'due_date': str(self.today + timedelta(days=3)),
+        }, format='json').json()
+        # Empréstimo muda o estoque da ferramenta (update em massa) e a lista de empréstimos
+        self.assertEqual(self.client.get('/api/tools/', HTTP_IF_NONE_MATCH=tools_etag).status_code, 200)
+        loans_etag_after = self.client.get('/api/loans/active_loans/')['ETag']
+        self.assertNotEqual(loans_etag_after, loans_etag)
+        self.assertEqual(self.client.get('/api/employees/', HTTP_IF_NONE_MATCH=employees_etag).status_code, 304)
+
+        self.client.post(f"/api/loans/{loan['id']}/return/")
+        self.assertEqual(self.client.get('/api/loans/active_loans/', HTTP_IF_NONE_MATCH=loans_etag_after).status_code, 200)
+
+
+class BulkLoanTests(InventoryAPITestCase):
+
+    def post_bulk(self, items, mode='atomic', employee=None):
+        return self.client.post('/api/loans/bulk/', {
+            'employee': employee.pk if employee else None,
+            'due_date': str(self.today + timedelta(days=5)),
+            'items': items,
+            'mode': mode,
+        }, format='json')
+
+    def test_bulk_checkout_is_all_or_nothing_by_default(self):
+        hammer, drill = self.make_tool(total_quantity=3), self.make_tool(name='Furadeira', total_quantity=1)
+        response = self.post_bulk([{'tool': hammer.pk, 'quantity': 2}, {'tool': drill.pk, 'quantity': 2}])
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual([e['index'] for e in response.json()['errors']], [1])
+        self.assertFalse(Loan.objects.exists())
+        hammer.refresh_from_db()
+        self.assertEqual(hammer.borrowed_quantity, 0)
+
+    def test_bulk_checkout_partial_mode_and_side_effects(self):
+        employee = self.make_employee()
+        hammer, drill = self.make_tool(total_quantity=3), self.make_tool(name='Furadeira', total_quantity=1)
+        etag = self.client.get('/api/loans/active_loans/')['ETag']
+        response = self.post_bulk([
+            {'tool': hammer.pk, 'quantity': 2},
+            {'tool': drill.pk},
+            {'tool': hammer.pk, 'quantity': 2},  # excede o que sobrou
+            {'tool': 999},
+        ], mode='partial', employee=employee)
+        self.assertEqual(response.status_code, 201)
+        body = response.json()
+        self.assertEqual([loan['tool_name'] for loan in body['created']], ['Martelo', 'Furadeira'])
+        self.assertEqual([e['index'] for e in body['errors']], [2, 3])
+
+        self.assertEqual(dict(Tool.objects.values_list('name', 'borrowed_quantity')), {'Martelo': 2, 'Furadeira': 1})
+        self.assertEqual(LoanMonthlyStats.objects.get().loan_count, 2)
+        self.assertEqual(self.client.get('/api/loans/active_loans/', HTTP_IF_NONE_MATCH=etag).status_code, 200)
+
+    def test_bulk_checkout_query_count_does_not_grow_with_items(self):
+        tools = [self.make_tool(name=f'Ferramenta {i}') for i in range(6)]
+        self.post_bulk([{'tool': tools[0].pk}])  # cria as linhas de resumo e versão
+        counts = []
+        for size in (1, 5):
+            with CaptureQueriesContext(connection) as queries:
+                self.assertEqual(self.post_bulk([{'tool': t.pk} for t in tools[1:1 + size]]).status_code, 201)
+            counts.append(len(queries))
+        self.assertEqual(counts[0], counts[1])
+
+    def test_bulk_return_releases_stock_once(self):
+        tool = self.make_tool(total_quantity=5)
+        first, second = self.make_loan(tool, quantity=2), self.make_loan(tool, quantity=1)
+        done = self.make_loan(tool, returned=True)
+
+        response = self.client.post('/api/loans/bulk-return/', {'ids': [first.pk, done.pk]}, format='json')
+        self.assertEqual(response.status_code, 400)
+        self.assertIsNone(Loan.objects.get(pk=first.pk).returned_date)
+
+        response = self.client.post('/api/loans/bulk-return/', {
+            'ids': [first.pk, second.pk, done.pk, first.pk], 'mode': 'partial',
+        }, format='json')
+        self.assertEqual(response.json()['returned'], [first.pk, second.pk])
+        self.assertEqual(response.json()['errors'][0]['id'], done.pk)
+        tool.refresh_from_db()
+        self.assertEqual(tool.borrowed_quantity, 0)
+        self.assertFalse(Loan.objects.filter(returned_date__isnull=True).exists())
+
+
+class AuthCacheTests(InventoryAPITestCase):
+
+    def jwt_client(self, user):
+        client = APIClient()
+        client.credentials(HTTP_AUTHORIZATION=f'Bearer {RefreshToken.for_user(user).access_token}')
+        return client
+
+    def make_user(self, username, *codenames):
+        user = get_user_model().objects.create_user(username=username, password='secret123')
+        user.user_permissions.set(page_permissions(*codenames))
+        return user
+
+    def test_second_request_resolves_user_and_permissions_from_cache(self):
+        client = self.jwt_client(self.user)
+        self.assertEqual(client.get('/api/dashboard/').status_code, 200)
+        with CaptureQueriesContext(connection) as queries:
+            self.assertEqual(client.get('/api/dashboard/').status_code, 200)
+        tables = ' '.join(q['sql'] for q in queries)
+        self.assertNotIn('users_user', tables)
+        self.assertNotIn('auth_permission', tables)
+
+    def test_permission_changes_invalidate_cache(self):
+        user = self.make_user('leitor', 'virtual_warehouse')
+        client = self.jwt_client(user)
+        self.assertEqual(client.get('/api/analytics/').status_code, 403)
+
+        group = Group.objects.create(name='Relatórios')
+        user.groups.add(group)
+        group.permissions.add(*page_permissions('analytics'))
+        self.assertEqual(client.get('/api/analytics/').status_code, 200)
+
+        user.is_active = False
+        user.save()
+        self.assertEqual(client.get('/api/analytics/').status_code, 401)
+
+    def test_model_permissions_are_enforced(self):
+        user = self.make_user('almoxarife', 'virtual_warehouse')
+        client = self.jwt_client(user)
+        tool = self.make_tool()
+        self.assertEqual(client.get('/api/tools/').status_code, 200)
+        self.assertEqual(client.patch(f'/api/tools/{tool.pk}/', {'name': 'Marreta'}, format='json').status_code, 403)
+        self.assertEqual(client.get('/api/dashboard/').status_code, 403)
+        self.assertEqual(client.get('/api/loans/loan_history/').status_code, 403)
+        self.assertEqual(client.post('/api/export/jobs/', {'kind': 'loan-history'}, format='json').status_code, 403)
+        self.assertEqual(client.get('/api/export/tools/').status_code, 200)
+
+        admin = get_user_model().objects.create_superuser(username='admin', password='secret123')
+        self.assertEqual(self.jwt_client(admin).get('/api/dashboard/').status_code, 200)
+
+
+class CsvImportTests(InventoryAPITestCase):
+
+    def upload(self, kind, text, **params):
+        query = '?dry_run=1' if params.get('dry_run') else ''
+        return self.client.post(
+            f'/api/import/{kind}/{query}',
+            {'file': io.BytesIO(('﻿' + text).encode('utf-8'))},
+            format='multipart',
+        )
+
+    def test_tools_round_trip_through_export(self):
+        self.make_tool(name='Martelo', total_quantity=4, unit_value='12.50', condition='new', supplier='ACME')
+        exported = b''.join(self.client.get('/api/export/tools/').streaming_content).decode('utf-8')
+        Tool.objects.all().delete()
+
+        body = self.upload('tools', exported).json()
+        self.assertEqual((body['created'], body['updated'], body['error_count']), (1, 0, 0))
+        tool = Tool.objects.get()
+        self.assertEqual((tool.total_quantity, str(tool.unit_value), tool.condition, tool.supplier),
+                         (4, '12.50', 'new', 'ACME'))
+
+        body = self.upload('tools', exported).json()
+        self.assertEqual((body['created'], body['updated']), (0, 1))
+        self.assertEqual(Tool.objects.count(), 1)
+
+    def test_tool_upsert_keeps_missing_columns_and_reports_rows(self):
+        tool = self.make_tool(name='Martelo', total_quantity=5, supplier='ACME')
+        self.make_loan(tool, quantity=3)
+        text = (
+            'Nome;Quantidade Total;Última Manutenção;Custo de Manutenção\n'
+            'Martelo;2;;\n'                       # abaixo do emprestado
+            'Furadeira;3;2025-03-10;40,5\n'
+            ';1;;\n'                              # sem nome
+            'Serra;x;;\n'
+        )
+        body = self.upload('tools', text).json()
+        self.assertEqual(body['rows'], 4)
+        self.assertEqual(body['created'], 1)
+        self.assertEqual(sorted(e['row'] for e in body['errors']), [2, 4, 5])
+
+        tool.refresh_from_db()
+        self.assertEqual((tool.total_quantity, tool.supplier, tool.borrowed_quantity), (5, 'ACME', 3))
+        event = MaintenanceEvent.objects.get(tool__name='Furadeira')
+        self.assertEqual(str(event.cost), '40.50')
+        self.assertEqual(MaintenanceMonthlyStats.objects.get().maintenance_count, 1)
+
+    def test_blank_cells_keep_current_values_on_update(self):
+        tool = self.make_tool(name='Martelo', total_quantity=5, description='Cabo de madeira',
+                              condition='new', supplier='ACME', unit_value='12.50')
+        self.make_loan(tool, quantity=2)
+        text = (
+            'Nome;Descrição;Quantidade Total;Condição;Valor Unitário;Fornecedor\n'
+            'Martelo;;;;;Tramontina\n'
+            'Serrote;;;;;\n'
+        )
+        body = self.upload('tools', text).json()
+        self.assertEqual((body['created'], body['updated'], body['error_count']), (1, 1, 0))
+
+        tool.refresh_from_db()
+        self.assertEqual(
+            (tool.total_quantity, tool.description, tool.condition, str(tool.unit_value), tool.supplier),
+            (5, 'Cabo de madeira', 'new', '12.50', 'Tramontina'),
+        )
+        created = Tool.objects.get(name='Serrote')
+        self.assertEqual((created.total_quantity, created.condition, created.supplier), (0, 'good', None))
+
+    def test_employee_upsert_by_registration_number(self):
+        self.make_employee(name='João', registration_number='001')
+        etag = self.client.get('/api/employees/')['ETag']
+        text = 'Nome,Matrícula\nJoão Silva,001\nMaria,002\nMaria Souza,002\n'
+
+        body = self.upload('employees', text, dry_run=True).json()
+        self.assertEqual((body['created'], body['updated']), (1, 1))
+        self.assertEqual(Employee.objects.count(), 1)
+
+        self.upload('employees', text)
+        self.assertEqual(dict(Employee.objects.values_list('registration_number', 'name')),
+                         {'001': 'João Silva', '002': 'Maria Souza'})
+        self.assertEqual(self.client.get('/api/employees/', HTTP_IF_NONE_MATCH=etag).status_code, 200)
+        rows = b''.join(self.client.get('/api/export/employees/').streaming_content).decode('utf-8').splitlines()
+        self.assertEqual(rows[0], 'Nome,Matrícula')
+
+    def test_missing_required_column_is_400(self):
+        response = self.upload('employees', 'Nome\nJoão\n')
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('Matrícula', response.json()['file'])
+
+    def test_import_command_in_batches(self):
+        with tempfile.NamedTemporaryFile('w', suffix='.csv', encoding='utf-8', delete=False) as handle:
+            handle.write('Nome,Matrícula\n' + ''.join(f'Pessoa {i},{i:03d}\n' for i in range(5)))
+        self.addCleanup(os.remove, handle.name)
+        out = io.StringIO()
+        call_command('import_csv', 'employees', handle.name, batch_size=2, stdout=out)
+        self.assertIn('5 criada(s)', out.getvalue())
+        self.assertEqual(Employee.objects.count(), 5)
+
+
+class SearchTests(InventoryAPITestCase):
+
+    def names(self, url):
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        return [item['name'] for item in response.json()]
+
+    def test_tool_prefix_search_is_ranked_and_filtered(self):
+        self.make_tool(name='Martelo de borracha', condition='good')
+        self.make_tool(name='Chave inglesa', description='Para martelar não serve', condition='new')
+        self.make_tool(name='Marreta', condition='maintenance')
+        self.assertEqual(self.names('/api/tools/search/?q=mart'), ['Martelo de borracha', 'Chave inglesa'])
+        self.assertEqual(self.names('/api/tools/search/?q=mar&condition=good,new&limit=1'), ['Martelo de borracha'])
+        self.assertEqual(self.names('/api/tools/search/?q=borr mart'), ['Martelo de borracha'])
+        self.assertEqual(self.client.get('/api/tools/search/?condition=quebrada').status_code, 400)
+
+    def test_index_follows_bulk_writes_and_ignores_accents(self):
+        tool = self.make_tool(name='Serrote')
+        Tool.objects.filter(pk=tool.pk).update(name='Esquadro')
+        Employee.objects.bulk_create([Employee(name='João Araújo', registration_number='A-77')])
+        self.assertEqual(self.names('/api/tools/search/?q=serr'), [])
+        self.assertEqual(self.names('/api/tools/search/?q=esq'), ['Esquadro'])
+        self.assertEqual(self.names('/api/employees/search/?q=joao arau'), ['João Araújo'])
+        self.assertEqual(self.names('/api/employees/search/?q=77'), ['João Araújo'])
+
+    def test_post_migrate_restores_the_migration_triggers(self):
+        def triggers():
+            with connection.cursor() as cursor:
+                cursor.execute("SELECT name, sql FROM sqlite_master WHERE type = 'trigger' AND name GLOB '*_fts_*'")
+                return dict(cursor.fetchall())
+
+        created = triggers()
+        self.assertEqual(len(created), 6)
+        with connection.cursor() as cursor:
+            cursor.execute('DROP TRIGGER inventory_tool_fts_au')
+        search.restore_fts_triggers(sender=None, using='default')
+        self.assertEqual(triggers(), created)
+
+    def test_fallback_without_fts(self):
+        self.make_tool(name='Alicate', supplier='Tramontina')
+        self.make_tool(name='Trena')
+        with mock.patch.object(search, 'fts_available', return_value=False):
+            self.assertEqual(self.names('/api/tools/search/?q=tr'), ['Trena', 'Alicate'])
+            self.assertEqual(self.names('/api/tools/search/?q="tr*'), ['Trena', 'Alicate'])
+
+
+class SparseFieldsTests(InventoryAPITestCase):
+
+    def get_sql(self, url):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        return response.json(), [q['sql'] for q in queries.captured_queries]
+
+    def test_tool_fields_limit_output_and_columns(self):
+        self.make_tool(name='Trena', description='Cinco metros')
+        data, sql = self.get_sql('/api/tools/?fields=id,name')
+        self.assertEqual(data['results'], [{'id': data['results'][0]['id'], 'name': 'Trena'}])
+        self.assertNotIn('"description"', sql[-1])
+
+        data, _ = self.get_sql('/api/tools/search/?q=tre&fields=name&expand=available_quantity')
+        self.assertEqual(data, [{'name': 'Trena', 'available_quantity': 10}])
+
+        full, _ = self.get_sql('/api/tools/?expand=image_thumb')
+        self.assertIn('image_thumb', full['results'][0])
+        self.assertNotIn('available_quantity', full['results'][0])
+        self.assertIn('available_quantity', self.get_sql('/api/tools/')[0]['results'][0])
+
+    def test_loan_joins_only_expanded_relations(self):
+        tool, employee = self.make_tool(), self.make_employee()
+        self.make_loan(tool, employee)
+        data, sql = self.get_sql('/api/loans/active_loans/?fields=id,quantity')
+        self.assertEqual(list(data['results'][0]), ['id', 'quantity'])
+        self.assertNotIn('JOIN', sql[-1])
+
+        data, sql = self.get_sql('/api/loans/active_loans/?fields=id&expand=tool_name')
+        self.assertEqual(data['results'][0]['tool_name'], 'Martelo')
+        self.assertIn('"inventory_tool"', sql[-1])
+        self.assertNotIn('"inventory_employee"', sql[-1])
+
+        data, _ = self.get_sql('/api/loans/')
+        self.assertEqual(data['results'][0]['employee_name'], 'João')
+
+    def test_invalid_names_are_rejected(self):
+        for query in ('fields=senha', 'fields=tool_name', 'expand=quantity'):
+            self.assertEqual(self.client.get(f'/api/loans/?{query}').status_code, 400, query)
+
+
+class FastReadTests(InventoryAPITestCase):
+
+    def both_paths(self, url):
+        """ Corpo da resposta pelo caminho rápido e pelo serializer. """
+        responses = []
+        for enabled in (True, False):
+            with override_settings(FAST_READS={'ENABLED': enabled}):
+                response = self.client.get(url)
+            self.assertEqual(response.status_code, 200, url)
+            responses.append(response.content)
+        return responses
+
+    def test_output_matches_serializer_byte_for_byte(self):
+        tool = self.make_tool(name='Trena\u2028 métrica', unit_value='12.5', acquisition_date=self.today,
+                              condition='maintenance', maintenance_cost='3')
+        Tool.objects.filter(pk=tool.pk).update(image='tool_images/trena.png', image_renditions={
+            'source': 'tool_images/trena.png',
+            'thumb': {'webp': 'r/t.webp', 'jpeg': 'r/t.jpg', 'width': 160, 'height': 120},
+        })
+        self.make_tool(name='Alicate', description='Isolado')
+        self.make_loan(tool, self.make_employee())
+        self.make_loan(tool, returned=True)  # sem funcionário: employee_name some da resposta
+        for url in ['/api/tools/', '/api/tools/?page_size=1', '/api/tools/?paginate=false',
+                    '/api/tools/?fields=name&expand=image_thumb,available_quantity',
+                    '/api/loans/', '/api/loans/active_loans/', '/api/loans/overdue_loans/',
+                    '/api/loans/loan_history/?expand=employee_name']:
+            fast, serialized = self.both_paths(url)
+            self.assertEqual(fast, serialized, url)
+
+        with CaptureQueriesContext(connection) as queries:
+            self.client.get('/api/loans/?page_size=1')
+        self.assertIn('LEFT OUTER JOIN "inventory_employee"', queries.captured_queries[-1]['sql'])
+
+    def test_columnar_format(self):
+        tool = self.make_tool(name='Serrote')
+        loan = self.make_loan(tool, self.make_employee())
+        url = '/api/loans/?format=columnar&fields=id,quantity&expand=employee_name'
+        fast, serialized = self.both_paths(url)
+        self.assertEqual(fast, serialized)
+        self.assertEqual(self.client.get(url).json(), {
+            'next': None, 'columns': ['id', 'quantity', 'employee_name'], 'rows': [[loan.pk, 1, 'João']],
+        })
+        data = self.client.get('/api/tools/?format=columnar&paginate=false&fields=name').json()
+        self.assertEqual(data, {'columns': ['name'], 'rows': [['Serrote']]})
+
+    def test_renderer_without_orjson(self):
+        self.make_tool(name='Nível')
+        fast = self.client.get('/api/tools/').content
+        with mock.patch.object(fast_reads, 'orjson', None):
+            self.assertEqual(self.client.get('/api/tools/').content, fast)
+
+
+@override_settings(MEDIA_ROOT=tempfile.mkdtemp(prefix='inventory-images-'))
+class ToolImageTests(InventoryAPITestCase):
+
+    def photo(self, name='foto.png', size=(1200, 800)):
+        buffer = io.BytesIO()
+        Image.new('RGBA', size, (200, 30, 30, 128)).save(buffer, 'PNG')
+        buffer.seek(0)
+        buffer.name = name
+        return buffer
+
+    def create_tool(self, name, photo):
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post('/api/tools/', {'name': name, 'total_quantity': 1, 'image': photo}, format='multipart')
+        self.assertEqual(response.status_code, 201)
+        return response.json()['id']
+
+    def test_upload_generates_renditions_in_background(self):
+        tool_id = self.create_tool('Martelo', self.photo())
+        self.assertIsNone(self.client.get(f'/api/tools/{tool_id}/').json()['image_thumb'])
+
+        self.assertEqual(jobs.run_pending(), 1)
+        data = self.client.get(f'/api/tools/{tool_id}/').json()
+        self.assertEqual((data['image_thumb']['width'], data['image_thumb']['height']), (160, 107))
+        self.assertEqual(data['image_full']['width'], 1200)  # nunca amplia
+        self.assertTrue(data['image_card']['webp'].endswith('-card.webp'))
+        path = os.path.join(settings.MEDIA_ROOT, Tool.objects.get(pk=tool_id).image_renditions['thumb']['jpeg'])
+        self.assertTrue(os.path.exists(path))
+
+        # Mesma foto em outra ferramenta: mesmos arquivos (nome pelo hash do conteúdo)
+        other_id = self.create_tool('Marreta', self.photo('outra.png'))
+        jobs.run_pending()
+        other = self.client.get(f'/api/tools/{other_id}/').json()
+        self.assertEqual(other['image_thumb']['jpeg'], data['image_thumb']['jpeg'])
+
+    def test_pixel_limit_is_checked_without_changing_pillow_global(self):
+        limit = Image.MAX_IMAGE_PIXELS
+        with tempfile.TemporaryDirectory() as media:
+            source = os.path.join(media, 'grande.png')
+            Image.new('RGB', (300, 200)).save(source)
+            with self.assertRaises(Image.DecompressionBombError):
+                images.render_file(source, media, {**images.render_options(), 'MAX_PIXELS': 50_000})
+            self.assertIn('thumb', images.render_file(source, media, images.render_options()))
+        self.assertEqual(Image.MAX_IMAGE_PIXELS, limit)
+
+    def test_backfill_command_and_stale_renditions(self):
+        tool_id = self.create_tool('Martelo', self.photo(size=(300, 300)))
+        Job.objects.all().delete()
+        out = io.StringIO()
+        call_command('build_tool_images', workers=1, stdout=out)
+        self.assertIn('1 foto(s) processada(s)', out.getvalue())
+        tool = Tool.objects.get(pk=tool_id)
+        self.assertEqual(tool.image_renditions['card']['width'], 300)
+
+        # Foto trocada: as versões antigas deixam de ser expostas até o worker refazer
+        Tool.objects.filter(pk=tool_id).update(image='tool_images/nova.png')
+        self.assertIsNone(self.client.get(f'/api/tools/{tool_id}/').json()['image_card'])
+
+
+@override_settings(STATIC_ROOT=tempfile.mkdtemp(prefix='inventory-static-'))
+class StaticAssetTests(TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        call_command('build_assets', stdout=io.StringIO())
+
+    def setUp(self):
+        assets.PageView._rendered.clear()
+
+    def test_pages_use_hashed_bundles_and_revalidate(self):
+        response = self.client.get('/dashboard/')
+        html = response.content.decode()
+        self.assertRegex(html, r'/static/css/dashboard\.bundle\.[0-9a-f]{12}\.css')
+        self.assertRegex(html, r'/static/js/main\.[0-9a-f]{12}\.js')
+        self.assertNotIn("css/style.", html)  # dentro do pacote
+        self.assertEqual(self.client.get('/dashboard/', HTTP_IF_NONE_MATCH=response['ETag']).status_code, 304)
+
+    def test_hashed_asset_is_precompressed_and_immutable(self):
+        main = staticfiles_storage.stored_name('js/virtual_warehouse.js')
+        response = self.client.get(f'/static/{main}', HTTP_ACCEPT_ENCODING='br;q=0, gzip')
+        self.assertEqual(response['Content-Encoding'], 'gzip')
+        self.assertIn('immutable', response['Cache-Control'])
+        body = gzip.decompress(b''.join(response.streaming_content)).decode()
+        self.assertRegex(body, r'from "\./main\.[0-9a-f]{12}\.js"')
+
+        plain = self.client.get('/static/js/virtual_warehouse.js')
+        self.assertFalse(plain.has_header('Content-Encoding'))
+        self.assertIn('no-cache', plain['Cache-Control'])
+        self.assertEqual(self.client.get('/static/../manage.py').status_code, 404)
+
+
+class EventFeedTests(InventoryAPITestCase):
+
+    def published(self, publish):
+        return [(call.args[0], call.args[1]) for call in publish.call_args_list]
+
+    async def test_broker_replays_missed_events(self):
+        first = events.broker.publish('loan.deleted', {'id': 1})
+        second = events.broker.publish('loan.deleted', {'id': 2})
+        subscriptions = [events.broker.subscribe(first.id), events.broker.subscribe(second.id),
+                         events.broker.subscribe('outra-instancia-3')]
+        self.assertEqual([event.id for event in subscriptions[0].replay], [second.id])
+        self.assertEqual(subscriptions[1].replay, [])
+        self.assertTrue(subscriptions[2].reset)
+        for subscription in subscriptions:
+            events.broker.unsubscribe(subscription)
+
+    def test_writes_publish_events_after_commit(self):
+        tool, employee = self.make_tool(total_quantity=5), self.make_employee()
+        with mock.patch.object(events.broker, 'publish') as publish:
+            with self.captureOnCommitCallbacks(execute=True):
+                loan_id = self.client.post('/api/loans/', {
+                    'tool': tool.pk, 'employee': employee.pk, 'quantity': 2,
+                    'due_date': str(self.today + timedelta(days=3)),
+                }, format='json').json()['id']
+            self.assertEqual(self.published(publish)[0], ('tool.stock', {
+                'id': tool.pk, 'total_quantity': 5, 'borrowed_quantity': 2, 'available_quantity': 3,
+            }))
+            kind, data = self.published(publish)[1]
+            self.assertEqual((kind, data['id'], data['tool_name']), ('loan.created', loan_id, 'Martelo'))
+
+            publish.reset_mock()
+            with self.captureOnCommitCallbacks(execute=True):
+                self.client.post('/api/loans/bulk-return/', {'ids': [loan_id]}, format='json')
+            self.assertEqual(self.published(publish), [
+                ('tool.stock', {'id': tool.pk, 'total_quantity': 5, 'borrowed_quantity': 0, 'available_quantity': 5}),
+                ('loan.returned', {'id': loan_id}),
+            ])
+
+            publish.reset_mock()
+            with self.captureOnCommitCallbacks(execute=True):
+                self.client.delete(f'/api/loans/{loan_id}/')
+            self.assertEqual(self.published(publish), [('loan.deleted', {'id': loan_id})])
+
+    async def test_stream_pushes_subscribed_events(self):
+        token = RefreshToken.for_user(self.user).access_token
+        response = await AsyncClient().get('/api/events/?types=loan', headers={'Authorization': f'Bearer {token}'})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['Content-Type'], 'text/event-stream')
+        chunks = aiter(response.streaming_content)
+        self.assertTrue((await anext(chunks)).startswith(b'retry: '))
+
+        events.broker.publish('tool.stock', {'id': 1})  # não inscrito
+        event = events.broker.publish('loan.returned', {'id': 7})
+        chunk = await asyncio.wait_for(anext(chunks), timeout=5)
+        self.assertEqual(chunk, f'id: {event.id}\nevent: loan.returned\ndata: {{"id":7}}\n\n'.encode())
+        await chunks.aclose()
+
+    def test_stream_requires_asgi(self):
+        self.assertEqual(self.client.get('/api/events/').status_code, 501)
+
+
+class AsyncReportTests(TransactionTestCase):
+    """ Commit de verdade: as consultas concorrentes usam outras conexões. """
+
+    def setUp(self):
+        cache.clear()
+        authentication.invalidate()
+        self.user = get_user_model().objects.create_superuser(username='admin', password='secret123')
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        tool = Tool.objects.create(name='Martelo', total_quantity=5, unit_value='10.00')
+        Loan.objects.create(tool=tool, quantity=2, due_date=timezone.now().date() - timedelta(days=1))
+
+    def async_urlconf(self):
+        urlconf = ModuleType('async_report_urls')
+        urlconf.urlpatterns = [path('api/', include(report_patterns('async')))]
+        return override_settings(ROOT_URLCONF=urlconf)
+
+    def test_async_views_return_the_same_data(self):
+        expected = {url: self.client.get(url).json() for url in benchmark.REPORT_URLS}
+        cache.clear()
+        with self.async_urlconf():
+            self.assertTrue(asyncio.iscoroutinefunction(resolve('/api/dashboard/').func))
+            for url in benchmark.REPORT_URLS:
+                response = self.client.get(url)
+                self.assertEqual(response.status_code, 200)
+                self.assertEqual(response.json(), expected[url])
+            self.assertEqual(expected['/api/dashboard/']['overdue_loans_count'], 1)
+            self.assertEqual(self.client.get('/api/dashboard/')['X-Cache'], 'HIT')
+            self.assertEqual(self.client.post('/api/dashboard/').status_code, 405)
+            self.assertEqual(APIClient().get('/api/analytics/').status_code, 401)
+            self.assertEqual(self.client.get('/api/analytics/?from=2025-13').status_code, 400)
+
+    async def test_async_middlewares_count_queries_of_concurrent_threads(self):
+        token = str(RefreshToken.for_user(self.user).access_token)
+        headers = {'Authorization': f'Bearer {token}'}
+        client = AsyncClient()
+        self.assertTrue(asyncio.iscoroutinefunction(metrics.MetricsMiddleware(client.get)))
+        queries = {}
+        with self.async_urlconf():
+            await client.get('/api/dashboard/', headers=headers)  # autenticação em cache
+            for concurrent in (False, True):
+                await sync_to_async(reports.invalidate_dashboard)()
+                metrics.registry.reset()
+                with override_settings(ASYNC_VIEWS={'CONCURRENT_QUERIES': concurrent}):
+                    response = await client.get('/api/dashboard/', headers=headers)
+                self.assertEqual(response['X-Cache'], 'MISS')
+                queries[concurrent] = metrics.registry.snapshot()[('dashboard-list', 'GET')].queries
+        self.assertGreater(queries[False], 0)
+        self.assertEqual(queries[True], queries[False])
+
+        with self.async_urlconf(), override_settings(PROFILING={'DIR': tempfile.mkdtemp()}):
+            response = await client.get('/api/dashboard/', headers={**headers, 'X-Profile': '1'})
+            profiles = await sync_to_async(profiling.list_profiles)()
+        self.assertEqual([profile['id'] for profile in profiles], [response['X-Profile-Id']])
+
+    def test_benchmark_compares_modes_through_asgi(self):
+        result = benchmark.report_modes(self.user, concurrency=2, requests=4)
+        for mode in ('sync', 'async'):
+            for url in benchmark.REPORT_URLS:
+                self.assertEqual(result['results'][mode][url]['operations'], 4)
+                self.assertEqual(result['results'][mode][url]['errors'], 0)
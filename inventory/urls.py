@@ -1,6 +1,8 @@
 from django.urls import path, include
 from rest_framework.routers import DefaultRouter
-from .views import ToolViewSet, LoanViewSet, DashboardViewSet, ExportViewSet, AnalyticsViewSet, EmployeeViewSet
+from . import async_views
+from .metrics import metrics_view
+from .views import ToolViewSet, LoanViewSet, DashboardViewSet, EventViewSet, ExportViewSet, ImportViewSet, AnalyticsViewSet, EmployeeViewSet, ProfileViewSet
 
 
 router = DefaultRouter()
@@ -8,9 +10,26 @@ router.register(r'tools', ToolViewSet)
 router.register(r'loans', LoanViewSet)
 router.register(r'dashboard', DashboardViewSet, basename='dashboard')
 router.register(r'export', ExportViewSet, basename='export')
+router.register(r'import', ImportViewSet, basename='import')
 router.register(r'analytics', AnalyticsViewSet, basename='analytics')
 router.register(r'employees', EmployeeViewSet) # NOVA ROTA
+router.register(r'profiles', ProfileViewSet, basename='profile')
+
+
+
+def report_patterns(mode):
+    """ Rotas 'list' do Dashboard e da Análise no modo 'sync' ou 'async' (ASYNC_VIEWS['MODE']). """
+    return [
+        path(f'{prefix}/', viewset.as_async_view() if mode == 'async' else viewset.as_view({'get': 'list'}),
+             name=f'{prefix}-list')
+        for prefix, viewset in (('dashboard', DashboardViewSet), ('analytics', AnalyticsViewSet))
+    ]
+
 
 urlpatterns = [
+    path('_metrics', metrics_view, name='metrics'),
+    path('events/', EventViewSet.as_async_view(), name='events'),
+    # No modo async estas rotas vêm antes das do router e as substituem
+    *(report_patterns('async') if async_views.get_setting('MODE') == 'async' else []),
     path('', include(router.urls)),
 ]
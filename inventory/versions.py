@@ -0,0 +1,88 @@
+# inventory/versions.py
+
+"""
+Versões por tabela e GET condicional (ETag / If-None-Match).
+
+Cada escrita em Tool, Loan, Employee ou MaintenanceEvent incrementa o
+contador da tabela (signals, e explicitamente nos updates em massa de
+inventory.stock). As views com ConditionalGetMixin calculam o ETag a
+partir desses contadores e da URL, sem ler o queryset nem serializar o
+corpo, e respondem 304 quando o cliente já tem a versão atual.
+"""
+
+import hashlib
+
+from django.db import IntegrityError, transaction
+from django.db.models import F
+from django.utils import timezone
+from django.utils.cache import patch_cache_control
+from django.utils.http import parse_etags
+from rest_framework import status
+from rest_framework.exceptions import APIException
+from rest_framework.response import Response
+
+from .models import ModelVersion
+
+
+def bump(*names):
+    """ Incrementa a versão das tabelas (nomes como 'tool', 'loan'). """
+    for name in names:
+        if ModelVersion.objects.filter(name=name).update(version=F('version') + 1):
+            continue
+        try:
+            with transaction.atomic():
+                ModelVersion.objects.create(name=name, version=1)
+        except IntegrityError:
+            # Outra requisição criou a linha ao mesmo tempo
+            ModelVersion.objects.filter(name=name).update(version=F('version') + 1)
+
+
+def current(*names):
+    """ Versões atuais, numa única consulta pela chave primária. """
+    found = dict(ModelVersion.objects.filter(name__in=names).values_list('name', 'version'))
+    return [found.get(name, 0) for name in names]
+
+
+class NotModified(APIException):
+    status_code = status.HTTP_304_NOT_MODIFIED
+
+
+class ConditionalGetMixin:
+    """
+    ETag forte para os GETs da view, derivado das versões de 'etag_models',
+    da URL completa, do formato de resposta e da data (empréstimos atrasados
+    mudam com o dia). A comparação com If-None-Match acontece depois da
+    autenticação e antes de o handler tocar no banco.
+    """
+    etag_models = ()
+
+    def compute_etag(self, request):
+        parts = [
+            *(f'{name}:{version}' for name, version in zip(self.etag_models, current(*self.etag_models))),
+            request.get_full_path(),
+            getattr(request, 'accepted_media_type', ''),
+            timezone.now().date().isoformat(),
+        ]
+        return '"%s"' % hashlib.sha1('|'.join(parts).encode()).hexdigest()[:32]
+
+    def initial(self, request, *args, **kwargs):
+        super().initial(request, *args, **kwargs)
+        self.etag = None
+        if request.method in ('GET', 'HEAD') and self.etag_models:
+            self.etag = self.compute_etag(request)
+            if self.etag in parse_etags(request.headers.get('If-None-Match', '')):
+                raise NotModified()
+
+    def handle_exception(self, exc):
+        if isinstance(exc, NotModified):
+            return Response(status=status.HTTP_304_NOT_MODIFIED)
+        return super().handle_exception(exc)
+
+    def finalize_response(self, request, response, *args, **kwargs):
+        response = super().finalize_response(request, response, *args, **kwargs)
+        etag = getattr(self, 'etag', None)
+        if etag and response.status_code in (status.HTTP_200_OK, status.HTTP_304_NOT_MODIFIED):
+            response['ETag'] = etag
+            # O navegador pode guardar, mas sempre revalida (resposta depende do usuário autenticado)
+            patch_cache_control(response, private=True, no_cache=True)
+        return response
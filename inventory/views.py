@@ -1,64 +1,216 @@
 # inventory/views.py
 
+import io
+
 from rest_framework import viewsets, status, serializers
 from rest_framework.decorators import action
 from rest_framework.response import Response
+from rest_framework.exceptions import NotFound
 from django.utils import timezone
-from django.db.models import Sum, Count, F, Q, Value, DecimalField
-from django.db.models.functions import Coalesce
-from django.http import HttpResponse
+from django.db import transaction
+from django.db.models import Q
+from asgiref.sync import sync_to_async
+from django.core.handlers.asgi import ASGIRequest
+from django.http import StreamingHttpResponse, FileResponse
+from django.utils.dateparse import parse_date
 from django.utils.decorators import method_decorator
 from django.views.decorators.csrf import csrf_exempt
-from rest_framework.permissions import IsAuthenticated
+from rest_framework.permissions import IsAuthenticated, IsAdminUser
 from .models import Tool, Loan
 from .serializers import ToolSerializer, LoanSerializer
-from django.db.models import Count, Sum, F
-from django.db.models.functions import TruncMonth
-from .models import Tool, Loan, Employee
-from .serializers import ToolSerializer, LoanSerializer, EmployeeSerializer
+from .models import Tool, Loan, Employee, Job, MaintenanceEvent
+from .serializers import (
+    ToolSerializer, LoanSerializer, EmployeeSerializer, JobSerializer, MaintenanceEventSerializer,
+    BulkLoanSerializer, BulkReturnSerializer,
+)
+from . import events, jobs, profiling, rollups, search, stock, versions
+from .permissions import HasModelPermission, has_any
+from .pagination import ToolPagination, EmployeePagination, LoanPagination, MaintenanceEventPagination
+from .exports import EXPORTS, iter_csv, iter_encoded
+from .imports import IMPORTS, ImportFileError
+from .assets import accepted_encodings
+from .async_views import AsyncListMixin
+from .fast_reads import FastListMixin
+from .reports import aanalytics_data, acached_dashboard_data, analytics_data, cached_dashboard_data, maintenance_cost_report
+from .maintenance import maintenance_state, record_maintenance
+def parse_date_param(value, param):
+    """ Converte um parâmetro AAAA-MM-DD em date, ou responde 400. """
+    try:
+        day = parse_date(value)
+    except ValueError:
+        day = None
+    if day is None:
+        raise serializers.ValidationError({param: "Data inválida, use o formato AAAA-MM-DD."})
+    return day
+
+
+def parse_limit_param(request):
+    """ '?limit=' das buscas, entre 1 e search.MAX_LIMIT. """
+    value = request.query_params.get('limit')
+    if not value:
+        return search.DEFAULT_LIMIT
+    try:
+        return min(max(int(value), 1), search.MAX_LIMIT)
+    except ValueError:
+        raise serializers.ValidationError({"limit": "Informe um número inteiro."})
+
+
+class SparseFieldsMixin:
+    """
+    Leva '?fields=' / '?expand=' do serializer (DynamicFieldsMixin) ao SQL:
+    em leituras, a consulta traz só as colunas e os JOINs dos campos pedidos,
+    mais as colunas de ordenação da paginação.
+    """
+
+    def get_queryset(self):
+        queryset = super().get_queryset()
+        serializer_class = self.get_serializer_class()
+        names = serializer_class.requested_fields(self.request)
+        if names is None:
+            return queryset
+        ordering = [name.lstrip('-') for name in getattr(self.paginator, 'ordering', ())]
+        return serializer_class.restrict_queryset(queryset, names, ordering)
+
+
 # Isenta o CSRF para permitir testes via Postman/APIs, mas em produção,
 # a autenticação por token (como JWT) é o ideal.
 @method_decorator(csrf_exempt, name='dispatch')
-class ToolViewSet(viewsets.ModelViewSet):
+class ToolViewSet(FastListMixin, SparseFieldsMixin, versions.ConditionalGetMixin, viewsets.ModelViewSet):
     """
     API endpoint que permite que as ferramentas sejam visualizadas ou editadas.
     """
+    etag_models = ('tool', 'maintenanceevent')
     queryset = Tool.objects.all()
     serializer_class = ToolSerializer
-    permission_classes = [IsAuthenticated]
-    
+    permission_classes = [HasModelPermission]
+    model_permissions = {
+        'read': ('manage_tools', 'virtual_warehouse', 'register_loan'),
+        'write': ('manage_tools',),
+    }
+    pagination_class = ToolPagination
+
+    def perform_create(self, serializer):
+        """ Salva a ferramenta e registra a manutenção informada, se houver. """
+        with transaction.atomic():
+            tool = serializer.save()
+            record_maintenance(tool)
+
+    def perform_update(self, serializer):
+        """
+        Salva a ferramenta e acrescenta ao histórico uma nova manutenção quando
+        os campos de manutenção mudam (Tool guarda apenas a última).
+        """
+        previous = maintenance_state(serializer.instance)
+        with transaction.atomic():
+            tool = serializer.save()
+            record_maintenance(tool, previous)
+
+    @action(detail=True, methods=['get'], url_path='maintenance-history')
+    def maintenance_history(self, request, pk=None):
+        """ Histórico de manutenções da ferramenta, com filtros opcionais '?from=' e '?to='. """
+        tool = self.get_object()
+        events = MaintenanceEvent.objects.filter(tool=tool)
+        for param, lookup in (('from', 'date__gte'), ('to', 'date__lte')):
+            value = request.query_params.get(param)
+            if value:
+                events = events.filter(**{lookup: parse_date_param(value, param)})
+        paginator = MaintenanceEventPagination()
+        page = paginator.paginate_queryset(events, request, view=self)
+        if page is not None:
+            return paginator.get_paginated_response(MaintenanceEventSerializer(page, many=True).data)
+        return Response(MaintenanceEventSerializer(events, many=True).data)
+
+    @action(detail=False, methods=['get'])
+    def search(self, request):
+        """
+        Busca para digitação (ver inventory.search): '?q=' (prefixos),
+        '?condition=good,new' e '?limit=' (padrão 20, máximo 100).
+        """
+        conditions = [c for c in request.query_params.get('condition', '').split(',') if c]
+        valid = dict(Tool.CONDITION_CHOICES)
+        if any(c not in valid for c in conditions):
+            raise serializers.ValidationError({"condition": f"Use um destes valores: {', '.join(valid)}."})
+        tools = search.search_tools(
+            request.query_params.get('q'), conditions, parse_limit_param(request), queryset=self.get_queryset(),
+        )
+        return Response(self.get_serializer(tools, many=True).data)
+
 
 @method_decorator(csrf_exempt, name='dispatch')
-class EmployeeViewSet(viewsets.ModelViewSet):
+class EmployeeViewSet(versions.ConditionalGetMixin, viewsets.ModelViewSet):
     """
     API para gerenciar Funcionários.
     """
+    etag_models = ('employee',)
     queryset = Employee.objects.all()
     serializer_class = EmployeeSerializer
-    permission_classes = [IsAuthenticated]
+    permission_classes = [HasModelPermission]
+    model_permissions = {
+        'read': ('manage_tools', 'register_loan'),
+        'write': ('manage_tools',),
+    }
+    pagination_class = EmployeePagination
+
+    def perform_destroy(self, instance):
+        """
+        Funcionário com empréstimos ativos não pode ser apagado: a cascata
+        apagaria os empréstimos e devolveria ao estoque ferramentas que
+        ainda estão com ele.
+        """
+        if instance.loan_set.filter(returned_date__isnull=True).exists():
+            raise serializers.ValidationError(
+                {"detail": "Este funcionário tem empréstimos ativos. Registre as devoluções antes de excluí-lo."}
+            )
+        instance.delete()
+
+    @action(detail=False, methods=['get'])
+    def search(self, request):
+        """ Busca por nome ou matrícula: '?q=' (prefixos) e '?limit='. """
+        employees = search.search_employees(request.query_params.get('q'), parse_limit_param(request))
+        return Response(self.get_serializer(employees, many=True).data)
 
 @method_decorator(csrf_exempt, name='dispatch')
-class LoanViewSet(viewsets.ModelViewSet):
+class LoanViewSet(FastListMixin, SparseFieldsMixin, versions.ConditionalGetMixin, viewsets.ModelViewSet):
     """
     API endpoint para gerenciar empréstimos de ferramentas.
     """
-    queryset = Loan.objects.all()
+    # tool_name / employee_name vêm das tabelas relacionadas
+    etag_models = ('loan', 'tool', 'employee')
+    queryset = Loan.objects.with_related()
     serializer_class = LoanSerializer
-    permission_classes = [IsAuthenticated]
+    permission_classes = [HasModelPermission]
+    model_permissions = {
+        'read': ('active_loans', 'history', 'register_loan'),
+        'loan_history': ('history',),
+        'create': ('register_loan',),
+        'bulk': ('register_loan',),
+        'return_tool': ('active_loans',),
+        'bulk_return': ('active_loans',),
+        'write': ('register_loan', 'active_loans'),
+    }
+    pagination_class = LoanPagination
 
-    def perform_update(self, serializer):
+    def perform_create(self, serializer):
         """
-        Salva as alterações no empréstimo. A validação de estoque para
-        quantidades alteradas é feita no LoanSerializer.
+        O estoque é reservado pelo signal de Loan (inventory.signals) na mesma
+        transação do INSERT. Se não houver unidades disponíveis, nada é
+        gravado e a API responde 400.
         """
-        serializer.save()
+        try:
+            serializer.save()
+        except stock.InsufficientStock as exc:
+            raise serializers.ValidationError({"quantity": str(exc)})
 
-    def perform_destroy(self, instance):
+    def perform_update(self, serializer):
         """
-        Ao deletar um empréstimo, a quantidade da ferramenta ficará disponível
-        automaticamente, pois a propriedade 'available_quantity' será recalculada.
+        Salva as alterações no empréstimo. Se a ferramenta, a quantidade ou a
+        devolução mudarem, o signal de Loan libera o estoque antigo e reserva
+        o novo na mesma transação.
         """
-        instance.delete()
+        try:
+            serializer.save()
+        except stock.InsufficientStock as exc:
+            raise serializers.ValidationError({"quantity": str(exc)})
 
     @action(detail=True, methods=["post"], url_path='return')
     def return_tool(self, request, pk=None):
@@ -66,68 +218,191 @@ class LoanViewSet(viewsets.ModelViewSet):
         Ação para marcar um empréstimo como devolvido.
         """
         loan = self.get_object()
-        if loan.returned_date:
+        with transaction.atomic():
+            # UPDATE condicional: duas devoluções simultâneas liberam o estoque uma única vez
+            returned = Loan.objects.filter(pk=loan.pk, returned_date__isnull=True).update(
+                returned_date=timezone.now().date()
+            )
+            if returned:
+                stock.release(loan.tool_id, loan.quantity)
+                versions.bump('loan')
+                events.loans_returned([loan.pk])
+        if not returned:
             return Response({"detail": "Esta ferramenta já foi devolvida."}, status=status.HTTP_400_BAD_REQUEST)
-        
-        loan.returned_date = timezone.now().date()
-        loan.save() # Apenas salvamos o empréstimo. available_quantity será atualizada.
-        
+
         return Response({"detail": "Ferramenta devolvida com sucesso."}, status=status.HTTP_200_OK)
 
+    @action(detail=False, methods=['post'])
+    def bulk(self, request):
+        """
+        Registra vários empréstimos (kit de ferramentas) numa única transação:
+        uma leitura do estoque, um UPDATE condicional e um bulk_create.
+        Erros são informados por item ('index' na lista enviada).
+        """
+        payload = BulkLoanSerializer(data=request.data)
+        payload.is_valid(raise_exception=True)
+        data = payload.validated_data
+        items = data['items']
+        employee = data.get('employee')
+
+        with transaction.atomic():
+            tools = Tool.objects.select_for_update().in_bulk({item['tool'] for item in items})
+            free = {pk: tool.available_quantity for pk, tool in tools.items()}
+            accepted, errors = [], []
+            for index, item in enumerate(items):
+                tool = tools.get(item['tool'])
+                if tool is None:
+                    errors.append({'index': index, 'tool': item['tool'], 'detail': "Ferramenta não encontrada."})
+                elif free[tool.pk] < item['quantity']:
+                    errors.append({'index': index, 'tool': tool.pk,
+                                   'detail': f"Estoque insuficiente: {free[tool.pk]} unidade(s) disponível(is)."})
+                else:
+                    free[tool.pk] -= item['quantity']
+                    accepted.append(item)
+            if not accepted or (errors and data['mode'] == 'atomic'):
+                return Response({'created': [], 'errors': errors}, status=status.HTTP_400_BAD_REQUEST)
+
+            quantities = {}
+            for item in accepted:
+                quantities[item['tool']] = quantities.get(item['tool'], 0) + item['quantity']
+            try:
+                stock.reserve_many(quantities)
+            except stock.InsufficientStock as exc:
+                raise serializers.ValidationError({"quantity": str(exc)})
+            # bulk_create não dispara signals: resumos e versões são atualizados aqui
+            loans = Loan.objects.bulk_create(
+                Loan(tool=tools[item['tool']], employee=employee, quantity=item['quantity'], due_date=data['due_date'])
+                for item in accepted
+            )
+            rollups.loans_created(loans)
+            versions.bump('loan')
+            events.loans_created(loans)
+
+        return Response(
+            {'created': LoanSerializer(loans, many=True).data, 'errors': errors},
+            status=status.HTTP_201_CREATED,
+        )
+
+    @action(detail=False, methods=['post'], url_path='bulk-return')
+    def bulk_return(self, request):
+        """
+        Devolve vários empréstimos numa única transação: um UPDATE condicional
+        nos empréstimos e um no estoque das ferramentas.
+        """
+        payload = BulkReturnSerializer(data=request.data)
+        payload.is_valid(raise_exception=True)
+        ids = list(dict.fromkeys(payload.validated_data['ids']))
+
+        with transaction.atomic():
+            loans = {
+                pk: (tool_id, quantity, returned_date)
+                for pk, tool_id, quantity, returned_date in Loan.objects.select_for_update()
+                .filter(pk__in=ids).values_list('pk', 'tool_id', 'quantity', 'returned_date')
+            }
+            accepted, errors = [], []
+            for index, pk in enumerate(ids):
+                if pk not in loans:
+                    errors.append({'index': index, 'id': pk, 'detail': "Empréstimo não encontrado."})
+                elif loans[pk][2] is not None:
+                    errors.append({'index': index, 'id': pk, 'detail': "Esta ferramenta já foi devolvida."})
+                else:
+                    accepted.append(pk)
+            if not accepted or (errors and payload.validated_data['mode'] == 'atomic'):
+                return Response({'returned': [], 'errors': errors}, status=status.HTTP_400_BAD_REQUEST)
+
+            returned = Loan.objects.filter(pk__in=accepted, returned_date__isnull=True).update(
+                returned_date=timezone.now().date()
+            )
+            if returned != len(accepted):
+                # Devolução simultânea de algum item: desfaz tudo para não liberar estoque em dobro
+                raise serializers.ValidationError({"detail": "Alguns empréstimos foram devolvidos ao mesmo tempo; tente novamente."})
+            quantities = {}
+            for pk in accepted:
+                tool_id, quantity, _ = loans[pk]
+                quantities[tool_id] = quantities.get(tool_id, 0) + quantity
+            stock.release_many(quantities)
+            versions.bump('loan')
+            events.loans_returned(accepted)
+
+        return Response({'returned': accepted, 'errors': errors}, status=status.HTTP_200_OK)
+
     @action(detail=False, methods=["get"])
     def active_loans(self, request):
         """ Retorna todos os empréstimos que ainda não foram devolvidos. """
-        active_loans = self.queryset.filter(returned_date__isnull=True)
-        serializer = self.get_serializer(active_loans, many=True)
-        return Response(serializer.data)
+        active_loans = self.get_queryset().filter(returned_date__isnull=True)
+        return self.list_response(active_loans)
 
     @action(detail=False, methods=["get"])
     def overdue_loans(self, request):
         """ Retorna empréstimos ativos cuja data de devolução já passou. """
-        overdue_loans = self.queryset.filter(due_date__lt=timezone.now().date(), returned_date__isnull=True)
-        serializer = self.get_serializer(overdue_loans, many=True)
-        return Response(serializer.data)
+        overdue_loans = self.get_queryset().filter(due_date__lt=timezone.now().date(), returned_date__isnull=True)
+        return self.list_response(overdue_loans)
 
     @action(detail=False, methods=["get"])
     def loan_history(self, request):
         """ Retorna todos os empréstimos que já foram concluídos. """
-        loan_history = self.queryset.filter(returned_date__isnull=False)
-        serializer = self.get_serializer(loan_history, many=True)
-        return Response(serializer.data)
+        loan_history = self.get_queryset().filter(returned_date__isnull=False)
+        return self.list_response(loan_history)
+
+class EventViewSet(AsyncListMixin, viewsets.ViewSet):
+    """
+    Feed de mudanças em Server-Sent Events (inventory.events), só no ASGI.
+    '?types=loan,tool' escolhe os eventos (padrão: todos os permitidos ao
+    usuário); o cabeçalho Last-Event-ID (ou '?last_event_id=') retoma de
+    onde a conexão anterior parou.
+    """
+    permission_classes = [HasModelPermission]
+    topics = {
+        'loan': LoanViewSet.model_permissions['read'],
+        'tool': ToolViewSet.model_permissions['read'],
+    }
+    model_permissions = {'read': tuple(dict.fromkeys(topics['loan'] + topics['tool']))}
+
+    def _allowed_topics(self, request):
+        wanted = [t for t in request.query_params.get('types', '').split(',') if t] or list(self.topics)
+        unknown = [t for t in wanted if t not in self.topics]
+        if unknown:
+            raise serializers.ValidationError({"types": f"Use um destes valores: {', '.join(self.topics)}."})
+        allowed = {t for t in wanted if request.user.is_superuser or has_any(request.user, self.topics[t])}
+        if not allowed:
+            self.permission_denied(request, message=HasModelPermission.message)
+        return allowed
+
+    async def alist(self, request):
+        if not isinstance(request._request, ASGIRequest):
+            # No WSGI a conexão prenderia uma thread do servidor enquanto durasse
+            return Response({"detail": "O feed de eventos exige o servidor ASGI."},
+                            status=status.HTTP_501_NOT_IMPLEMENTED)
+        allowed = await sync_to_async(self._allowed_topics)(request)
+        last_event_id = request.headers.get('Last-Event-ID') or request.query_params.get('last_event_id')
+        response = StreamingHttpResponse(
+            events.stream(last_event_id, accept=lambda kind: kind == 'reset' or kind.split('.')[0] in allowed),
+            content_type='text/event-stream',
+        )
+        response['Cache-Control'] = 'no-cache'
+        response['X-Accel-Buffering'] = 'no'  # nginx: não segurar os eventos no buffer
+        return response
+
 
 @method_decorator(csrf_exempt, name='dispatch')
-class DashboardViewSet(viewsets.ViewSet):
+class DashboardViewSet(AsyncListMixin, viewsets.ViewSet):
     """
     Endpoint para fornecer dados consolidados para um painel de controle.
     """
+    permission_classes = [HasModelPermission]
+    model_permissions = {'read': ('dashboard',)}
+
+    def _response(self, data, hit, age):
+        response = Response(data)
+        response['X-Cache'] = 'HIT' if hit else 'MISS'
+        response['X-Cache-Age'] = str(int(age))
+        return response
+
     def list(self, request):
-        total_tool_types = Tool.objects.count()
-        active_loans_count = Loan.objects.filter(returned_date__isnull=True).count()
-        overdue_loans_count = Loan.objects.filter(due_date__lt=timezone.now().date(), returned_date__isnull=True).count()
-        
-        # Agregação correta para calcular o total de ferramentas disponíveis
-        total_items = Tool.objects.aggregate(total=Coalesce(Sum('total_quantity'), 0))['total']
-        total_borrowed = Loan.objects.filter(returned_date__isnull=True).aggregate(total=Coalesce(Sum('quantity'), 0))['total']
-        available_in_warehouse = total_items - total_borrowed
-
-        tools_in_maintenance = Tool.objects.filter(condition="maintenance").aggregate(total=Coalesce(Sum("total_quantity"), 0))["total"]
-        total_maintenance_cost = Tool.objects.aggregate(total=Coalesce(Sum("maintenance_cost"), 0.00, output_field=DecimalField()))["total"]
-        
-        # Agregação correta para o valor total (preço unitário * quantidade total de cada ferramenta)
-        total_inventory_value = Tool.objects.annotate(
-            item_value=F('total_quantity') * F('unit_value')
-        ).aggregate(total=Coalesce(Sum('item_value'), 0.00, output_field=DecimalField()))['total']
-
-        data = {
-            "total_tool_types": total_tool_types,
-            "active_loans_count": active_loans_count,
-            "overdue_loans_count": overdue_loans_count,
-            "available_in_warehouse": available_in_warehouse,
-            "tools_in_maintenance": tools_in_maintenance,
-            "total_maintenance_cost": f"{total_maintenance_cost:.2f}",
-            "total_inventory_value": f"{total_inventory_value:.2f}",
-        }
-        return Response(data)
+        return self._response(*cached_dashboard_data())
+
+    async def alist(self, request):
+        return self._response(*await acached_dashboard_data())
 
 
 # inventory/views.py
@@ -140,110 +415,213 @@ class ExportViewSet(viewsets.ViewSet):
     Endpoint para exportar dados do sistema para arquivos CSV.
     """
     # ✅ CORREÇÃO: Adicionada permissão para proteger os dados
-    permission_classes = [IsAuthenticated]
-
-    def _get_tools_data(self):
-        tools = Tool.objects.all()
-        header = 'Nome,Descrição,Quantidade Total,Quantidade Disponível,Condição,Valor Unitário,Data de Aquisição,Custo de Manutenção,Última Manutenção,Próxima Manutenção,Fornecedor\n'
-        rows = []
-        for tool in tools:
-            # Garante que valores nulos não quebrem a string
-            description = tool.description or ''
-            supplier = tool.supplier or ''
-            rows.append(f'"{tool.name}","{description}",{tool.total_quantity},{tool.available_quantity},"{tool.get_condition_display()}",{tool.unit_value},{tool.acquisition_date or ""},{tool.maintenance_cost or ""},{tool.last_maintenance_date or ""},{tool.next_maintenance_date or ""},"{supplier}"')
-        return header + '\n'.join(rows)
-
-    def _get_active_overdue_loans_data(self):
-        loans = Loan.objects.filter(returned_date__isnull=True)
-        header = 'Ferramenta,Mutuário,Quantidade,Data do Empréstimo,Data de Vencimento,Status\n'
-        rows = []
-        for loan in loans:
-            status = 'Atrasado' if loan.is_overdue() else 'Ativo'
-            rows.append(f'"{loan.tool.name}","{loan.borrower.username}",{loan.quantity},{loan.borrowed_date},{loan.due_date},{status}')
-        return header + '\n'.join(rows)
-
-    def _get_loan_history_data(self):
-        loans = Loan.objects.filter(returned_date__isnull=False)
-        header = 'Ferramenta,Mutuário,Quantidade,Data do Empréstimo,Data de Vencimento,Data de Devolução\n'
-        rows = []
-        for loan in loans:
-            rows.append(f'"{loan.tool.name}","{loan.borrower.username}",{loan.quantity},{loan.borrowed_date},{loan.due_date},{loan.returned_date}')
-        return header + '\n'.join(rows)
+    permission_classes = [HasModelPermission]
+    # Cada arquivo exige a permissão da página que mostra os mesmos dados;
+    # as tarefas são checadas em create_job e só o dono as consulta
+    model_permissions = {
+        'export_tools': ToolViewSet.model_permissions['read'],
+        'export_active_overdue_loans': ('active_loans',),
+        'export_loan_history': ('history',),
+        'export_employees': ('manage_tools',),
+        'analytics': ('analytics',),
+    }
+    export_actions = {
+        'tools': 'export_tools',
+        'active-loans': 'export_active_overdue_loans',
+        'loan-history': 'export_loan_history',
+        'employees': 'export_employees',
+        'analytics': 'analytics',
+    }
+
+    def get_permissions(self):
+        if self.action in ('create_job', 'job_status', 'job_download'):
+            return [IsAuthenticated()]
+        return super().get_permissions()
+
+    def _date_filters(self, params):
+        """ Lê os filtros opcionais 'from' e 'to' (AAAA-MM-DD). """
+        filters = {}
+        for param, key in (('from', 'date_from'), ('to', 'date_to')):
+            value = params.get(param)
+            if value:
+                filters[key] = parse_date_param(value, param)
+        return filters
+
+    def _stream_csv(self, request, export_name):
+        """
+        Envia o CSV linha a linha com StreamingHttpResponse: a memória fica
+        constante e o primeiro byte sai antes da consulta terminar. Se o
+        cliente aceitar, o conteúdo é comprimido em gzip durante o envio.
+        """
+        rows, filename = EXPORTS[export_name]
+        filters = self._date_filters(request.query_params)
+        use_gzip = 'gzip' in accepted_encodings(request)  # respeita 'gzip;q=0'
+        response = StreamingHttpResponse(
+            iter_encoded(iter_csv(rows(**filters)), gzip=use_gzip),
+            content_type='text/csv; charset=utf-8',
+        )
+        response['Content-Disposition'] = f'attachment; filename="{filename}"'
+        response['Vary'] = 'Accept-Encoding'
+        if use_gzip:
+            response['Content-Encoding'] = 'gzip'
+        return response
 
     @action(detail=False, methods=['get'], url_path='tools')
     def export_tools(self, request):
-        response = HttpResponse(content_type='text/csv; charset=utf-8')
-        response['Content-Disposition'] = 'attachment; filename="ferramentas.csv"'
-        response.write(self._get_tools_data())
-        return response
+        return self._stream_csv(request, 'tools')
 
     @action(detail=False, methods=['get'], url_path='active-loans')
     def export_active_overdue_loans(self, request):
-        response = HttpResponse(content_type='text/csv; charset=utf-8')
-        response['Content-Disposition'] = 'attachment; filename="emprestimos_ativos.csv"'
-        response.write(self._get_active_overdue_loans_data())
-        return response
+        return self._stream_csv(request, 'active-loans')
 
     @action(detail=False, methods=['get'], url_path='loan-history')
     def export_loan_history(self, request):
-        response = HttpResponse(content_type='text/csv; charset=utf-8')
-        response['Content-Disposition'] = 'attachment; filename="historico_emprestimos.csv"'
-        response.write(self._get_loan_history_data())
-        return response
-    
+        return self._stream_csv(request, 'loan-history')
+
+    @action(detail=False, methods=['get'], url_path='employees')
+    def export_employees(self, request):
+        return self._stream_csv(request, 'employees')
+
+    def _get_job(self, request, job_id):
+        jobs_qs = Job.objects.all()
+        if not request.user.is_staff:
+            jobs_qs = jobs_qs.filter(created_by=request.user)
+        try:
+            return jobs_qs.get(pk=job_id)
+        except Job.DoesNotExist:
+            raise NotFound("Tarefa não encontrada.")
+
+    @action(detail=False, methods=['post'], url_path='jobs')
+    def create_job(self, request):
+        """
+        Agenda uma exportação (ou o relatório 'analytics') para o worker em
+        segundo plano e responde imediatamente com o id da tarefa.
+        Corpo: {"kind": "loan-history", "from": "2025-01-01", "to": "2025-12-31"}
+        """
+        kind = request.data.get('kind')
+        if kind not in jobs.SUBMITTABLE:
+            raise serializers.ValidationError({"kind": f"Use um destes valores: {', '.join(sorted(jobs.SUBMITTABLE))}."})
+        required = self.model_permissions[self.export_actions[kind]]
+        if not (request.user.is_superuser or has_any(request.user, required)):
+            self.permission_denied(request, message=HasModelPermission.message)
+        params = {}
+        if kind in EXPORTS:
+            params = {key: value.isoformat() for key, value in self._date_filters(request.data).items()}
+        job = jobs.submit(kind, params, user=request.user)
+        return Response(JobSerializer(job, context={'request': request}).data, status=status.HTTP_202_ACCEPTED)
+
+    @action(detail=False, methods=['get'], url_path=r'jobs/(?P<job_id>[0-9]+)')
+    def job_status(self, request, job_id=None):
+        job = self._get_job(request, job_id)
+        return Response(JobSerializer(job, context={'request': request}).data)
+
+    @action(detail=False, methods=['get'], url_path=r'jobs/(?P<job_id>[0-9]+)/download')
+    def job_download(self, request, job_id=None):
+        job = self._get_job(request, job_id)
+        if job.status != Job.DONE or not job.result_file:
+            return Response({"detail": "O resultado ainda não está pronto."}, status=status.HTTP_409_CONFLICT)
+        return FileResponse(job.result_file.open('rb'), as_attachment=True, filename=job.result_file.name.rsplit('/', 1)[-1])
+
+class ImportViewSet(viewsets.ViewSet):
+    """
+    Importação em massa de CSV (multipart, campo 'file') no layout das
+    exportações. Linhas existentes são atualizadas e novas são criadas;
+    linhas inválidas são puladas e listadas no relatório.
+    '?dry_run=1' só valida, sem gravar.
+    """
+    permission_classes = [HasModelPermission]
+    model_permissions = {'write': ('manage_tools',)}
+
+    def _import(self, request, import_name):
+        upload = request.FILES.get('file')
+        if upload is None:
+            raise serializers.ValidationError({"file": "Envie o arquivo CSV no campo 'file'."})
+        dry_run = request.query_params.get('dry_run') in ('1', 'true')
+        # Lido como texto em streaming, sem carregar o arquivo inteiro
+        lines = io.TextIOWrapper(upload.file, encoding='utf-8-sig', newline='')
+        try:
+            result = IMPORTS[import_name](lines, dry_run=dry_run)
+        except UnicodeDecodeError:
+            raise serializers.ValidationError({"file": "O arquivo deve estar em UTF-8."})
+        except ImportFileError as exc:
+            raise serializers.ValidationError({"file": str(exc)})
+        return Response({**result.as_dict(), 'dry_run': dry_run})
+
+    @action(detail=False, methods=['post'], url_path='tools')
+    def import_tools(self, request):
+        return self._import(request, 'tools')
+
+    @action(detail=False, methods=['post'], url_path='employees')
+    def import_employees(self, request):
+        return self._import(request, 'employees')
+
 @method_decorator(csrf_exempt, name='dispatch')
-class AnalyticsViewSet(viewsets.ViewSet):
+class AnalyticsViewSet(AsyncListMixin, viewsets.ViewSet):
     """
     Endpoint da API para fornecer dados para os gráficos de análise.
     """
-    permission_classes = [IsAuthenticated]
+    permission_classes = [HasModelPermission]
+    model_permissions = {'read': ('analytics',)}
+
+    def _month_param(self, request, param):
+        """ Lê '?from=' / '?to=' como AAAA-MM (ou AAAA-MM-DD) e devolve o primeiro dia do mês. """
+        value = request.query_params.get(param)
+        if not value:
+            return None
+        try:
+            day = parse_date(value if len(value) > 7 else f"{value}-01")
+        except ValueError:
+            day = None
+        if day is None:
+            raise serializers.ValidationError({param: "Mês inválido, use o formato AAAA-MM."})
+        return day.replace(day=1)
+
+    def _months(self, request):
+        return {'month_from': self._month_param(request, 'from'), 'month_to': self._month_param(request, 'to')}
+
+    def list(self, request):
+        return Response(analytics_data(**self._months(request)))
+
+    async def alist(self, request):
+        return Response(await aanalytics_data(**self._months(request)))
+
+    @action(detail=False, methods=['get'], url_path='maintenance-costs')
+    def maintenance_costs(self, request):
+        """ Custo de manutenção por ferramenta no período '?from=' / '?to=' (AAAA-MM-DD). """
+        date_from = request.query_params.get('from')
+        date_to = request.query_params.get('to')
+        return Response(maintenance_cost_report(
+            date_from=parse_date_param(date_from, 'from') if date_from else None,
+            date_to=parse_date_param(date_to, 'to') if date_to else None,
+        ))
+
+
+class ProfileViewSet(viewsets.ViewSet):
+    """
+    Perfis gravados pelo ProfilingMiddleware (apenas administradores).
+    """
+    permission_classes = [IsAdminUser]
+    lookup_value_regex = '[0-9A-Za-z_-]+'
+
+    def _file(self, pk, suffix):
+        path = profiling.profile_file(pk, suffix)
+        if path is None:
+            raise NotFound("Perfil não encontrado.")
+        return path
 
     def list(self, request):
-        # 1. Ferramentas por Condição (Gráfico de Pizza)
-        tools_by_condition = Tool.objects.values('condition').annotate(count=Count('id')).order_by('condition')
-        
-        # 2. Valor Total do Inventário por Ferramenta (Gráfico de Barras)
-        inventory_value = Tool.objects.annotate(
-            total_value=F('total_quantity') * F('unit_value')
-        ).values('name', 'total_value').order_by('-total_value')[:10]
-
-        # 3. Custos de Manutenção por Mês (Gráfico de Linha)
-        maintenance_costs = Tool.objects.filter(last_maintenance_date__isnull=False).annotate(
-            month=TruncMonth('last_maintenance_date')
-        ).values('month').annotate(
-            total_cost=Sum('maintenance_cost')
-        ).order_by('month')
-
-        # 4. Empréstimos por Mês (Gráfico de Barras)
-        loan_activity = Loan.objects.annotate(
-            month=TruncMonth('borrowed_date')
-        ).values('month').annotate(
-            count=Count('id')
-        ).order_by('month')
-
-        # ✅ 5. CÁLCULO PARA O NOVO GRÁFICO: Quantidade de Manutenções por Mês
-        maintenances_per_month = Tool.objects.filter(
-            condition='maintenance', 
-            last_maintenance_date__isnull=False
-        ).annotate(
-            month=TruncMonth('last_maintenance_date')
-        ).values('month').annotate(
-            count=Count('id')
-        ).order_by('month')
-
-        # Monta a resposta da API
-        data = {
-            'tools_by_condition': list(tools_by_condition),
-            'inventory_value_by_tool': list(inventory_value),
-            'maintenance_cost_over_time': [
-                {'month': entry['month'].strftime('%Y-%m'), 'total_cost': entry['total_cost']} for entry in maintenance_costs
-            ],
-            'loan_activity': [
-                {'month': entry['month'].strftime('%Y-%m'), 'count': entry['count']} for entry in loan_activity
-            ],
-            # ✅ ADICIONA OS DADOS DO NOVO GRÁFICO À RESPOSTA
-            'maintenances_per_month': [
-                {'month': entry['month'].strftime('%Y-%m'), 'count': entry['count']} for entry in maintenances_per_month
-            ],
-        }
-        return Response(data)
\ No newline at end of file
+        return Response(profiling.list_profiles())
+
+    def retrieve(self, request, pk=None):
+        return FileResponse(self._file(pk, '.json').open('rb'), content_type='application/json')
+
+    @action(detail=True, methods=['get'])
+    def download(self, request, pk=None):
+        """ Arquivo pstats (.prof). """
+        return FileResponse(self._file(pk, '.prof').open('rb'), as_attachment=True, filename=f'{pk}.prof')
+
+    @action(detail=True, methods=['get'])
+    def collapsed(self, request, pk=None):
+        """ Pilhas colapsadas, para flamegraph.pl / speedscope. """
+        return FileResponse(self._file(pk, '.collapsed').open('rb'), as_attachment=True,
+                            filename=f'{pk}.collapsed', content_type='text/plain; charset=utf-8')
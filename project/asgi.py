@@ -5,6 +5,9 @@ It exposes the ASGI callable as a module-level variable named ``application``.
 
 For more information on this file, see
 https://docs.djangoproject.com/en/5.2/howto/deployment/asgi/
+
+Com ASYNC_VIEWS['MODE'] = 'async' o Dashboard e a Análise rodam como views
+async neste app (ver inventory.async_views).
 """
 
 import os
@@ -10,6 +10,7 @@ For the full list of settings and their values, see
 https://docs.djangoproject.com/en/5.2/ref/settings/
 """
 
+import os
 from pathlib import Path
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
@@ -46,12 +47,15 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'inventory.metrics.MetricsMiddleware',
+    'inventory.slow_queries.SlowQueryMiddleware',
     'corsheaders.middleware.CorsMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
+    'inventory.profiling.ProfilingMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
@@ -62,8 +66,15 @@ TEMPLATES = [
     {
         'BACKEND': 'django.template.backends.django.DjangoTemplates',
         'DIRS': [BASE_DIR / 'templates'],
-        'APP_DIRS': True,
         'OPTIONS': {
+            # Templates compilados uma vez e mantidos em memória (com DEBUG
+            # o Django recarrega os alterados)
+            'loaders': [
+                ('django.template.loaders.cached.Loader', [
+                    'django.template.loaders.filesystem.Loader',
+                    'django.template.loaders.app_directories.Loader',
+                ]),
+            ],
             'context_processors': [
                 'django.template.context_processors.request',
                 'django.contrib.auth.context_processors.auth',
@@ -79,10 +90,71 @@ WSGI_APPLICATION = 'project.wsgi.application'
 # Database
 # https://docs.djangoproject.com/en/5.2/ref/settings/#databases
 
-DATABASES = {
+# Perfil escolhido por DB_PROFILE:
+#   sqlite (padrão)  SQLite em WAL com os PRAGMAs de SQLITE_PRAGMAS e conexões persistentes
+#                    (arquivo em SQLITE_PATH, padrão db.sqlite3)
+#   sqlite-legacy    SQLite sem ajustes (journal em rollback), para comparação em benchmark
+#   postgres         PostgreSQL com pool de conexões (requer 'psycopg[binary,pool]'),
+#                    configurado por POSTGRES_DB/USER/PASSWORD/HOST/PORT
+DB_PROFILE = os.environ.get('DB_PROFILE', 'sqlite')
+
+if DB_PROFILE == 'postgres':
+    DATABASES = {
+        'default': {
+            'ENGINE': 'django.db.backends.postgresql',
+            'NAME': os.environ.get('POSTGRES_DB', 'ferramentas'),
+            'USER': os.environ.get('POSTGRES_USER', 'ferramentas'),
+            'PASSWORD': os.environ.get('POSTGRES_PASSWORD', ''),
+            'HOST': os.environ.get('POSTGRES_HOST', 'localhost'),
+            'PORT': os.environ.get('POSTGRES_PORT', '5432'),
+            # Com pool, as conexões são reaproveitadas pelo psycopg (CONN_MAX_AGE deve ser 0)
+            'OPTIONS': {
+                'pool': {
+                    'min_size': int(os.environ.get('POSTGRES_POOL_MIN', 2)),
+                    'max_size': int(os.environ.get('POSTGRES_POOL_MAX', 10)),
+                    'timeout': 10,
+                },
+            },
+        }
+    }
+else:
+    DATABASES = {
+        'default': {
+            'ENGINE': 'django.db.backends.sqlite3',
+            'NAME': os.environ.get('SQLITE_PATH', BASE_DIR / 'db.sqlite3'),
+        }
+    }
+    if DB_PROFILE == 'sqlite':
+        DATABASES['default'].update({
+            'CONN_MAX_AGE': 600,
+            'CONN_HEALTH_CHECKS': True,
+            # BEGIN IMMEDIATE: escritores esperam o busy_timeout em vez de
+            # falhar ao promover uma leitura para escrita
+            'OPTIONS': {'transaction_mode': 'IMMEDIATE'},
+        })
+
+# Aplicados a cada nova conexão SQLite (inventory.db.apply_sqlite_pragmas).
+# WAL deixa leitores e um escritor trabalharem ao mesmo tempo.
+SQLITE_PRAGMAS = {
+    'journal_mode': 'WAL',
+    'synchronous': 'NORMAL',
+    'busy_timeout': 5000,          # ms
+    'mmap_size': 128 * 1024 * 1024,
+    'cache_size': -32000,          # negativo = KiB (32 MB)
+    'temp_store': 'MEMORY',
+} if DB_PROFILE == 'sqlite' else {
+    # WAL fica gravado no arquivo; o perfil legado volta ao journal padrão
+    'journal_mode': 'DELETE',
+}
+
+
+# Cache (Dashboard e outros agregados). LocMemCache é por processo: com
+# vários workers use um backend compartilhado (ex.: Redis ou banco) para que
+# a invalidação por sinais chegue a todos.
+CACHES = {
     'default': {
-        'ENGINE': 'django.db.backends.sqlite3',
-        'NAME': BASE_DIR / 'db.sqlite3',
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'inventory',
     }
 }
 
@@ -143,8 +215,11 @@ MEDIA_ROOT = BASE_DIR / 'media'
 
 REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': (
-        'rest_framework_simplejwt.authentication.JWTAuthentication',
+        'users.authentication.CachedJWTAuthentication',
     ),
+    # Paginação por cursor (keyset); '?paginate=false' desliga para chamadores internos
+    'DEFAULT_PAGINATION_CLASS': 'inventory.pagination.KeysetPagination',
+    'PAGE_SIZE': 50,
 }
 
 from datetime import timedelta
@@ -185,6 +260,75 @@ SIMPLE_JWT = {
 
 AUTH_USER_MODEL = 'users.User'
 
+# Usuário e permissões resolvidos a partir do JWT ficam em memória por TTL
+# segundos (users.authentication); mudanças feitas neste processo valem na hora.
+AUTH_CACHE = {
+    'TTL': 60,
+}
+
+
+
+# Fila de tarefas em segundo plano (inventory.jobs), executada com
+# 'python manage.py run_jobs'. Resultados ficam em MEDIA_ROOT/jobs/.
+JOBS = {
+    'MAX_CONCURRENCY': 2,
+    'MAX_ATTEMPTS': 3,
+    'RETRY_DELAY': 30,
+    'RESULT_TTL': 24 * 60 * 60,
+    'POLL_INTERVAL': 2,
+}
+
+# Versões redimensionadas das fotos de ferramentas (inventory.images), geradas
+# pelo worker de JOBS a cada upload; 'python manage.py build_tool_images'
+# processa as fotos já existentes.
+IMAGES = {
+    'RENDITIONS': {'thumb': 160, 'card': 480, 'full': 1600},
+    'WEBP_QUALITY': 80,
+    'JPEG_QUALITY': 82,
+    'MAX_PIXELS': 50_000_000,  # fotos maiores são recusadas antes de decodificar
+}
+
+# Dashboard e Análise: 'sync' (views do DRF) ou 'async' (inventory.async_views,
+# consultas em paralelo; sirva com project.asgi, ex.: 'uvicorn project.asgi:application').
+ASYNC_VIEWS = {
+    'MODE': os.environ.get('ASYNC_VIEWS_MODE', 'sync'),
+    'CONCURRENT_QUERIES': True,
+}
+
+# Feed de mudanças em /api/events/ (inventory.events), servido pelo ASGI.
+# O broker é por processo: use um único worker para o feed.
+EVENTS = {
+    'HEARTBEAT': 15,
+    'BUFFER_SIZE': 1000,
+}
+
+# Listas de ferramentas e empréstimos por values_list() e orjson (inventory.fast_reads),
+# com a mesma saída do serializer; False volta ao caminho do serializer.
+FAST_READS = {
+    'ENABLED': True,
+}
+
+# Métricas por rota em /api/_metrics (inventory.metrics). Com TOKEN definido,
+# o Prometheus envia "Authorization: Bearer <TOKEN>"; sem ele, só administradores.
+METRICS = {
+    'TOKEN': None,
+}
+
+# Profiler sob demanda (inventory.profiling): administradores enviam
+# 'X-Profile: 1'; SAMPLE_RATE perfila também uma fração das requisições.
+PROFILING = {
+    'SAMPLE_RATE': 0.0,
+    'MAX_PROFILES': 50,
+    'DIR': BASE_DIR / 'profiles',
+}
+
+# Consultas acima do limite são gravadas em SlowQuery com origem e plano
+# (inventory.slow_queries; 'python manage.py slow_queries' ou o admin).
+SLOW_QUERIES = {
+    'THRESHOLD_MS': 200,
+    'EXPLAIN': True,
+}
+
 
 
 STATICFILES_DIRS = [
@@ -196,6 +340,26 @@ STATICFILES_DIRS = [
 
 STATIC_ROOT = BASE_DIR / 'staticfiles'
 
+# 'python manage.py build_assets' (inventory.assets): nomes com hash do
+# conteúdo, um CSS por página e versões .gz/.br. Com DEBUG=False os
+# arquivos são servidos por inventory.assets.serve com cache 'immutable'.
+STORAGES = {
+    'default': {'BACKEND': 'django.core.files.storage.FileSystemStorage'},
+    'staticfiles': {'BACKEND': 'inventory.assets.AssetStorage'},
+}
+
+# Página -> CSS juntados num único arquivo ({% css_bundle 'página' %})
+STATIC_BUNDLES = {
+    'active_overdue_loans': ['css/style.css', 'css/active_overdue_loans.css'],
+    'analytics': ['css/style.css', 'css/analytics.css'],
+    'dashboard': ['css/style.css', 'css/dashboard.css'],
+    'history': ['css/style.css', 'css/history.css'],
+    'manage_tools': ['css/style.css', 'css/manage_tools.css'],
+    'register_loan': ['css/style.css', 'css/register_loan.css'],
+    'settings': ['css/style.css', 'css/settings.css'],
+    'virtual_warehouse': ['css/style.css', 'css/virtual_warehouse.css'],
+}
+
 
 
 CORS_ALLOW_HEADERS = [
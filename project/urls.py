@@ -1,6 +1,5 @@
 from django.contrib import admin
 from django.urls import path, include, re_path
-from django.views.generic import TemplateView
 from rest_framework_simplejwt.views import (
     TokenObtainPairView,
     TokenRefreshView,
@@ -8,27 +7,40 @@ from rest_framework_simplejwt.views import (
 from django.conf import settings
 from django.conf.urls.static import static
 
+from inventory import images
+from inventory.assets import PageView, serve as serve_asset
+
 urlpatterns = [
-    re_path(r'^$', TemplateView.as_view(template_name='login.html')),
-    re_path(r'^login/$', TemplateView.as_view(template_name='login.html')),
-    re_path(r'^register/$', TemplateView.as_view(template_name='register.html')),
-    re_path(r'^dashboard/$', TemplateView.as_view(template_name='dashboard.html')),
-    re_path(r'^manage-tools/$', TemplateView.as_view(template_name='manage_tools.html')),
-    re_path(r'^virtual-warehouse/$', TemplateView.as_view(template_name='virtual_warehouse.html')),
-    re_path(r'^register-loan/$', TemplateView.as_view(template_name='register_loan.html')),
-    re_path(r'^active-overdue-loans/$', TemplateView.as_view(template_name='active_overdue_loans.html')),
-    re_path(r'^history/$', TemplateView.as_view(template_name='history.html')),
-    re_path(r'^settings/$', TemplateView.as_view(template_name='settings.html')),
-    re_path(r'^manage-employees/$', TemplateView.as_view(template_name='manage_employees.html')),
+    re_path(r'^$', PageView.as_view(template_name='login.html')),
+    re_path(r'^login/$', PageView.as_view(template_name='login.html')),
+    re_path(r'^register/$', PageView.as_view(template_name='register.html')),
+    re_path(r'^dashboard/$', PageView.as_view(template_name='dashboard.html')),
+    re_path(r'^manage-tools/$', PageView.as_view(template_name='manage_tools.html')),
+    re_path(r'^virtual-warehouse/$', PageView.as_view(template_name='virtual_warehouse.html')),
+    re_path(r'^register-loan/$', PageView.as_view(template_name='register_loan.html')),
+    re_path(r'^active-overdue-loans/$', PageView.as_view(template_name='active_overdue_loans.html')),
+    re_path(r'^history/$', PageView.as_view(template_name='history.html')),
+    re_path(r'^settings/$', PageView.as_view(template_name='settings.html')),
+    re_path(r'^manage-employees/$', PageView.as_view(template_name='manage_employees.html')),
     path("api/", include("inventory.urls")),
     path("api/", include("users.urls")),
     path("admin/", admin.site.urls),
     path("api/token/", TokenObtainPairView.as_view(), name="token_obtain_pair"),
     path("api/token/refresh/", TokenRefreshView.as_view(), name="token_refresh"),
-    path('analytics/', TemplateView.as_view(template_name='analytics.html'), name='analytics'),
+    path('analytics/', PageView.as_view(template_name='analytics.html'), name='analytics'),
 ]
 
+if not settings.DEBUG:
+    # Arquivos do build_assets (com DEBUG o runserver serve os originais)
+    urlpatterns += [re_path(r'^%s(?P<path>.*)$' % settings.STATIC_URL.lstrip('/'), serve_asset)]
+
 if settings.DEBUG:
+    # Versões das fotos têm nome por hash de conteúdo: cache 'immutable' (inventory.images)
+    urlpatterns += static(
+        settings.MEDIA_URL + images.get_setting('DIR') + '/',
+        view=images.serve_immutable,
+        document_root=settings.MEDIA_ROOT / images.get_setting('DIR'),
+    )
     urlpatterns += static(settings.MEDIA_URL, document_root=settings.MEDIA_ROOT)
 
 
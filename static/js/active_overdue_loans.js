@@ -1,6 +1,6 @@
 // static/js/active_overdue_loans.js
 
-import { refreshToken } from "./main.js";
+import { refreshToken, subscribeToChanges } from "./main.js";
 
 document.addEventListener("DOMContentLoaded", async () => {
     // Checagem inicial de autenticação
@@ -17,13 +17,27 @@ document.addEventListener("DOMContentLoaded", async () => {
     const overdueLoansCountTab = document.getElementById("overdue-loans-count-tab");
     const loanSearch = document.getElementById("loanSearch");
     const tabButtons = document.querySelectorAll(".tab-button");
+    const loadMoreButton = document.getElementById("loadMoreLoans");
+    const returnSelectedButton = document.getElementById("returnSelected");
+    const selectedCount = document.getElementById("selectedCount");
 
     // Armazenamento local dos dados
     let allActiveLoans = [];
     let allOverdueLoans = [];
+    let nextActiveUrl = null;  // Cursores da próxima página de cada aba
+    let nextOverdueUrl = null;
     let currentTab = "active";
+    const selectedLoans = new Set(); // ids marcados para devolução em lote
 
-    // Busca os dados da API
+    // Mostra "N+" quando ainda há páginas não carregadas
+    function updateCounts() {
+        activeLoansCountTab.textContent = allActiveLoans.length + (nextActiveUrl ? "+" : "");
+        overdueLoansCountTab.textContent = allOverdueLoans.length + (nextOverdueUrl ? "+" : "");
+        const nextUrl = currentTab === "active" ? nextActiveUrl : nextOverdueUrl;
+        loadMoreButton.style.display = nextUrl ? "" : "none";
+    }
+
+    // Busca os dados da API (primeira página de cada lista)
     async function fetchLoans() {
         try {
             const headers = { Authorization: `Bearer ${localStorage.getItem("access_token")}` };
@@ -33,10 +47,13 @@ document.addEventListener("DOMContentLoaded", async () => {
             ]);
 
             if (activeResponse.ok && overdueResponse.ok) {
-                allActiveLoans = await activeResponse.json();
-                allOverdueLoans = await overdueResponse.json();
-                activeLoansCountTab.textContent = allActiveLoans.length;
-                overdueLoansCountTab.textContent = allOverdueLoans.length;
+                const activePage = await activeResponse.json();
+                const overduePage = await overdueResponse.json();
+                allActiveLoans = activePage.results;
+                allOverdueLoans = overduePage.results;
+                nextActiveUrl = activePage.next;
+                nextOverdueUrl = overduePage.next;
+                updateCounts();
                 renderLoans(); // Renderiza a lista inicial
             } else if (activeResponse.status === 401 || overdueResponse.status === 401) {
                 const refreshed = await refreshToken();
@@ -50,6 +67,86 @@ document.addEventListener("DOMContentLoaded", async () => {
         }
     }
 
+    // Carrega a próxima página da aba atual e a acrescenta à lista
+    async function fetchMoreLoans() {
+        const nextUrl = currentTab === "active" ? nextActiveUrl : nextOverdueUrl;
+        if (!nextUrl) return;
+        loadMoreButton.disabled = true;
+        try {
+            const response = await fetch(nextUrl, {
+                headers: { Authorization: `Bearer ${localStorage.getItem("access_token")}` }
+            });
+            if (response.ok) {
+                const page = await response.json();
+                if (currentTab === "active") {
+                    allActiveLoans = allActiveLoans.concat(page.results);
+                    nextActiveUrl = page.next;
+                } else {
+                    allOverdueLoans = allOverdueLoans.concat(page.results);
+                    nextOverdueUrl = page.next;
+                }
+                updateCounts();
+                renderLoans(filterLoans(loanSearch.value.toLowerCase()));
+            } else if (response.status === 401) {
+                const refreshed = await refreshToken();
+                if (refreshed) fetchMoreLoans();
+                else window.location.href = "/login";
+            }
+        } catch (error) {
+            console.error("Erro ao buscar mais empréstimos:", error);
+        } finally {
+            loadMoreButton.disabled = false;
+        }
+    }
+
+    // --- Atualização incremental (feed /api/events/ e devoluções feitas aqui) ---
+
+    function isOverdue(loan) {
+        return new Date(loan.due_date) < new Date() && !loan.returned_date;
+    }
+
+    function removeLoans(ids) {
+        const removed = new Set(ids);
+        allActiveLoans = allActiveLoans.filter(loan => !removed.has(loan.id));
+        allOverdueLoans = allOverdueLoans.filter(loan => !removed.has(loan.id));
+        ids.forEach(id => selectedLoans.delete(id));
+    }
+
+    // Novos vão para o topo (as listas vêm do mais recente para o mais antigo);
+    // editados mantêm a posição e só são trocados se já estiverem carregados
+    function upsertLoan(loan, isNew) {
+        const activeIndex = allActiveLoans.findIndex(item => item.id === loan.id);
+        const overdueIndex = allOverdueLoans.findIndex(item => item.id === loan.id);
+        if (!isNew && activeIndex < 0 && overdueIndex < 0) return;
+        if (loan.returned_date) return removeLoans([loan.id]);
+        allActiveLoans = allActiveLoans.filter(item => item.id !== loan.id);
+        allOverdueLoans = allOverdueLoans.filter(item => item.id !== loan.id);
+        allActiveLoans.splice(Math.max(activeIndex, 0), 0, loan);
+        if (isOverdue(loan)) allOverdueLoans.splice(Math.max(overdueIndex, 0), 0, loan);
+    }
+
+    function refreshView() {
+        updateCounts();
+        updateSelection();
+        renderLoans(filterLoans(loanSearch.value.toLowerCase()));
+    }
+
+    function applyChange(type, data) {
+        if (type === "loan.created" || type === "loan.updated") upsertLoan(data, type === "loan.created");
+        else if (type === "loan.returned" || type === "loan.deleted") removeLoans([data.id]);
+        else if (type === "reset") return fetchLoans();
+        else return;
+        refreshView();
+    }
+
+    function filterLoans(searchTerm) {
+        const sourceList = currentTab === "active" ? allActiveLoans : allOverdueLoans;
+        return sourceList.filter(loan =>
+            loan.tool_name.toLowerCase().includes(searchTerm) ||
+            (loan.employee_name || '').toLowerCase().includes(searchTerm)
+        );
+    }
+
     // Renderiza os cards de empréstimo na tela
     function renderLoans(loans = null) {
         activeLoansList.innerHTML = "";
@@ -68,10 +165,10 @@ document.addEventListener("DOMContentLoaded", async () => {
         }
 
         loansToRender.forEach(loan => {
-            const isOverdue = new Date(loan.due_date) < new Date() && !loan.returned_date;
-            const cardClass = isOverdue ? "overdue" : "";
-            const statusBadge = isOverdue ? "status-overdue" : "status-active";
-            const statusText = isOverdue ? "Atrasado" : "Ativo";
+            const overdue = isOverdue(loan);
+            const cardClass = overdue ? "overdue" : "";
+            const statusBadge = overdue ? "status-overdue" : "status-active";
+            const statusText = overdue ? "Atrasado" : "Ativo";
 
             const loanCard = `
                 <div class="card loan-card ${cardClass}">
@@ -80,12 +177,13 @@ document.addEventListener("DOMContentLoaded", async () => {
                         <span class="status-badge ${statusBadge}">${statusText}</span>
                     </div>
                     <div class="card-content">
-                        <p><i class="fas fa-user"></i> <b>Destinatário:</b> ${loan.borrower_username}</p>
+                        <p><i class="fas fa-user"></i> <b>Destinatário:</b> ${loan.employee_name || '-'}</p>
                         <p><i class="fas fa-box"></i> <b>Quantidade:</b> ${loan.quantity}</p>
                         <p><i class="fas fa-calendar-alt"></i> <b>Data do Empréstimo:</b> ${loan.borrowed_date}</p>
                         <p><i class="fas fa-calendar-check"></i> <b>Devolução Prevista:</b> ${loan.due_date}</p>
                     </div>
                     <div class="card-actions">
+                        <label class="select-loan"><input type="checkbox" class="loan-select" value="${loan.id}" ${selectedLoans.has(loan.id) ? "checked" : ""}> Selecionar</label>
                         <button class="return-tool-btn" data-id="${loan.id}"><i class="fas fa-undo-alt"></i> Marcar como Devolvido</button>
                     </div>
                 </div>
@@ -97,6 +195,52 @@ document.addEventListener("DOMContentLoaded", async () => {
         document.querySelectorAll(".return-tool-btn").forEach(button => {
             button.addEventListener("click", (e) => returnTool(e.target.closest('button').dataset.id));
         });
+        document.querySelectorAll(".loan-select").forEach(checkbox => {
+            checkbox.addEventListener("change", (e) => {
+                const id = parseInt(e.target.value);
+                if (e.target.checked) selectedLoans.add(id);
+                else selectedLoans.delete(id);
+                updateSelection();
+            });
+        });
+    }
+
+    function updateSelection() {
+        selectedCount.textContent = selectedLoans.size;
+        returnSelectedButton.style.display = selectedLoans.size ? "" : "none";
+    }
+
+    // Devolve os empréstimos selecionados numa única requisição (/api/loans/bulk-return/)
+    async function returnSelected() {
+        if (!confirm(`Marcar ${selectedLoans.size} empréstimo(s) como devolvido(s)?`)) return;
+        returnSelectedButton.disabled = true;
+        try {
+            const response = await fetch("/api/loans/bulk-return/", {
+                method: "POST",
+                headers: {
+                    "Content-Type": "application/json",
+                    Authorization: `Bearer ${localStorage.getItem("access_token")}`,
+                },
+                body: JSON.stringify({ ids: [...selectedLoans], mode: "partial" }),
+            });
+            if (response.status === 401) {
+                if (await refreshToken()) return returnSelected();
+                window.location.href = "/login";
+                return;
+            }
+            const result = await response.json();
+            if (result.errors && result.errors.length) {
+                alert("Alguns empréstimos não foram devolvidos:\n" + result.errors.map(e => `#${e.id}: ${e.detail}`).join("\n"));
+            }
+            selectedLoans.clear();
+            removeLoans(result.returned || []);
+            refreshView();
+        } catch (error) {
+            console.error("Erro na devolução em lote:", error);
+            alert("Ocorreu um erro de comunicação ao tentar devolver as ferramentas.");
+        } finally {
+            returnSelectedButton.disabled = false;
+        }
     }
 
     // Função para devolver uma ferramenta
@@ -113,7 +257,8 @@ document.addEventListener("DOMContentLoaded", async () => {
             });
 
             if (response.ok) {
-                await fetchLoans(); // Atualiza a lista de empréstimos
+                removeLoans([parseInt(loanId)]); // Só tira o card; não baixa as listas de novo
+                refreshView();
             } else if (response.status === 401) {
                 const refreshed = await refreshToken();
                 if (refreshed) returnTool(loanId); // Tenta de novo após renovar o token
@@ -140,23 +285,21 @@ document.addEventListener("DOMContentLoaded", async () => {
             document.getElementById('active-loans-list').classList.toggle('active', currentTab === 'active');
             document.getElementById('overdue-loans-list').classList.toggle('active', currentTab === 'overdue');
             
+            updateCounts();
             renderLoans(); // Re-renderiza a lista para a aba selecionada
         });
     });
 
+    loadMoreButton.addEventListener("click", fetchMoreLoans);
+    returnSelectedButton.addEventListener("click", returnSelected);
+
     // Lógica da barra de busca
     loanSearch.addEventListener("input", (e) => {
         const searchTerm = e.target.value.toLowerCase();
-        const sourceList = currentTab === "active" ? allActiveLoans : allOverdueLoans;
-        
-        const filteredLoans = sourceList.filter(loan => 
-            loan.tool_name.toLowerCase().includes(searchTerm) || 
-            loan.borrower_username.toLowerCase().includes(searchTerm)
-        );
-        
-        renderLoans(filteredLoans);
+        renderLoans(filterLoans(searchTerm));
     });
 
-    // Carga inicial dos dados
-    fetchLoans();
+    // Carga inicial dos dados; depois só as mudanças chegam pelo feed
+    await fetchLoans();
+    subscribeToChanges(["loan"], applyChange);
 });
\ No newline at end of file
@@ -7,7 +7,9 @@ document.addEventListener("DOMContentLoaded", () => {
     // --- Seleção de Elementos ---
     const loanHistoryList = document.getElementById("loan-history-list");
     const historySearch = document.getElementById("historySearch");
+    const loadMoreButton = document.getElementById("loadMoreHistory");
     let allLoanHistory = [];
+    let nextPageUrl = null; // Cursor da próxima página (paginação keyset da API)
 
     // --- Funções Auxiliares ---
 
@@ -48,7 +50,7 @@ document.addEventListener("DOMContentLoaded", () => {
                         <span class="status-badge status-returned">Devolvido</span>
                     </div>
                     <div class="card-content">
-                        <p><i class="fas fa-user"></i> <b>Destinatário:</b> ${loan.borrower_username}</p>
+                        <p><i class="fas fa-user"></i> <b>Destinatário:</b> ${loan.employee_name || '-'}</p>
                         <p><i class="fas fa-box"></i> <b>Quantidade:</b> ${loan.quantity}</p>
                         <p><i class="fas fa-calendar-alt"></i> <b>Data do Empréstimo:</b> ${loan.borrowed_date}</p>
                         <p><i class="fas fa-calendar-times"></i> <b>Devolução Prevista:</b> ${loan.due_date}</p>
@@ -62,27 +64,52 @@ document.addEventListener("DOMContentLoaded", () => {
 
     // --- Funções de API e Lógica Principal ---
 
+    // Busca uma página do histórico e a acrescenta à lista já carregada
+    async function fetchHistoryPage(url) {
+        loadMoreButton.disabled = true;
+        const response = await fetchWithAuth(url);
+        if (response && response.ok) {
+            const page = await response.json();
+            allLoanHistory = allLoanHistory.concat(page.results);
+            nextPageUrl = page.next;
+            loadMoreButton.style.display = nextPageUrl ? "" : "none";
+            loadMoreButton.disabled = false;
+            return true;
+        }
+        console.error("Falha ao buscar histórico de empréstimos.");
+        loadMoreButton.disabled = false;
+        return false;
+    }
+
     async function fetchAndDisplayHistory() {
         loanHistoryList.innerHTML = '<p class="no-results">Carregando histórico...</p>';
-        const response = await fetchWithAuth("/api/loans/loan_history/");
-        if (response && response.ok) {
-            allLoanHistory = await response.json();
+        allLoanHistory = [];
+        if (await fetchHistoryPage("/api/loans/loan_history/")) {
             renderLoanHistory(allLoanHistory);
         } else {
-            console.error("Falha ao buscar histórico de empréstimos.");
             loanHistoryList.innerHTML = '<p class="no-results" style="color: #dc3545;">Erro ao carregar o histórico.</p>';
         }
     }
 
+    function filterLoans(loans, searchTerm) {
+        return loans.filter(loan =>
+            loan.tool_name.toLowerCase().includes(searchTerm) ||
+            (loan.employee_name || '').toLowerCase().includes(searchTerm)
+        );
+    }
+
     // --- Adicionando Event Listeners ---
 
     historySearch.addEventListener("input", (e) => {
         const searchTerm = e.target.value.toLowerCase();
-        const filteredLoans = allLoanHistory.filter(loan => 
-            loan.tool_name.toLowerCase().includes(searchTerm) || 
-            loan.borrower_username.toLowerCase().includes(searchTerm)
-        );
-        renderLoanHistory(filteredLoans);
+        renderLoanHistory(filterLoans(allLoanHistory, searchTerm));
+    });
+
+    loadMoreButton.addEventListener("click", async () => {
+        if (!nextPageUrl) return;
+        if (await fetchHistoryPage(nextPageUrl)) {
+            renderLoanHistory(filterLoans(allLoanHistory, historySearch.value.toLowerCase()));
+        }
     });
 
     // Carga inicial
@@ -31,6 +31,139 @@ export async function refreshToken() {
 }
 
 
+// Cache de respostas GET por ETag (sessionStorage, sobrevive à troca de página).
+// Envia If-None-Match; em 304 devolve o corpo guardado como se fosse um 200.
+const ETAG_CACHE_PREFIX = "etag-cache:";
+const ETAG_CACHE_MAX_ENTRIES = 20;
+const ETAG_CACHE_MAX_BYTES = 2 * 1024 * 1024;
+
+function readCachedEntry(url) {
+    try {
+        return JSON.parse(sessionStorage.getItem(ETAG_CACHE_PREFIX + url));
+    } catch (error) {
+        return null;
+    }
+}
+
+function storeCachedEntry(url, etag, body) {
+    if (body.length > ETAG_CACHE_MAX_BYTES) return;
+    const keys = Object.keys(sessionStorage).filter((key) => key.startsWith(ETAG_CACHE_PREFIX));
+    if (keys.length >= ETAG_CACHE_MAX_ENTRIES) {
+        // Remove a entrada usada há mais tempo
+        const oldest = keys
+            .map((key) => ({ key, usedAt: (readCachedEntry(key.slice(ETAG_CACHE_PREFIX.length)) || {}).usedAt || 0 }))
+            .sort((a, b) => a.usedAt - b.usedAt)[0];
+        sessionStorage.removeItem(oldest.key);
+    }
+    try {
+        sessionStorage.setItem(ETAG_CACHE_PREFIX + url, JSON.stringify({ etag, body, usedAt: Date.now() }));
+    } catch (error) {
+        // Sem espaço: segue sem cache
+    }
+}
+
+export async function cachedFetch(url, options = {}) {
+    const method = (options.method || "GET").toUpperCase();
+    if (method !== "GET") {
+        return fetch(url, options);
+    }
+    const cached = readCachedEntry(url);
+    const headers = { ...options.headers };
+    if (cached) headers["If-None-Match"] = cached.etag;
+
+    const response = await fetch(url, { ...options, headers });
+    if (response.status === 304 && cached) {
+        storeCachedEntry(url, cached.etag, cached.body);
+        return new Response(cached.body, {
+            status: 200,
+            headers: { "Content-Type": "application/json", "ETag": cached.etag },
+        });
+    }
+    const etag = response.headers.get("ETag");
+    if (response.ok && etag) {
+        const body = await response.text();
+        storeCachedEntry(url, etag, body);
+        return new Response(body, { status: response.status, headers: response.headers });
+    }
+    return response;
+}
+
+export function clearFetchCache() {
+    Object.keys(sessionStorage)
+        .filter((key) => key.startsWith(ETAG_CACHE_PREFIX))
+        .forEach((key) => sessionStorage.removeItem(key));
+}
+
+
+// Feed de mudanças (/api/events/, Server-Sent Events). Usa fetch em vez de
+// EventSource para enviar o token; ao cair, reconecta com Last-Event-ID e o
+// servidor reenvia o que foi perdido (ou 'reset', para recarregar tudo).
+// onEvent(tipo, dados). Devolve uma função que encerra a inscrição.
+export function subscribeToChanges(types, onEvent, { onUnavailable } = {}) {
+    let lastEventId = null;
+    let retryMs = 3000;
+    let controller = null;
+    let stopped = false;
+
+    function dispatch(block) {
+        let type = null;
+        let data = "";
+        for (const line of block.split("\n")) {
+            if (!line || line.startsWith(":")) continue; // ': ping' mantém a conexão viva
+            const colon = line.indexOf(":");
+            const field = colon < 0 ? line : line.slice(0, colon);
+            const value = colon < 0 ? "" : line.slice(colon + 1).replace(/^ /, "");
+            if (field === "id") lastEventId = value;
+            else if (field === "event") type = value;
+            else if (field === "data") data += (data ? "\n" : "") + value;
+            else if (field === "retry") retryMs = parseInt(value, 10) || retryMs;
+        }
+        if (type) onEvent(type, data ? JSON.parse(data) : {});
+    }
+
+    async function connect() {
+        if (stopped) return;
+        controller = new AbortController();
+        const headers = { Authorization: `Bearer ${localStorage.getItem("access_token")}` };
+        if (lastEventId) headers["Last-Event-ID"] = lastEventId;
+        try {
+            const response = await fetch(`/api/events/?types=${types.join(",")}`, { headers, signal: controller.signal });
+            if (response.status === 401) {
+                if (await refreshToken()) return connect();
+                window.location.href = "/login";
+                return;
+            }
+            if (!response.ok) {
+                // 501: servidor sem ASGI; 403: sem permissão. A página segue sem atualização automática.
+                if (onUnavailable) onUnavailable(response.status);
+                return;
+            }
+            const reader = response.body.pipeThrough(new TextDecoderStream()).getReader();
+            let buffer = "";
+            while (true) {
+                const { value, done } = await reader.read();
+                if (done) break;
+                buffer += value;
+                let end;
+                while ((end = buffer.indexOf("\n\n")) >= 0) {
+                    dispatch(buffer.slice(0, end));
+                    buffer = buffer.slice(end + 2);
+                }
+            }
+        } catch (error) {
+            if (stopped) return;
+        }
+        setTimeout(connect, retryMs);
+    }
+
+    connect();
+    return () => {
+        stopped = true;
+        if (controller) controller.abort();
+    };
+}
+
+
 // --- Lógica Principal que Roda em Todas as Páginas ---
 
 // ✅ CORREÇÃO APLICADA AQUI ✅
@@ -52,6 +185,7 @@ document.addEventListener("DOMContentLoaded", () => {
         logoutButton.addEventListener("click", () => {
             localStorage.removeItem("access_token");
             localStorage.removeItem("refresh_token");
+            clearFetchCache();
             window.location.href = "/login";
         });
     }
@@ -126,4 +260,17 @@ document.addEventListener("DOMContentLoaded", () => {
     if (window.location.pathname !== '/login/' && window.location.pathname !== '/register/') {
         fetchCurrentUser();
     }
-});
\ No newline at end of file
+});
+
+// Foto da ferramenta na versão redimensionada ('thumb', 'card' ou 'full'), WebP com
+// JPEG de reserva. Enquanto o worker não gerou as versões, usa a foto original.
+export function toolPicture(tool, size, fallback, attrs = "") {
+    const rendition = tool[`image_${size}`];
+    if (!rendition) {
+        return `<img src="${tool.image || fallback}" loading="lazy" ${attrs}>`;
+    }
+    return `<picture>
+        <source type="image/webp" srcset="${rendition.webp}">
+        <img src="${rendition.jpeg}" width="${rendition.width}" height="${rendition.height}" loading="lazy" ${attrs}>
+    </picture>`;
+}
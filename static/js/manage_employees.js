@@ -1,4 +1,4 @@
-import { refreshToken } from "./main.js";
+import { refreshToken, cachedFetch } from "./main.js";
 
 document.addEventListener("DOMContentLoaded", () => {
     const listContainer = document.getElementById('employeeListContainer');
@@ -15,11 +15,11 @@ document.addEventListener("DOMContentLoaded", () => {
         if(options.body && !(options.body instanceof FormData)) {
             options.headers['Content-Type'] = 'application/json';
         }
-        let response = await fetch(url, options);
+        let response = await cachedFetch(url, options);
         if (response.status === 401) {
             if (await refreshToken()) {
                 options.headers['Authorization'] = `Bearer ${localStorage.getItem('access_token')}`;
-                return fetch(url, options);
+                return cachedFetch(url, options);
             } else {
                 window.location.href = "/login";
             }
@@ -28,7 +28,7 @@ document.addEventListener("DOMContentLoaded", () => {
     }
 
     async function loadEmployees() {
-        const res = await fetchWithAuth('/api/employees/');
+        const res = await fetchWithAuth('/api/employees/?paginate=false');
         if (res.ok) {
             allEmployees = await res.json();
             renderEmployees(allEmployees);
@@ -1,6 +1,6 @@
 // static/js/manage_tools.js
 
-import { refreshToken } from "./main.js";
+import { refreshToken, cachedFetch, toolPicture } from "./main.js";
 
 document.addEventListener("DOMContentLoaded", () => {
 
@@ -31,13 +31,13 @@ document.addEventListener("DOMContentLoaded", () => {
         }
         options.headers['Authorization'] = `Bearer ${localStorage.getItem('access_token')}`;
 
-        let response = await fetch(url, options);
+        let response = await cachedFetch(url, options);
 
         if (response.status === 401) {
             const refreshed = await refreshToken();
             if (refreshed) {
                 options.headers['Authorization'] = `Bearer ${localStorage.getItem('access_token')}`;
-                response = await fetch(url, options);
+                response = await cachedFetch(url, options);
             } else {
                 window.location.href = "/login";
                 return null;
@@ -128,7 +128,7 @@ document.addEventListener("DOMContentLoaded", () => {
             const card = `
                 <div class="tool-card">
                     <div class="tool-card-header">
-                        <img src="${tool.image || 'https://via.placeholder.com/300x180'}" alt="Imagem da Ferramenta" class="tool-image">
+                        ${toolPicture(tool, 'card', 'https://via.placeholder.com/300x180', 'alt="Imagem da Ferramenta" class="tool-image"')}
                         <span class="status-badge status-${tool.condition}">${tool.condition_display}</span>
                     </div>
                     <div class="tool-card-content">
@@ -149,7 +149,7 @@ document.addEventListener("DOMContentLoaded", () => {
     }
 
     async function fetchTools() {
-        const response = await fetchWithAuth('/api/tools/');
+        const response = await fetchWithAuth('/api/tools/?paginate=false');
         if (response && response.ok) {
             allTools = await response.json();
             renderTools(allTools);
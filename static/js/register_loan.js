@@ -1,4 +1,4 @@
-import { refreshToken } from "./main.js";
+import { refreshToken, cachedFetch } from "./main.js";
 
 document.addEventListener("DOMContentLoaded", async () => {
     // Inicializar variáveis
@@ -15,19 +15,13 @@ document.addEventListener("DOMContentLoaded", async () => {
     // O Select2 usa jQuery ajax, então precisamos interceptar ou passar o token
     const accessToken = localStorage.getItem("access_token");
 
-    // 1. Inicializar Select2 para Ferramentas (Opcional, mas bom para busca)
-    toolSelect.select2();
-    
-    // 2. Inicializar Select2 para Funcionários
-    employeeSelect.select2();
-
     // Função auxiliar de fetch (a mesma que você já tem)
     async function fetchWithAuth(url, options = {}) {
          options.headers = options.headers || {};
          options.headers.Authorization = `Bearer ${localStorage.getItem("access_token")}`;
          // ... (lógica de retry igual ao seu arquivo original)
          try {
-            const response = await fetch(url, options);
+            const response = await cachedFetch(url, options);
             if (response.status === 401) {
                 const refreshed = await refreshToken();
                 if (refreshed) return fetchWithAuth(url, options); 
@@ -37,83 +31,86 @@ document.addEventListener("DOMContentLoaded", async () => {
         } catch (e) { console.error(e); }
     }
 
-    // Carregar dados iniciais
-    async function loadData() {
-        // Carregar Ferramentas
-        const toolsRes = await fetchWithAuth("/api/tools/");
-        if (toolsRes && toolsRes.ok) {
-            const tools = await toolsRes.json();
-            // Limpa e adiciona
-            toolSelect.empty();
-            toolSelect.append(new Option("Selecione uma ferramenta", ""));
-            tools.forEach(tool => {
-                const text = `${tool.name} (Disp: ${tool.available_quantity})`;
-                // Desabilita se não tiver estoque
-                const disabled = tool.available_quantity <= 0;
-                const option = new Option(text, tool.id, false, false);
-                if(disabled) option.disabled = true;
-                toolSelect.append(option);
-            });
-            toolSelect.trigger('change'); // Atualiza Select2
-        }
-
-        // Carregar Funcionários
-        const empRes = await fetchWithAuth("/api/employees/");
-        if (empRes && empRes.ok) {
-            const employees = await empRes.json();
-            employeeSelect.empty();
-            employeeSelect.append(new Option("Selecione um funcionário", ""));
-            employees.forEach(emp => {
-                const text = `${emp.name} - Matrícula: ${emp.registration_number}`;
-                employeeSelect.append(new Option(text, emp.id));
-            });
-            employeeSelect.trigger('change');
-        }
+    // Opções vindas da busca no servidor (/api/.../search/) conforme o usuário digita,
+    // em vez de baixar as listas inteiras de ferramentas e funcionários
+    // 'fields': só os campos que a opção usa (?fields= / ?expand= da API)
+    function searchSource(url, fields, toOption) {
+        return {
+            delay: 250,
+            transport: (params, success, failure) => {
+                const query = new URLSearchParams({ q: params.data.term || "", limit: 30, ...fields });
+                return fetchWithAuth(`${url}?${query}`)
+                    .then(response => (response && response.ok ? response.json() : Promise.reject(response)))
+                    .then(success, failure);
+            },
+            processResults: items => ({ results: items.map(toOption) }),
+        };
     }
 
+    // 1. Ferramentas (várias de uma vez: um kit vira um único POST em /api/loans/bulk/)
+    toolSelect.select2({
+        placeholder: "Busque uma ou mais ferramentas",
+        ajax: searchSource("/api/tools/search/", { fields: "id,name", expand: "available_quantity" }, tool => ({
+            id: tool.id,
+            text: `${tool.name} (Disp: ${tool.available_quantity})`,
+            disabled: tool.available_quantity <= 0, // Sem estoque
+        })),
+    });
+
+    // 2. Funcionários
+    employeeSelect.select2({
+        placeholder: "Busque por nome ou matrícula...",
+        ajax: searchSource("/api/employees/search/", {}, emp => ({
+            id: emp.id,
+            text: `${emp.name} - Matrícula: ${emp.registration_number}`,
+        })),
+    });
+
     loanForm.addEventListener("submit", async (e) => {
         e.preventDefault();
         
         // Pega os valores do Select2 (jQuery)
-        const toolId = toolSelect.val();
+        const toolIds = toolSelect.val() || [];
         const employeeId = employeeSelect.val();
         const quantity = document.getElementById("quantity").value;
         const dueDate = document.getElementById("dueDate").value;
 
-        if (!toolId || !employeeId || !dueDate) {
+        if (!toolIds.length || !employeeId || !dueDate) {
             messageDiv.textContent = "Preencha todos os campos.";
             messageDiv.style.color = "red";
             return;
         }
 
         const body = {
-            tool: parseInt(toolId),
             employee: parseInt(employeeId), // Mudou de 'borrower' para 'employee'
-            quantity: parseInt(quantity),
-            borrowed_date: borrowedDateInput.value,
-            due_date: dueDate
+            due_date: dueDate,
+            items: toolIds.map(id => ({ tool: parseInt(id), quantity: parseInt(quantity) })),
         };
 
-        const response = await fetchWithAuth("/api/loans/", {
+        // Tudo ou nada: se faltar estoque de alguma ferramenta, nenhum empréstimo é gravado
+        const response = await fetchWithAuth("/api/loans/bulk/", {
             method: "POST",
             headers: { "Content-Type": "application/json" },
             body: JSON.stringify(body),
         });
 
         if (response && response.ok) {
-            messageDiv.textContent = "Empréstimo registrado!";
+            const result = await response.json();
+            messageDiv.textContent = result.created.length > 1
+                ? `${result.created.length} empréstimos registrados!`
+                : "Empréstimo registrado!";
             messageDiv.style.color = "green";
             loanForm.reset();
             // Resetar Select2
             toolSelect.val(null).trigger('change');
             employeeSelect.val(null).trigger('change');
-            loadData(); // Recarrega para atualizar estoque visual
         } else {
             const err = await response.json();
-            messageDiv.textContent = "Erro: " + JSON.stringify(err);
+            const names = Object.fromEntries(toolSelect.find("option").map((_, o) => [[o.value, o.text]]).get());
+            messageDiv.textContent = err.errors
+                ? "Erro: " + err.errors.map(e => `${names[e.tool] || e.tool}: ${e.detail}`).join("; ")
+                : "Erro: " + JSON.stringify(err);
             messageDiv.style.color = "red";
         }
     });
-
-    loadData();
 });
\ No newline at end of file
@@ -47,6 +47,41 @@ document.addEventListener("DOMContentLoaded", () => {
         }
     }
 
+    // Exportações grandes rodam em segundo plano: agenda a tarefa, consulta o
+    // estado periodicamente e baixa o arquivo quando estiver pronto.
+    async function exportViaJob(kind, filename, button) {
+        const response = await fetchWithAuth('/api/export/jobs/', {
+            method: 'POST',
+            headers: { 'Content-Type': 'application/json' },
+            body: JSON.stringify({ kind: kind }),
+        });
+        if (!response || !response.ok) {
+            alert('Erro ao agendar o relatório.');
+            return;
+        }
+        let job = await response.json();
+        const originalLabel = button.innerHTML;
+        button.disabled = true;
+        button.innerHTML = '<i class="fas fa-spinner fa-spin"></i> Gerando...';
+        try {
+            while (job.status === 'pending' || job.status === 'running') {
+                await new Promise(resolve => setTimeout(resolve, 2000));
+                const statusResponse = await fetchWithAuth(`/api/export/jobs/${job.id}/`);
+                if (!statusResponse || !statusResponse.ok) break;
+                job = await statusResponse.json();
+            }
+            if (job.status === 'done' && job.download_url) {
+                await exportCSV(job.download_url, filename);
+            } else {
+                alert('Erro ao gerar o relatório. Verifique o console para mais detalhes.');
+                console.error('Falha na tarefa de exportação:', job);
+            }
+        } finally {
+            button.disabled = false;
+            button.innerHTML = originalLabel;
+        }
+    }
+
     // ✅ CORREÇÃO: URLs ajustadas e verificação para evitar erros
     if (exportToolsBtn) {
         exportToolsBtn.addEventListener('click', () => {
@@ -62,7 +97,8 @@ document.addEventListener("DOMContentLoaded", () => {
     
     if (exportHistoryBtn) {
         exportHistoryBtn.addEventListener('click', () => {
-            exportCSV('/api/export/loan-history/', 'historico_emprestimos.csv');
+            // O histórico completo pode ser grande: gera em segundo plano
+            exportViaJob('loan-history', 'historico_emprestimos.csv', exportHistoryBtn);
         });
     }
 
@@ -1,13 +1,13 @@
 // static/js/virtual_warehouse.js
 
-import { refreshToken } from "./main.js";
+import { refreshToken, cachedFetch, toolPicture, subscribeToChanges } from "./main.js";
 
 document.addEventListener("DOMContentLoaded", () => {
     
     // --- Seleção de Elementos ---
     const tableBody = document.getElementById('warehouseTableBody');
     const searchInput = document.getElementById('warehouseSearch');
-    let allTools = []; // Cache para guardar os dados e facilitar a busca
+    const conditionSelect = document.getElementById('warehouseCondition');
 
     // --- Funções Auxiliares ---
 
@@ -17,12 +17,12 @@ document.addEventListener("DOMContentLoaded", () => {
             ...options.headers,
             'Authorization': `Bearer ${localStorage.getItem('access_token')}`
         };
-        let response = await fetch(url, options);
+        let response = await cachedFetch(url, options);
         if (response.status === 401) {
             const refreshed = await refreshToken();
             if (refreshed) {
                 options.headers['Authorization'] = `Bearer ${localStorage.getItem('access_token')}`;
-                response = await fetch(url, options); // Tenta de novo
+                response = await cachedFetch(url, options); // Tenta de novo
             } else {
                 window.location.href = "/login"; // Falhou, volta pro login
                 return null;
@@ -55,15 +55,15 @@ document.addEventListener("DOMContentLoaded", () => {
 
         tools.forEach(tool => {
             const row = `
-                <tr>
+                <tr data-tool-id="${tool.id}">
                     <td>
-                        <img src="${tool.image || 'https://via.placeholder.com/50x50'}" alt="${tool.name}" class="tool-table-image">
+                        ${toolPicture(tool, 'thumb', 'https://via.placeholder.com/50x50', `alt="${tool.name}" class="tool-table-image"`)}
                     </td>
                     <td><strong>${tool.name}</strong></td>
                     <td>R$ ${parseFloat(tool.unit_value).toFixed(2)}</td>
-                    <td>${tool.total_quantity}</td>
-                    <td>${tool.borrowed_quantity}</td>
-                    <td>${tool.available_quantity}</td>
+                    <td data-field="total_quantity">${tool.total_quantity}</td>
+                    <td data-field="borrowed_quantity">${tool.borrowed_quantity}</td>
+                    <td data-field="available_quantity">${tool.available_quantity}</td>
                     <td>
                         <span class="status-badge status-${tool.condition}">${getStatusText(tool.condition)}</span>
                     </td>
@@ -76,32 +76,49 @@ document.addEventListener("DOMContentLoaded", () => {
 
     // --- Funções de API e Lógica Principal ---
 
-    // Busca os dados das ferramentas e inicia a renderização
+    // Busca no servidor (/api/tools/search/): só os resultados chegam ao navegador
+    const SEARCH_LIMIT = 100;
+    let searchTimer = null;
+    let searchSeq = 0;
+
     async function fetchAndDisplayTools() {
-        // Mostra uma mensagem de carregamento
-        tableBody.innerHTML = `<tr><td colspan="7" style="text-align: center; color: #a0a0b0;">Carregando dados...</td></tr>`;
+        const seq = ++searchSeq;
+        const params = new URLSearchParams({ limit: SEARCH_LIMIT });
+        if (searchInput.value.trim()) params.set('q', searchInput.value.trim());
+        if (conditionSelect.value) params.set('condition', conditionSelect.value);
 
-        const response = await fetchWithAuth('/api/tools/');
+        const response = await fetchWithAuth(`/api/tools/search/?${params}`);
+        if (seq !== searchSeq) return; // Já existe uma busca mais recente
         if (response && response.ok) {
-            allTools = await response.json();
-            renderTable(allTools);
+            renderTable(await response.json());
         } else {
             console.error("Falha ao buscar dados do armazém.");
             tableBody.innerHTML = `<tr><td colspan="7" style="text-align: center; color: #dc3545;">Erro ao carregar os dados. Tente novamente.</td></tr>`;
         }
     }
 
+    // Estoque alterado em outro lugar (feed /api/events/): atualiza só a linha
+    function applyStockChange(type, data) {
+        if (type === 'reset') return fetchAndDisplayTools();
+        if (type !== 'tool.stock') return;
+        const row = tableBody.querySelector(`tr[data-tool-id="${data.id}"]`);
+        if (!row) return;
+        ['total_quantity', 'borrowed_quantity', 'available_quantity'].forEach(field => {
+            row.querySelector(`[data-field="${field}"]`).textContent = data[field];
+        });
+    }
+
     // --- Adicionando Event Listeners ---
 
-    // Event listener para a barra de busca em tempo real
-    searchInput.addEventListener('input', (e) => {
-        const searchTerm = e.target.value.toLowerCase();
-        const filteredTools = allTools.filter(tool => 
-            tool.name.toLowerCase().includes(searchTerm)
-        );
-        renderTable(filteredTools);
+    // Busca enquanto digita, esperando uma pausa na digitação
+    searchInput.addEventListener('input', () => {
+        clearTimeout(searchTimer);
+        searchTimer = setTimeout(fetchAndDisplayTools, 250);
     });
+    conditionSelect.addEventListener('change', fetchAndDisplayTools);
 
     // --- Carga Inicial ---
+    tableBody.innerHTML = `<tr><td colspan="7" style="text-align: center; color: #a0a0b0;">Carregando dados...</td></tr>`;
     fetchAndDisplayTools();
-});
\ No newline at end of file
+    subscribeToChanges(['tool'], applyStockChange);
+});
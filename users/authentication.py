@@ -0,0 +1,128 @@
+# users/authentication.py
+
+"""
+Autenticação JWT com o usuário e as permissões em cache no processo.
+
+O JWTAuthentication padrão busca o usuário no banco a cada requisição, e
+cada has_perm() da primeira verificação busca as permissões dele e dos
+grupos. Aqui o usuário é carregado uma vez, já com as permissões
+resolvidas (o cache '_perm_cache' do ModelBackend), e reaproveitado por
+AUTH_CACHE['TTL'] segundos: requisições seguintes autenticam e checam
+permissões sem nenhuma consulta.
+
+Mudanças em usuários, grupos e permissões descartam as entradas afetadas
+neste processo (signals abaixo). Outros processos só percebem quando o
+TTL vence, por isso ele é curto.
+"""
+
+import copy
+import threading
+import time
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.contrib.auth.models import Group, Permission
+from django.db.models.signals import m2m_changed, post_delete, post_save
+from django.utils.translation import gettext_lazy as _
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import AuthenticationFailed, InvalidToken
+from rest_framework_simplejwt.settings import api_settings
+from rest_framework_simplejwt.utils import get_md5_hash_password
+
+DEFAULTS = {
+    'TTL': 60,  # segundos
+}
+
+_entries = {}  # str(USER_ID_FIELD) -> (expira em, usuário com permissões carregadas)
+_lock = threading.Lock()
+_generation = 0  # muda a cada invalidação; impede gravar um usuário lido antes dela
+
+
+def get_setting(name):
+    return getattr(settings, 'AUTH_CACHE', {}).get(name, DEFAULTS[name])
+
+
+def invalidate(user_id=None):
+    """ Descarta o usuário do cache (ou todos, sem argumento). """
+    global _generation
+    with _lock:
+        _generation += 1
+        if user_id is None:
+            _entries.clear()
+        else:
+            _entries.pop(str(user_id), None)
+
+
+def cached_user(user_id):
+    """
+    Cópia do usuário em cache, com as permissões já resolvidas. Cada
+    requisição recebe a própria cópia: nada do que a view fizer com
+    request.user vaza para as outras.
+    """
+    user_id = str(user_id)  # o token guarda o id como texto
+    entry = _entries.get(user_id)
+    now = time.monotonic()
+    if entry is not None and entry[0] > now:
+        return copy.copy(entry[1])
+
+    generation = _generation
+    user = get_user_model().objects.get(**{api_settings.USER_ID_FIELD: user_id})
+    user.get_all_permissions()  # preenche user._perm_cache
+    with _lock:
+        if generation == _generation:
+            _entries[user_id] = (now + get_setting('TTL'), user)
+    return copy.copy(user)
+
+
+class CachedJWTAuthentication(JWTAuthentication):
+    """ JWTAuthentication que resolve o usuário por cached_user(). """
+
+    def get_user(self, validated_token):
+        try:
+            user_id = validated_token[api_settings.USER_ID_CLAIM]
+        except KeyError as e:
+            raise InvalidToken(_("Token contained no recognizable user identification")) from e
+
+        try:
+            user = cached_user(user_id)
+        except self.user_model.DoesNotExist as e:
+            raise AuthenticationFailed(_("User not found"), code="user_not_found") from e
+
+        if api_settings.CHECK_USER_IS_ACTIVE and not user.is_active:
+            raise AuthenticationFailed(_("User is inactive"), code="user_inactive")
+
+        if api_settings.CHECK_REVOKE_TOKEN:
+            if validated_token.get(api_settings.REVOKE_TOKEN_CLAIM) != get_md5_hash_password(user.password):
+                raise AuthenticationFailed(_("The user's password has been changed."), code="password_changed")
+
+        return user
+
+
+# --- Invalidação ---
+
+def _user_changed(sender, instance, **kwargs):
+    invalidate(getattr(instance, api_settings.USER_ID_FIELD))
+
+
+def _everyone_changed(sender, **kwargs):
+    # Grupo ou permissão: não dá para saber barato quem é afetado
+    invalidate()
+
+
+def _memberships_changed(sender, instance, action, **kwargs):
+    if not action.startswith('post_'):
+        return
+    if isinstance(instance, get_user_model()):
+        _user_changed(sender, instance)
+    else:
+        invalidate()
+
+
+def connect_signals():
+    User = get_user_model()
+    for signal in (post_save, post_delete):
+        signal.connect(_user_changed, sender=User, dispatch_uid='users.auth_cache.user')
+        signal.connect(_everyone_changed, sender=Group, dispatch_uid='users.auth_cache.group')
+        signal.connect(_everyone_changed, sender=Permission, dispatch_uid='users.auth_cache.permission')
+    for through in (User.groups.through, User.user_permissions.through, Group.permissions.through):
+        m2m_changed.connect(_memberships_changed, sender=through, dispatch_uid=f'users.auth_cache.{through.__name__}')